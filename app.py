@@ -1,9 +1,38 @@
-from flask import Flask, render_template, request, jsonify
+# Imported first so startup phases are timed from the very beginning
+from startup import startup
+from flask import Flask, render_template, request, jsonify, make_response, send_file, abort
 import os
 import re
-from datetime import datetime, timedelta
+import hashlib
+import hmac
+import ipaddress
+import tempfile
+from pathlib import Path
+from urllib.parse import parse_qsl
+from datetime import datetime, timedelta, timezone
 import secrets
 from dotenv import load_dotenv
+from jinja2 import FileSystemBytecodeCache
+from werkzeug.middleware.proxy_fix import ProxyFix
+from article_store import create_store, decode_cursor, encode_cursor, format_published
+from page_cache import create_page_cache
+from fetch_cache import create_fetch_cache
+import static_assets
+from compression import Compressor, CompressionMiddleware
+from search import SearchIndex
+from facets import FacetIndex, today
+from trending import create_view_counter, TOP_CANDIDATES
+from json_fragments import ArticleJSONCache
+from card_fragments import CardCache
+from image_proxy import ImageProxy, FALLBACK_MAX_AGE, IMMUTABLE_MAX_AGE
+from rate_limit import create_rate_limiter, forwarded_client, parse_limit, too_many_requests
+from metrics import create_metrics
+from news_sources import StoreSource, RemoteSource, gather_articles
+from news_stream import ArticleFeed, STREAM_FORMATS, sse_event
+# contact_queue (smtplib, email) and ingest are imported where they are
+# used - most workers never need them
+
+startup.mark('imports')
 
 # Load environment variables from .env file
 load_dotenv()
@@ -13,6 +42,77 @@ app = Flask(__name__)
 # Production configuration with enhanced security
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', secrets.token_urlsafe(32))
 app.config['DEBUG'] = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
+app.config['ARTICLE_STORE_URL'] = os.environ.get('ARTICLE_STORE_URL', 'memory://')
+app.config['PAGE_CACHE_URL'] = os.environ.get('PAGE_CACHE_URL', 'memory://')
+app.config['PAGE_CACHE_MAX_BYTES'] = int(os.environ.get('PAGE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+app.config['FETCH_CACHE_URL'] = os.environ.get('FETCH_CACHE_URL', 'memory://')
+app.config['FETCH_CACHE_TTL'] = float(os.environ.get('FETCH_CACHE_TTL', 30))
+app.config['FETCH_CACHE_STALE'] = float(os.environ.get('FETCH_CACHE_STALE', 60))
+app.config['CONTACT_QUEUE_PATH'] = os.environ.get('CONTACT_QUEUE_PATH', 'contact_queue.db')
+app.config['JINJA_CACHE_DIR'] = os.environ.get('JINJA_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'flask-news-jinja'))
+app.config['IMAGE_PROXY_ENABLED'] = os.environ.get('IMAGE_PROXY_ENABLED', 'True').lower() == 'true'
+app.config['IMAGE_CACHE_DIR'] = os.environ.get('IMAGE_CACHE_DIR', 'image_cache')
+app.config['IMAGE_PROXY_WORKERS'] = int(os.environ.get('IMAGE_PROXY_WORKERS', 2))
+app.config['IMAGE_PROXY_ALLOW'] = os.environ.get('IMAGE_PROXY_ALLOW', '')
+app.config['SEARCH_INDEX_PATH'] = os.environ.get('SEARCH_INDEX_PATH', '')
+app.config['METRICS_URL'] = os.environ.get('METRICS_URL', 'memory://')
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN', '')
+app.config['METRICS_ALLOW'] = os.environ.get('METRICS_ALLOW', '')
+app.config['TRUSTED_PROXIES'] = int(os.environ.get('TRUSTED_PROXIES', 0))
+app.config['RATE_LIMIT_ENABLED'] = os.environ.get('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+app.config['RATE_LIMIT_URL'] = os.environ.get('RATE_LIMIT_URL', 'memory://')
+app.config['RATE_LIMIT_CONTACT'] = os.environ.get('RATE_LIMIT_CONTACT', '5/minute')
+app.config['RATE_LIMIT_API'] = os.environ.get('RATE_LIMIT_API', '60/minute')
+app.config['COMPRESSION_ENABLED'] = os.environ.get('COMPRESSION_ENABLED', 'True').lower() == 'true'
+app.config['COMPRESSION_LEVEL'] = int(os.environ.get('COMPRESSION_LEVEL', 6))
+app.config['COMPRESSION_MIN_SIZE'] = int(os.environ.get('COMPRESSION_MIN_SIZE', 500))
+app.config['NEWS_SOURCE_URLS'] = [url.strip() for url in os.environ.get('NEWS_SOURCE_URLS', '').split(',') if url.strip()]
+app.config['NEWS_SOURCE_TIMEOUT'] = float(os.environ.get('NEWS_SOURCE_TIMEOUT', 2.0))
+app.config['NEWS_FEEDS'] = os.environ.get('NEWS_FEEDS', '')
+app.config['INGEST_MODE'] = os.environ.get('INGEST_MODE', 'off')
+app.config['INGEST_INTERVAL'] = int(os.environ.get('INGEST_INTERVAL', 300))
+app.config['VIEWS_URL'] = os.environ.get('VIEWS_URL', 'memory://')
+app.config['TRENDING_HALF_LIFE'] = float(os.environ.get('TRENDING_HALF_LIFE', 6 * 3600))
+app.config['STREAM_ENABLED'] = os.environ.get('STREAM_ENABLED', 'True').lower() == 'true'
+app.config['STREAM_MAX_SECONDS'] = float(os.environ.get('STREAM_MAX_SECONDS', 300))
+app.config['STREAM_POLL_INTERVAL'] = float(os.environ.get('STREAM_POLL_INTERVAL', 1.0))
+
+# Compiled templates persist across worker restarts (max_requests recycling)
+# instead of being recompiled by every new worker
+os.makedirs(app.config['JINJA_CACHE_DIR'], exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['JINJA_CACHE_DIR'])
+
+# Fingerprinted, precompressed static assets (built by static_assets.py)
+static_assets.init_app(app)
+
+# Dynamic gzip/brotli/zstd compression (disable when a proxy already compresses)
+compressor = None
+if app.config['COMPRESSION_ENABLED']:
+    compressor = Compressor(
+        level=app.config['COMPRESSION_LEVEL'],
+        min_size=app.config['COMPRESSION_MIN_SIZE']
+    )
+    app.wsgi_app = CompressionMiddleware(app.wsgi_app, compressor)
+
+# Request timing, spans and counters served at /metrics (installed after
+# compression so latencies include it)
+metrics = create_metrics(app.config['METRICS_URL'])
+metrics.init_app(app)
+
+# Client addresses behind TRUSTED_PROXIES reverse proxies (nginx: 1), read
+# from X-Forwarded-For so rate limits and METRICS_ALLOW see the real client
+# rather than the proxy. With 0 the headers are ignored - a client could
+# send any X-Forwarded-For it liked
+app.wsgi_app = ProxyFix(
+    app.wsgi_app,
+    x_for=app.config['TRUSTED_PROXIES'],
+    x_proto=app.config['TRUSTED_PROXIES']
+)
+
+# Per-client token buckets for the form and the API (share them across
+# workers with RATE_LIMIT_URL=sqlite:///rate_limits.db)
+limiter = create_rate_limiter(app.config['RATE_LIMIT_URL'], enabled=app.config['RATE_LIMIT_ENABLED'])
+startup.mark('config')
 
 # Security headers
 @app.after_request
@@ -132,9 +232,111 @@ MOCK_NEWS_DATA = {
     ]
 }
 
+# Article store backing fetch_news, seeded with the mock data when empty
+article_store = create_store(app.config['ARTICLE_STORE_URL'])
+if not len(article_store):
+    for seed_category, seed_articles in MOCK_NEWS_DATA.items():
+        article_store.add_many(seed_category, seed_articles)
+startup.mark('article_store')
+
+def start_ingester():
+    """
+    Start polling NEWS_FEEDS in a background thread when INGEST_MODE=thread
+    
+    Threads do not survive a fork, so under gunicorn this is called from the
+    post_fork hook in gunicorn.conf.py. With INGEST_MODE=process run
+    ``python ingest.py`` alongside the app against a SQLite store instead.
+    
+    Returns:
+        FeedIngester: The running ingester, or None if ingestion is off
+    """
+    if app.config['INGEST_MODE'] != 'thread' or not app.config['NEWS_FEEDS']:
+        return None
+    from ingest import FeedIngester, parse_feeds
+    
+    ingester = FeedIngester(
+        article_store,
+        parse_feeds(app.config['NEWS_FEEDS']),
+        interval=app.config['INGEST_INTERVAL']
+    )
+    ingester.start()
+    return ingester
+
+# Full-text index over the article store, caught up on each search
+search_index = SearchIndex(article_store)
+
+# Category, source and date counts for the news filter, caught up the same way
+facet_index = FacetIndex(article_store)
+
+# Article reads, counted per worker and flushed in batches, ranked by
+# time-decayed views for the trending list
+view_counter = create_view_counter(
+    app.config['VIEWS_URL'],
+    half_life=app.config['TRENDING_HALF_LIFE'],
+    last_id=article_store.last_id
+)
+
+def trending_articles(ranked):
+    """
+    Look up the articles of a view_counter.top() ranking
+    
+    Returns:
+        tuple: (articles, views) - decayed view counts alongside, with
+        articles no longer in the store left out
+    """
+    articles, views = [], []
+    for article_id, score in ranked:
+        article = article_store.get(article_id)
+        if article is not None:
+            articles.append(article)
+            views.append(round(score, 2))
+    return articles, views
+
+# Contact form submissions, stored and emailed by a background worker
+_contact_queue = None
+
+def get_contact_queue():
+    """The contact form queue, created on first use"""
+    global _contact_queue
+    if _contact_queue is None:
+        from contact_queue import ContactQueue
+        _contact_queue = ContactQueue(app.config['CONTACT_QUEUE_PATH'])
+    return _contact_queue
+
+def start_contact_worker():
+    """
+    Start draining the contact queue in a background thread
+    
+    Called from gunicorn's post_fork hook like start_ingester(); workers in
+    different processes lease separate batches, so each message is sent once.
+    Mail goes to MAIL_SERVER when it is set, otherwise messages are only
+    stored in the queue database.
+    
+    Returns:
+        ContactWorker: The running worker
+    """
+    from contact_queue import ContactWorker, mailer_from_env
+    
+    worker = ContactWorker(get_contact_queue(), mailer_from_env())
+    worker.start()
+    return worker
+
+# Rendered page cache, invalidated through article_store.page_version()
+page_cache = create_page_cache(app.config['PAGE_CACHE_URL'], app.config['PAGE_CACHE_MAX_BYTES'])
+
+# Store results behind fetch_news and fetch_news_page: an LRU per worker over
+# an optional shared SQLite tier, recomputed once per key and served stale
+# while refreshing
+fetch_cache = create_fetch_cache(
+    app.config['FETCH_CACHE_URL'],
+    ttl=app.config['FETCH_CACHE_TTL'],
+    stale_ttl=app.config['FETCH_CACHE_STALE'],
+    enabled=not app.debug
+)
+
 def fetch_news(category='general', country='us', page_size=10):
     """
-    Fetch mock news articles for demonstration
+    Fetch news articles from the article store
     
     Args:
         category (str): News category
@@ -142,35 +344,275 @@ def fetch_news(category='general', country='us', page_size=10):
         page_size (int): Number of articles to fetch
     
     Returns:
-        list: List of mock news articles
+        tuple: (articles, state) - Article objects, newest first, and the
+        (version_tag, modified) they were read under, which lags
+        article_store.page_state() while a stale result is served
+    """
+    # Indexed lookup - unknown categories fall back to general and short
+    # categories are topped up with the newest articles from the others
+    state = article_store.page_state(category, page_size)
+    with metrics.span('fetch'):
+        return fetch_cache.get(
+            f"fetch:{category}:{page_size}", state, lambda: article_store.fetch(category, page_size)
+        )
+
+def fetch_news_page(category='general', page_size=10, cursor=None):
+    """
+    Fetch one page of news articles using keyset pagination
+    
+    Args:
+        category (str): News category
+        page_size (int): Number of articles to fetch
+        cursor (str): Opaque cursor from a previous page's next_cursor
+    
+    Returns:
+        tuple: (articles, next_cursor, state) - next_cursor is None on the
+        last page; state is as for fetch_news()
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    before = decode_cursor(cursor) if cursor else None
+    state = article_store.page_state(category, page_size, before=before)
+    with metrics.span('fetch'):
+        (articles, next_key), state = fetch_cache.get(
+            f"page:{category}:{page_size}:{cursor or ''}",
+            state,
+            lambda: article_store.page(category, page_size, before=before)
+        )
+    return articles, encode_cursor(next_key) if next_key else None, state
+
+# Sources read concurrently by fetch_news_async: the local store plus any
+# remote news APIs listed in NEWS_SOURCE_URLS
+news_sources = [StoreSource(article_store)] + [
+    RemoteSource(url, timeout=app.config['NEWS_SOURCE_TIMEOUT'])
+    for url in app.config['NEWS_SOURCE_URLS']
+]
+
+async def fetch_news_async(category='general', page_size=10):
+    """
+    asyncio variant of fetch_news reading every news source concurrently
+    
+    Args:
+        category (str): News category
+        page_size (int): Number of articles to fetch
+    
+    Returns:
+        tuple: (articles, statuses) - statuses maps each source to 'ok',
+        'timeout' or 'error'; sources that fail are simply left out
+    """
+    return await gather_articles(news_sources, category, page_size)
+
+def _content_salt():
+    """Hash of the code, templates and asset manifest, so ETags change on every deploy"""
+    digest = hashlib.sha1(Path(__file__).read_bytes())
+    digest.update(repr(sorted(app.config['ASSET_MANIFEST'].items())).encode('utf-8'))
+    for template in sorted(Path(app.root_path, app.template_folder).glob('*.html')):
+        digest.update(template.read_bytes())
+    return digest.hexdigest()[:12]
+
+ETAG_SALT = _content_salt()
+
+def negotiated_encoding():
+    """Content-Encoding to use for the current request, or None"""
+    if compressor is None or request.method == 'HEAD':
+        return None
+    return compressor.negotiate(request.headers.get('Accept-Encoding', ''))
+
+def conditional_response(key, state, build):
+    """
+    Answer a request with 304 Not Modified when the client's copy is current
+    
+    The ETag is derived from the page's content version and the negotiated
+    Content-Encoding, so it is checked before anything is rendered,
+    serialized or compressed.
+    
+    Args:
+        key (str): Page key, e.g. 'news:sports:'
+        state (tuple): (version_tag, modified) of the articles the page is
+            built from, as returned by fetch_news()
+        build (callable): Called with the negotiated encoding to build the
+            full response on a miss
+    
+    Returns:
+        Response: A 304 or the full response, with ETag and Last-Modified set
+    """
+    encoding = negotiated_encoding()
+    if app.debug:
+        return make_response(build(None))
+    
+    version, modified = state
+    tag = f"{ETAG_SALT}|{key}|{version}|{encoding or 'identity'}"
+    etag = hashlib.sha1(tag.encode('utf-8')).hexdigest()[:32]
+    last_modified = datetime.fromtimestamp(modified, tz=timezone.utc)
+    
+    # If-None-Match takes precedence over If-Modified-Since (RFC 7232)
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since:
+        fresh = last_modified <= request.if_modified_since
+    else:
+        fresh = False
+    
+    if fresh:
+        response = app.response_class(status=304)
+    else:
+        response = make_response(build(encoding))
+        if compressor is not None:
+            compressor.compress_response(response, encoding)
+    
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.vary.add('Accept-Encoding')
+    # Cacheable, but always revalidated so new articles show up immediately
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def cached_render(key, version, render, encoding=None):
+    """
+    Serve a rendered page from the page cache (bypassed in debug mode)
+    
+    Pages are cached already compressed for the negotiated encoding, so a
+    hit costs neither a render nor a compression pass.
+    """
+    if app.debug:
+        return render()
+    
+    def render_encoded():
+        body = render()
+        return compressor.compress(body, encoding) if encoding else body
+    
+    body = page_cache.get_or_render(f"{key}|{encoding or 'identity'}", version, render_encoded)
+    if encoding:
+        return body, {'Content-Encoding': encoding}
+    return body
+
+# Per-article JSON, encoded once and spliced into API responses
+article_json = ArticleJSONCache()
+
+def json_response(articles, payload):
+    """
+    Build a JSON response with ``articles`` alongside the payload members
+    
+    Articles come from the pre-encoded fragment cache rather than being
+    serialized again for every request.
+    """
+    with metrics.span('serialize'):
+        body = article_json.encode_response(payload, articles)
+    return app.response_class(body, mimetype='application/json')
+
+# Per-article card HTML, rendered once and joined into /news pages and the
+# HTML variant of the news API
+card_cache = CardCache(app.jinja_env, enabled=not app.debug)
+
+def cards_response(articles, next_cursor, offset=0):
+    """
+    Build a text/html response of joined news cards
+    
+    Args:
+        articles (list): Articles to show
+        next_cursor (str): Cursor of the following page, sent as X-Next-Cursor
+        offset (int): Cards already on the page, for the animation delays
+    """
+    with metrics.span('render'):
+        body = card_cache.render(articles, offset)
+    response = app.response_class(body, mimetype='text/html')
+    response.headers['X-Total'] = str(len(articles))
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+# New articles pushed to /api/news/<category>/stream subscribers
+news_feed = ArticleFeed(article_store, poll_interval=app.config['STREAM_POLL_INTERVAL'])
+
+def stream_encoder(fmt):
+    """Frame one Article for a stream format (see news_stream.STREAM_FORMATS)"""
+    if fmt == 'ndjson':
+        return lambda article: article_json.fragment(article) + b'\n'
+    if fmt == 'html':
+        return lambda article: sse_event(article.id, card_cache.render([article]).encode('utf-8'))
+    return lambda article: sse_event(article.id, article_json.fragment(article))
+
+def stream_options(args, headers):
     """
-    # Get articles for the requested category, fallback to general
-    articles = MOCK_NEWS_DATA.get(category, MOCK_NEWS_DATA['general']).copy()
+    Format and resume position of a stream request
+    
+    Args:
+        args: Query arguments (?format=, ?after=)
+        headers: Request headers (Accept, Last-Event-ID), looked up by
+            lower-case name
     
-    # If we need more articles, add some from other categories
-    if len(articles) < page_size:
-        for cat_name, cat_articles in MOCK_NEWS_DATA.items():
-            if cat_name != category:
-                articles.extend(cat_articles)
-                if len(articles) >= page_size:
-                    break
+    Returns:
+        tuple: (fmt, after) - after is None to start from new articles
     
-    # Limit to requested page size
-    return articles[:page_size]
+    Raises:
+        ValueError: If the format or the event id is invalid
+    """
+    fmt = args.get('format')
+    if not fmt:
+        fmt = 'ndjson' if 'application/x-ndjson' in headers.get('accept', '') else 'sse'
+    if fmt not in STREAM_FORMATS:
+        raise ValueError(f"unknown stream format: {fmt}")
+    after = headers.get('last-event-id') or args.get('after')
+    return fmt, int(after) if after else None
+
+# Streams must reach the client as they are written
+STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+# Article images fetched once, cached on disk and resized into WebP/AVIF
+# variants, served from /img/<hash>
+image_proxy = ImageProxy(
+    app.config['IMAGE_CACHE_DIR'],
+    workers=app.config['IMAGE_PROXY_WORKERS'],
+    enabled=app.config['IMAGE_PROXY_ENABLED'],
+    allow=[network.strip() for network in app.config['IMAGE_PROXY_ALLOW'].split(',') if network.strip()]
+)
+
+@app.template_global()
+def responsive_image(url):
+    """src, per-format srcsets and sizes for an article image"""
+    return image_proxy.sources(url)
+
+metrics.register_counter('page_cache_hits_total', 'Rendered pages served from the page cache', lambda: page_cache.hits)
+metrics.register_counter('page_cache_misses_total', 'Rendered pages that had to be rendered', lambda: page_cache.misses)
+metrics.register_counter('article_json_hits_total', 'Article JSON fragments reused', lambda: article_json.hits)
+metrics.register_counter('article_json_misses_total', 'Article JSON fragments encoded', lambda: article_json.misses)
+metrics.register_counter('card_cache_hits_total', 'News cards served from the card cache', lambda: card_cache.hits)
+metrics.register_counter('card_cache_misses_total', 'News cards that had to be rendered', lambda: card_cache.misses)
+metrics.register_counter('image_fetches_total', 'Source images fetched into the image cache', lambda: image_proxy.fetches)
+metrics.register_counter('image_variants_total', 'Resized image variants encoded', lambda: image_proxy.variants_made)
+metrics.register_counter('fetch_cache_hits_total', 'Store results served fresh from this worker', lambda: fetch_cache.hits)
+metrics.register_counter('fetch_cache_shared_hits_total', 'Store results served fresh from the shared tier', lambda: fetch_cache.shared_hits)
+metrics.register_counter('fetch_cache_stale_total', 'Stale store results served while refreshing', lambda: fetch_cache.stale_hits)
+metrics.register_counter('fetch_cache_misses_total', 'Store results computed on the request path', lambda: fetch_cache.misses)
+metrics.register_counter('fetch_cache_coalesced_total', 'Requests that waited for another to compute a result', lambda: fetch_cache.coalesced)
+metrics.register_counter('stream_articles_total', 'New articles published to stream subscribers', lambda: news_feed.published)
+metrics.register_counter('article_views_total', 'Article reads flushed to the view store', lambda: view_counter.recorded)
+metrics.register_counter('rate_limited_total', 'Requests refused with 429', lambda: limiter.limited)
 
-def format_date(date_string):
-    """Format date string to readable format"""
-    if not date_string:
-        return 'Unknown Date'
-    return date_string
+@app.template_filter('format_date')
+def format_date(published):
+    """Format an article's epoch timestamp as a readable date"""
+    return format_published(published) or 'Unknown Date'
 
 # Routes
 @app.route('/')
 def home():
     """Home page route"""
-    # Get featured news for the homepage
-    featured_articles = fetch_news(category='general', page_size=3)
-    return render_template('index.html', title='Flask News Website', featured_articles=featured_articles)
+    # Featured news: the most read articles, topped up with the newest
+    newest, state = fetch_news(category='general', page_size=3)
+    ranked, ranking = view_counter.top(3)
+    state = (f"{state[0]}|{ranking}", max(state[1], view_counter.changed()))
+    
+    def render():
+        featured_articles = trending_articles(ranked)[0]
+        shown = {article.id for article in featured_articles}
+        featured_articles += [article for article in newest if article.id not in shown][:3 - len(featured_articles)]
+        return render_template('index.html', title='Flask News Website', featured_articles=featured_articles)
+    
+    return conditional_response(
+        'home', state, lambda encoding: cached_render('home', state[0], render, encoding)
+    )
 
 @app.route('/about')
 def about():
@@ -181,42 +623,255 @@ def about():
 def news():
     """News page route - displays mock news articles"""
     category = request.args.get('category', 'general')
+    cursor = request.args.get('cursor')
     
-    # Fetch news articles
-    news_articles = fetch_news(category=category, page_size=12)
-    
-    # Available categories for the filter
-    categories = [
-        {'value': 'general', 'label': 'General'},
-        {'value': 'business', 'label': 'Business'},
-        {'value': 'entertainment', 'label': 'Entertainment'},
-        {'value': 'health', 'label': 'Health'},
-        {'value': 'science', 'label': 'Science'},
-        {'value': 'sports', 'label': 'Sports'},
-        {'value': 'technology', 'label': 'Technology'}
-    ]
+    # A bad cursor just restarts from the first page
+    try:
+        news_articles, next_cursor, state = fetch_news_page(category=category, page_size=12, cursor=cursor)
+    except ValueError:
+        cursor = None
+        news_articles, next_cursor, state = fetch_news_page(category=category, page_size=12)
+    
+    def render():
+        return render_template('news.html', 
+                             title='Latest News', 
+                             articles=news_articles, 
+                             cards=card_cache.render(news_articles),
+                             categories=facet_index.categories(),
+                             current_category=category,
+                             next_cursor=next_cursor,
+                             stream_enabled=app.config['STREAM_ENABLED'])
     
-    return render_template('news.html', 
-                         title='Latest News', 
-                         articles=news_articles, 
-                         categories=categories,
-                         current_category=category)
+    key = f"news:{category}:{cursor or ''}"
+    return conditional_response(
+        key, state, lambda encoding: cached_render(key, state[0], render, encoding)
+    )
+
+@app.route('/news/<category>/cards')
+def news_cards(category):
+    """
+    Pre-rendered news cards for one page of a category
+    
+    The news page swaps this straight into the grid when the category
+    changes or more articles are loaded, and prefetches neighbouring
+    categories with it. Paginated with ?cursor=, ?offset= continues the
+    card animation delays of the cards already shown.
+    """
+    cursor = request.args.get('cursor')
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        articles, next_cursor, state = fetch_news_page(category=category, page_size=12, cursor=cursor)
+    except ValueError:
+        return app.response_class('Invalid cursor or offset.', status=400, mimetype='text/plain')
+    
+    def build(encoding):
+        return cards_response(articles, next_cursor, offset)
+    
+    key = f"cards:{category}:{cursor or ''}:{offset}"
+    return conditional_response(key, state, build)
 
 @app.route('/api/news/<category>')
+@limiter.limit('api_news', app.config['RATE_LIMIT_API'])
 def api_news(category):
-    """API endpoint for fetching news by category"""
-    page_size = min(int(request.args.get('page_size', 10)), 20)
+    """
+    API endpoint for fetching news by category, paginated with ?cursor=
+    
+    With ?format=html the articles come back as ready-made news card markup
+    (the next cursor in the X-Next-Cursor header) instead of JSON.
+    """
+    page_size = max(1, min(request.args.get('page_size', 10, type=int), 20))
+    cursor = request.args.get('cursor')
+    as_html = request.args.get('format') == 'html'
+    
+    try:
+        articles, next_cursor, state = fetch_news_page(
+            category=category,
+            page_size=page_size,
+            cursor=cursor
+        )
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'Invalid cursor.'
+        }), 400
+    
+    def build(encoding):
+        if as_html:
+            return cards_response(articles, next_cursor)
+        return json_response(articles, {
+            'status': 'success',
+            'category': category,
+            'total': len(articles),
+            'next_cursor': next_cursor
+        })
+    
+    key = f"api{':html' if as_html else ''}:{category}:{page_size}:{cursor or ''}"
+    return conditional_response(key, state, build)
+
+@app.route('/api/search')
+@limiter.limit('api_search', app.config['RATE_LIMIT_API'])
+def api_search():
+    """API endpoint for full-text search across all articles (?format=html for news cards)"""
+    query = request.args.get('q', '').strip()
+    category = request.args.get('category') or None
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    as_html = request.args.get('format') == 'html'
+    
+    if not query:
+        return jsonify({
+            'status': 'error',
+            'message': 'Missing search query.'
+        }), 400
+    
+    def build(encoding):
+        with metrics.span('fetch'):
+            articles = search_index.search(query, limit=limit, category=category)
+        
+        if as_html:
+            return cards_response(articles, None)
+        return json_response(articles, {
+            'status': 'success',
+            'query': query,
+            'total': len(articles)
+        })
+    
+    # Results can change whenever any category does
+    key = f"search{':html' if as_html else ''}:{query}:{category or ''}:{limit}"
+    state = (f"*:{article_store.version()}", article_store.modified())
+    return conditional_response(key, state, build)
+
+@app.route('/api/news/facets')
+@limiter.limit('api_facets', app.config['RATE_LIMIT_API'])
+def api_news_facets():
+    """
+    Article counts per category, source and publication date
+    
+    With ?category= the source and date counts cover that category only.
+    The counts are kept up to date as articles are stored (see facets.py),
+    so this never scans the store.
+    """
+    category = request.args.get('category') or None
+    
+    def build(encoding):
+        return jsonify({
+            'status': 'success',
+            'category': category,
+            **facet_index.facets(category)
+        })
+    
+    # Date buckets move on at midnight (UTC) as well as when articles arrive
+    key = f"facets:{category or ''}:{today()}"
+    state = (f"*:{article_store.version()}", article_store.modified())
+    return conditional_response(key, state, build)
+
+@app.route('/api/news/trending')
+@limiter.limit('api_trending', app.config['RATE_LIMIT_API'])
+def api_news_trending():
+    """Most read articles, ranked by views decaying with TRENDING_HALF_LIFE"""
+    limit = max(1, min(request.args.get('limit', 10, type=int), TOP_CANDIDATES))
+    ranked, ranking = view_counter.top(limit)
+    
+    def build(encoding):
+        articles, views = trending_articles(ranked)
+        return json_response(articles, {
+            'status': 'success',
+            'total': len(articles),
+            'views': views
+        })
+    
+    return conditional_response(f"trending:{limit}", (ranking, view_counter.changed()), build)
+
+@app.route('/api/articles/<int:article_id>/view', methods=['POST'])
+@limiter.limit('article_view', app.config['RATE_LIMIT_API'])
+def article_view(article_id):
+    """Count a read of an article (sent with navigator.sendBeacon)"""
+    view_counter.record(article_id)
+    return '', 204
+
+@app.route('/api/news/<category>/aggregate')
+@limiter.limit('api_aggregate', app.config['RATE_LIMIT_API'])
+async def api_news_aggregate(category):
+    """API endpoint merging news from every configured source"""
+    page_size = max(1, min(request.args.get('page_size', 10, type=int), 20))
     
-    articles = fetch_news(category=category, page_size=page_size)
+    articles, statuses = await fetch_news_async(category=category, page_size=page_size)
     
     return jsonify({
         'status': 'success',
         'category': category,
         'articles': articles,
-        'total': len(articles)
+        'total': len(articles),
+        'sources': statuses
     })
 
+@app.route('/api/news/<category>/stream')
+@limiter.limit('api_stream', app.config['RATE_LIMIT_API'])
+def api_news_stream(category):
+    """
+    Stream new articles in a category as Server-Sent Events or NDJSON
+    
+    ?format=sse (default), html (news cards as event data) or ndjson.
+    Resumes after the Last-Event-ID header or ?after= article id. Under
+    the uvicorn profile asgi.py serves this path through open_news_stream().
+    """
+    if not app.config['STREAM_ENABLED']:
+        abort(404)
+    try:
+        fmt, after = stream_options(request.args, request.headers)
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'Invalid format or Last-Event-ID.'
+        }), 400
+    
+    body = news_feed.stream(category, after, stream_encoder(fmt), fmt, app.config['STREAM_MAX_SECONDS'])
+    return app.response_class(body, mimetype=STREAM_FORMATS[fmt], headers=STREAM_HEADERS)
+
+STREAM_PATH = re.compile(r'^/api/news/([^/]+)/stream$')
+STREAM_LIMIT = parse_limit(app.config['RATE_LIMIT_API'])
+
+def open_news_stream(path, query_string, headers, client):
+    """
+    api_news_stream() for news_stream.StreamingASGI, on the event loop
+    
+    Returns:
+        tuple: (status, headers, async iterable of body chunks), or None
+        for any request that is not a stream
+    """
+    match = STREAM_PATH.match(path)
+    if match is None or not app.config['STREAM_ENABLED']:
+        return None
+    
+    def refuse(response):
+        async def body():
+            yield response.get_data()
+        return response.status_code, list(response.headers.items()), body()
+    
+    client = forwarded_client(client, headers.get('x-forwarded-for'), app.config['TRUSTED_PROXIES'])
+    with app.app_context():
+        if limiter.enabled:
+            wait = limiter.consume(f"api_stream:{client}", *STREAM_LIMIT)
+            if wait:
+                limiter.limited += 1
+                return refuse(too_many_requests(wait))
+        try:
+            fmt, after = stream_options(dict(parse_qsl(query_string)), headers)
+        except ValueError:
+            response = jsonify({
+                'status': 'error',
+                'message': 'Invalid format or Last-Event-ID.'
+            })
+            response.status_code = 400
+            return refuse(response)
+    
+    # scope['path'] is already percent-decoded; decoding again would read
+    # a category containing %25 differently from the WSGI route
+    category = match.group(1)
+    body = news_feed.astream(category, after, stream_encoder(fmt), fmt, app.config['STREAM_MAX_SECONDS'])
+    return 200, [('Content-Type', STREAM_FORMATS[fmt])] + list(STREAM_HEADERS.items()), body
+
 @app.route('/contact', methods=['GET', 'POST'])
+@limiter.limit('contact', app.config['RATE_LIMIT_CONTACT'], methods=('POST',))
 def contact():
     """Contact page route with enhanced form handling"""
     if request.method == 'POST':
@@ -240,6 +895,9 @@ def contact():
         if not subject or len(subject) < 5:
             errors.append('Subject must be at least 5 characters long.')
         
+        if any(char in field for field in (name, subject) for char in '\r\n'):
+            errors.append('Name and subject must be on a single line.')
+        
         if not message or len(message) < 10:
             errors.append('Message must be at least 10 characters long.')
         
@@ -250,8 +908,8 @@ def contact():
             })
         
         try:
-            # In production, save to database or send email
-            print(f"Contact form submission - Name: {name}, Email: {email}, Subject: {subject}")
+            # Queued durably; storing and emailing happen off the request path
+            get_contact_queue().enqueue(name, email, subject, message)
             
             return jsonify({
                 'status': 'success',
@@ -267,6 +925,68 @@ def contact():
     
     return render_template('contact.html', title='Contact Us')
 
+IMAGE_KEY = re.compile(r'^[0-9a-f]{32}$')
+
+def image_response(key, found, immutable=True):
+    """
+    Serve a cached image file
+    
+    Its URL never changes content, so it is immutable - unless it is a
+    stand-in (``immutable=False``) that a later request will replace.
+    """
+    if found is None:
+        abort(404)
+    path, mimetype = found
+    response = send_file(path, mimetype=mimetype, etag=f"{key}-{path.name}", conditional=True)
+    if immutable:
+        response.headers['Cache-Control'] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        response.headers['Cache-Control'] = f"public, max-age={FALLBACK_MAX_AGE}"
+    return response
+
+@app.route('/img/<key>')
+def image_original(key):
+    """An article image as fetched from its source"""
+    if not IMAGE_KEY.match(key):
+        abort(404)
+    return image_response(key, image_proxy.original(key))
+
+@app.route('/img/<key>/<int:width>.<fmt>')
+def image_variant(key, width, fmt):
+    """An article image resized to ``width`` and encoded as WebP or AVIF"""
+    if not IMAGE_KEY.match(key):
+        abort(404)
+    # Falls back to the original, which keeps the URL working without Pillow;
+    # only briefly cached, so a slow resize does not stick in caches for good
+    found = image_proxy.variant(key, width, fmt)
+    return image_response(key, found, immutable=image_proxy.is_variant(found))
+
+# Addresses that may scrape /metrics without METRICS_TOKEN; none unless
+# METRICS_ALLOW is set, since behind a reverse proxy every request comes
+# from the proxy's own (often loopback) address
+METRICS_NETWORKS = [
+    ipaddress.ip_network(network.strip(), strict=False)
+    for network in app.config['METRICS_ALLOW'].split(',') if network.strip()
+]
+
+def metrics_allowed():
+    """Whether the request comes from METRICS_ALLOW or carries the METRICS_TOKEN bearer token"""
+    token = app.config['METRICS_TOKEN']
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return True
+    try:
+        address = ipaddress.ip_address(request.remote_addr or '')
+    except ValueError:
+        return False
+    return any(address in network for network in METRICS_NETWORKS)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics, summed over every worker"""
+    if not metrics_allowed():
+        abort(403)
+    return app.response_class(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.errorhandler(404)
 def page_not_found(e):
     """404 error handler"""
@@ -277,11 +997,78 @@ def internal_server_error(e):
     """500 error handler"""
     return render_template('404.html', title='Server Error'), 500
 
+# Accept-Encoding of a typical browser, so warm_up() caches the compressed
+# copies of pages too
+WARM_ACCEPT_ENCODING = 'gzip, deflate, br, zstd'
+
+def warm_up(persist_index=False, record=False):
+    """
+    Bring a fresh process to steady state before it takes traffic
+    
+    Loads every template, catches the search index (starting from the
+    SEARCH_INDEX_PATH snapshot when there is one) and the facet counts up,
+    and renders the hot pages
+    into the page and card caches. gunicorn.conf.py calls this in the
+    master before forking, so workers inherit warm caches, and again in
+    each worker to pick up anything published since the master warmed up.
+    
+    Args:
+        persist_index (bool): Write the caught-up search index back to
+            SEARCH_INDEX_PATH
+        record (bool): Record the phase timings in /metrics (only in
+            workers - the master's numbers would be inherited by each)
+    
+    Returns:
+        list: (phase, seconds) tuples
+    """
+    first = len(startup.phases)
+    with metrics.paused():
+        with startup.phase('warm_templates'):
+            for name in app.jinja_env.list_templates():
+                app.jinja_env.get_template(name)
+        
+        with startup.phase('warm_search'):
+            path = app.config['SEARCH_INDEX_PATH']
+            if path and not len(search_index):
+                search_index.load(path)
+            indexed = search_index.sync()
+            if path and persist_index and (indexed or not os.path.exists(path)):
+                search_index.save(path)
+        
+        with startup.phase('warm_facets'):
+            facet_index.sync()
+        
+        with startup.phase('warm_pages'):
+            # The home page and the first page of every category
+            urls = ['/'] + [f"/news?category={option['value']}" for option in facet_index.categories()]
+            client = app.test_client()
+            for url in urls:
+                for accept_encoding in ('identity', WARM_ACCEPT_ENCODING):
+                    client.get(url, headers={'Accept-Encoding': accept_encoding})
+    
+    # Warm-up is not traffic; keep it out of the cache hit ratios
+    for cache in (page_cache, card_cache, article_json):
+        cache.hits = cache.misses = 0
+    fetch_cache.hits = fetch_cache.shared_hits = fetch_cache.stale_hits = 0
+    fetch_cache.misses = fetch_cache.coalesced = 0
+    
+    phases = startup.phases[first:]
+    if record:
+        for phase, seconds in phases:
+            metrics.observe('app_warmup_duration_seconds', (('phase', phase),), seconds)
+    return phases
+
+startup.mark('app')
+
 if __name__ == '__main__':
     # Production-ready server configuration
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
     
+    start_ingester()
+    start_contact_worker()
+    warm_up(persist_index=True)
+    print(f"⏱️  Startup: {startup.report()}")
     app.run(
         debug=debug,
         host='0.0.0.0',
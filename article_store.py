@@ -0,0 +1,655 @@
+"""
+Article storage for the Flask News Website
+
+Articles are kept in per-category indexes ordered newest first, so a page of
+results is a slice of an index (plus a bounded merge across the other
+categories when a category runs short) rather than a scan over every article.
+
+Two backends are provided:
+
+    MemoryArticleStore  - sorted lists held in the process (default)
+    SQLiteArticleStore  - a SQLite table with covering indexes, shared by
+                          every worker that opens the same file
+
+Use create_store() to build one from a URL such as ``memory://`` or
+``sqlite:///news.db``.
+
+Stores hand out Article objects: slotted records with an integer
+``published`` timestamp and interned author/source strings. The display
+date is only formatted when a template or serializer asks for it.
+"""
+
+import base64
+import binascii
+import hashlib
+import heapq
+import itertools
+import os
+import sqlite3
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from operator import itemgetter
+
+# Display format used by the article 'date' field
+DATE_FORMAT = '%B %d, %Y at %I:%M %p'
+
+# Text fields stored for every article; the display date is derived from
+# the 'published' timestamp
+ARTICLE_FIELDS = ('title', 'content', 'author', 'url', 'image_url', 'source')
+
+
+def parse_published(date_string):
+    """
+    Convert a display date such as 'December 15, 2024 at 10:30 AM' to epoch seconds
+
+    Args:
+        date_string (str): Date in DATE_FORMAT
+
+    Returns:
+        int: Seconds since the epoch (UTC), or 0 if the date cannot be parsed
+    """
+    try:
+        parsed = datetime.strptime(date_string, DATE_FORMAT)
+    except (TypeError, ValueError):
+        return 0
+    return int(parsed.replace(tzinfo=timezone.utc).timestamp())
+
+
+def format_published(published):
+    """
+    Format epoch seconds as a display date such as 'December 15, 2024 at 10:30 AM'
+
+    Returns:
+        str: Date in DATE_FORMAT, or None for an unknown (zero) timestamp
+    """
+    if not published:
+        return None
+    return datetime.fromtimestamp(published, tz=timezone.utc).strftime(DATE_FORMAT)
+
+
+def _intern(value):
+    return sys.intern(value) if value else value
+
+
+class Article:
+    """
+    A stored article
+
+    Uses __slots__ instead of a per-article dict. Categories, authors and
+    sources repeat across thousands of articles, so they are interned and
+    shared; ``published`` is the single source of truth for dates.
+    """
+
+    __slots__ = ('id', 'category', 'published') + ARTICLE_FIELDS
+
+    def __init__(self, id, category, published, title=None, content=None, author=None,
+                 url=None, image_url=None, source=None):
+        self.id = id
+        self.category = _intern(category)
+        self.published = published
+        self.title = title
+        self.content = content
+        self.author = _intern(author)
+        self.url = url
+        self.image_url = image_url
+        self.source = _intern(source)
+
+    @classmethod
+    def from_dict(cls, data, id, category):
+        """
+        Build an Article from an incoming article dict
+
+        ``published`` is taken from the dict when present, otherwise parsed
+        from its display ``date``.
+        """
+        published = data.get('published') or parse_published(data.get('date'))
+        return cls(id, category, published, *(data.get(field) for field in ARTICLE_FIELDS))
+
+    @property
+    def date(self):
+        """Display date, formatted on demand"""
+        return format_published(self.published)
+
+    @property
+    def sort_key(self):
+        """Key ordering articles newest first"""
+        return (-self.published, -self.id)
+
+    def to_dict(self):
+        """Plain dict in the public API article format"""
+        return {
+            'title': self.title,
+            'content': self.content,
+            'author': self.author,
+            'date': self.date,
+            'url': self.url,
+            'image_url': self.image_url,
+            'source': self.source,
+            'id': self.id,
+            'published': self.published,
+            'category': self.category,
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, Article):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Article(id={self.id!r}, category={self.category!r}, title={self.title!r})"
+
+
+def encode_cursor(key):
+    """
+    Encode a (published, id) keyset position as an opaque URL-safe cursor
+
+    Args:
+        key (tuple): (published, id) of the last article on a page
+
+    Returns:
+        str: Cursor string for the next page
+    """
+    raw = '{}.{}'.format(*key).encode('ascii')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor
+
+    Returns:
+        tuple: (published, id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        published, article_id = base64.urlsafe_b64decode(padded).decode('ascii').split('.')
+        return int(published), int(article_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+
+def url_hash(url):
+    """
+    Hash identifying an article by its URL, used to drop duplicates
+
+    Returns:
+        str: Hex digest, or None for articles without a real URL
+    """
+    if not url or url == '#':
+        return None
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+class ArticleStore:
+    """Base class for article stores - subclasses provide the indexed lookups"""
+
+    def add(self, category, article):
+        """
+        Add a single article to a category
+
+        Args:
+            category (str): News category
+            article (dict): Article fields; 'published' (epoch seconds) is
+                parsed from 'date' when missing
+
+        Returns:
+            Article: The stored article, or None if an article with the same
+            URL is already stored
+        """
+        raise NotImplementedError
+
+    def add_many(self, category, articles):
+        """Add several articles to a category and return how many were new"""
+        added = 0
+        for article in articles:
+            if self.add(category, article) is not None:
+                added += 1
+        return added
+
+    def has_category(self, category):
+        """Return True if the category holds at least one article"""
+        raise NotImplementedError
+
+    def categories(self):
+        """Return the names of every category holding articles"""
+        raise NotImplementedError
+
+    def count(self, category):
+        """Return the number of articles in a category"""
+        raise NotImplementedError
+
+    def version(self, category=None):
+        """
+        Return a counter that changes whenever a category changes
+
+        With no category the counter covers the whole store.
+        """
+        raise NotImplementedError
+
+    def modified(self, category=None):
+        """
+        Return when a category (or, with no category, the store) last changed
+
+        Returns:
+            int: Seconds since the epoch, or 0 if it has never changed
+        """
+        raise NotImplementedError
+
+    def page_state(self, category, page_size, before=None, fallback='general'):
+        """
+        Return the version tag and modification time covering a page()
+
+        A short first page is topped up from other categories, so it depends
+        on the whole store; any other page depends only on its category.
+
+        Returns:
+            tuple: (version_tag, modified) - the tag changes whenever the page
+            contents may have changed
+        """
+        if not self.has_category(category):
+            category = fallback
+        if before is None and self.count(category) < page_size:
+            return f"*:{self.version()}", self.modified()
+        return f"{category}:{self.version(category)}", self.modified(category)
+
+    def page_version(self, category, page_size, before=None, fallback='general'):
+        """Return the version tag from page_state()"""
+        return self.page_state(category, page_size, before=before, fallback=fallback)[0]
+
+    def latest(self, category, limit, before=None):
+        """
+        Return up to ``limit`` newest articles in a category
+
+        ``before`` is a (published, id) keyset position; only articles that
+        sort strictly after it (older) are returned.
+        """
+        raise NotImplementedError
+
+    def latest_excluding(self, category, limit):
+        """Return up to ``limit`` newest articles from every other category"""
+        raise NotImplementedError
+
+    def since(self, article_id, limit):
+        """
+        Return up to ``limit`` articles added after ``article_id``, oldest first
+
+        Lets derived indexes (such as search.SearchIndex) catch up with new
+        articles without rescanning the store.
+        """
+        raise NotImplementedError
+
+    def get(self, article_id):
+        """Return the article with id ``article_id``, or None"""
+        raise NotImplementedError
+
+    def last_id(self):
+        """Return the id of the most recently added article, 0 when empty"""
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def fetch(self, category, page_size, fallback='general'):
+        """
+        Fetch a page of articles for a category
+
+        Unknown categories fall back to ``fallback``. If the category holds
+        fewer than ``page_size`` articles the page is topped up with the
+        newest articles from the other categories.
+
+        Args:
+            category (str): News category
+            page_size (int): Number of articles to return
+            fallback (str): Category used when ``category`` is unknown
+
+        Returns:
+            list: Articles, newest first
+        """
+        return self.page(category, page_size, fallback=fallback)[0]
+
+    def page(self, category, page_size, before=None, fallback='general'):
+        """
+        Fetch one keyset-paginated page of articles for a category
+
+        Pages walk the category index from newest to oldest. One extra row is
+        read to tell whether another page exists. A short first page is
+        topped up from the other categories as in fetch(); deeper pages only
+        ever hold articles from the category itself.
+
+        Args:
+            category (str): News category
+            page_size (int): Number of articles to return
+            before (tuple): (published, id) of the last article already seen
+            fallback (str): Category used when ``category`` is unknown
+
+        Returns:
+            tuple: (articles, next_key) where next_key is None on the last page
+        """
+        if page_size < 1:
+            return [], None
+        if not self.has_category(category):
+            category = fallback
+
+        articles = self.latest(category, page_size + 1, before=before)
+        if len(articles) > page_size:
+            del articles[page_size:]
+            last = articles[-1]
+            return articles, (last.published, last.id)
+
+        if before is None and len(articles) < page_size:
+            articles.extend(self.latest_excluding(category, page_size - len(articles)))
+        return articles, None
+
+
+class MemoryArticleStore(ArticleStore):
+    """In-process store keeping one newest-first list per category"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        # category -> parallel lists of sort keys and articles, ordered by key
+        self._keys = {}
+        self._articles = {}
+        self._versions = {}
+        self._version = 0
+        self._modified = {}
+        self._url_hashes = set()
+        self._count = 0
+        # Every article in id order; ids start at 1 and have no gaps
+        self._by_id = []
+
+    def add(self, category, article):
+        digest = url_hash(article.get('url'))
+        with self._lock:
+            if digest is not None:
+                if digest in self._url_hashes:
+                    return None
+                self._url_hashes.add(digest)
+
+            stored = Article.from_dict(article, next(self._ids), category)
+
+            # Negated so ascending list order is newest first
+            key = stored.sort_key
+            keys = self._keys.setdefault(category, [])
+            articles = self._articles.setdefault(category, [])
+            position = bisect_left(keys, key)
+            keys.insert(position, key)
+            articles.insert(position, stored)
+            self._by_id.append(stored)
+            self._versions[category] = self._versions.get(category, 0) + 1
+            self._version += 1
+            self._modified[category] = int(time.time())
+            self._count += 1
+        return stored
+
+    def has_category(self, category):
+        return category in self._articles
+
+    def categories(self):
+        return list(self._articles)
+
+    def count(self, category):
+        return len(self._articles.get(category, ()))
+
+    def version(self, category=None):
+        if category is None:
+            return self._version
+        return self._versions.get(category, 0)
+
+    def modified(self, category=None):
+        if category is None:
+            with self._lock:
+                return max(self._modified.values(), default=0)
+        return self._modified.get(category, 0)
+
+    # Reads that walk the lists take the lock too: the ingester thread may
+    # be inserting into them (or adding a category) at the same time
+
+    def latest(self, category, limit, before=None):
+        with self._lock:
+            articles = self._articles.get(category, [])
+            start = 0
+            if before is not None:
+                published, article_id = before
+                start = bisect_right(self._keys[category], (-published, -article_id))
+            return articles[start:start + limit]
+
+    def latest_excluding(self, category, limit):
+        with self._lock:
+            others = [
+                zip(self._keys[name], self._articles[name])
+                for name in self._articles
+                if name != category
+            ]
+            merged = heapq.merge(*others, key=itemgetter(0))
+            return [article for _, article in itertools.islice(merged, limit)]
+
+    def since(self, article_id, limit):
+        return self._by_id[article_id:article_id + limit]
+
+    def get(self, article_id):
+        if 0 < article_id <= len(self._by_id):
+            return self._by_id[article_id - 1]
+        return None
+
+    def last_id(self):
+        return len(self._by_id)
+
+    def __len__(self):
+        return self._count
+
+
+class SQLiteArticleStore(ArticleStore):
+    """SQLite-backed store; the indexes mirror the in-memory category lists"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS articles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL,
+            published INTEGER NOT NULL,
+            title TEXT,
+            content TEXT,
+            author TEXT,
+            url TEXT,
+            image_url TEXT,
+            source TEXT,
+            url_hash TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_articles_category
+            ON articles (category, published DESC, id DESC);
+        CREATE INDEX IF NOT EXISTS idx_articles_published
+            ON articles (published DESC, id DESC);
+        CREATE TABLE IF NOT EXISTS categories (
+            category TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            article_count INTEGER NOT NULL,
+            modified INTEGER NOT NULL DEFAULT 0
+        );
+    """
+
+    # Columns added after a table was first released: (table, column, definition)
+    MIGRATIONS = (
+        ('categories', 'modified', 'INTEGER NOT NULL DEFAULT 0'),
+        ('articles', 'url_hash', 'TEXT'),
+    )
+
+    COLUMNS = 'id, category, published, ' + ', '.join(ARTICLE_FIELDS)
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        # Connections must not cross a fork (gunicorn preload_app), so each
+        # process opens its own on first use
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            if self.path != ':memory:':
+                conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(self.SCHEMA)
+            self._migrate(conn)
+            with conn:
+                # Backfill the per-category counters for databases created
+                # before the categories table existed
+                if conn.execute('SELECT COUNT(*) FROM categories').fetchone()[0] == 0:
+                    conn.execute(
+                        'INSERT INTO categories (category, version, article_count, modified) '
+                        'SELECT category, 1, COUNT(*), ? FROM articles GROUP BY category',
+                        (int(time.time()),),
+                    )
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _migrate(self, conn):
+        for table, column, definition in self.MIGRATIONS:
+            columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+            if column not in columns:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+        conn.execute(
+            'CREATE UNIQUE INDEX IF NOT EXISTS idx_articles_url_hash '
+            'ON articles (url_hash) WHERE url_hash IS NOT NULL'
+        )
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            rows = self._connection().execute(sql, params).fetchall()
+        return [Article(*row) for row in rows]
+
+    def _insert(self, conn, category, article):
+        published = article.get('published') or parse_published(article.get('date'))
+        values = [article.get(field) for field in ARTICLE_FIELDS]
+        cursor = conn.execute(
+            'INSERT OR IGNORE INTO articles (category, published, url_hash, {}) '
+            'VALUES (?, ?, ?, {})'.format(
+                ', '.join(ARTICLE_FIELDS), ', '.join('?' * len(ARTICLE_FIELDS))
+            ),
+            [category, published, url_hash(article.get('url'))] + values,
+        )
+        if cursor.rowcount == 0:
+            # Same URL already stored
+            return None
+        conn.execute(
+            'INSERT INTO categories (category, version, article_count, modified) '
+            'VALUES (?, 1, 1, ?) ON CONFLICT (category) DO UPDATE SET '
+            'version = version + 1, article_count = article_count + 1, '
+            'modified = excluded.modified',
+            (category, int(time.time())),
+        )
+        return Article(cursor.lastrowid, category, published, *values)
+
+    def add(self, category, article):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                return self._insert(conn, category, article)
+
+    def add_many(self, category, articles):
+        # One transaction for the whole batch
+        added = 0
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                for article in articles:
+                    if self._insert(conn, category, article) is not None:
+                        added += 1
+        return added
+
+    def _scalar(self, sql, params=()):
+        with self._lock:
+            row = self._connection().execute(sql, params).fetchone()
+        return row[0] if row else None
+
+    def has_category(self, category):
+        return self._scalar('SELECT 1 FROM categories WHERE category = ?', (category,)) is not None
+
+    def categories(self):
+        with self._lock:
+            return [row[0] for row in self._connection().execute('SELECT category FROM categories')]
+
+    def count(self, category):
+        return self._scalar(
+            'SELECT article_count FROM categories WHERE category = ?', (category,)
+        ) or 0
+
+    def version(self, category=None):
+        if category is None:
+            # Per-category versions only grow, so their sum changes on any write
+            return int(self._scalar('SELECT total(version) FROM categories'))
+        return self._scalar('SELECT version FROM categories WHERE category = ?', (category,)) or 0
+
+    def modified(self, category=None):
+        if category is None:
+            return self._scalar('SELECT MAX(modified) FROM categories') or 0
+        return self._scalar('SELECT modified FROM categories WHERE category = ?', (category,)) or 0
+
+    def latest(self, category, limit, before=None):
+        if before is None:
+            return self._query(
+                'SELECT {} FROM articles WHERE category = ? '
+                'ORDER BY published DESC, id DESC LIMIT ?'.format(self.COLUMNS),
+                (category, limit),
+            )
+        return self._query(
+            'SELECT {} FROM articles WHERE category = ? AND (published, id) < (?, ?) '
+            'ORDER BY published DESC, id DESC LIMIT ?'.format(self.COLUMNS),
+            (category, before[0], before[1], limit),
+        )
+
+    def latest_excluding(self, category, limit):
+        return self._query(
+            'SELECT {} FROM articles WHERE category != ? '
+            'ORDER BY published DESC, id DESC LIMIT ?'.format(self.COLUMNS),
+            (category, limit),
+        )
+
+    def since(self, article_id, limit):
+        return self._query(
+            'SELECT {} FROM articles WHERE id > ? ORDER BY id LIMIT ?'.format(self.COLUMNS),
+            (article_id, limit),
+        )
+
+    def get(self, article_id):
+        found = self._query('SELECT {} FROM articles WHERE id = ?'.format(self.COLUMNS), (article_id,))
+        return found[0] if found else None
+
+    def last_id(self):
+        return int(self._scalar('SELECT coalesce(max(id), 0) FROM articles'))
+
+    def __len__(self):
+        with self._lock:
+            return self._connection().execute(
+                'SELECT CAST(total(article_count) AS INTEGER) FROM categories'
+            ).fetchone()[0]
+
+
+def create_store(url):
+    """
+    Build an article store from a URL
+
+    Args:
+        url (str): ``memory://``, ``sqlite:///path/to/news.db`` or
+            ``snapshot:///path/to/news.snap``
+
+    Returns:
+        ArticleStore: The configured store
+    """
+    if url.startswith('snapshot:///'):
+        from snapshot import SnapshotArticleStore
+        return SnapshotArticleStore(url[len('snapshot:///'):])
+    if url.startswith('sqlite:///'):
+        return SQLiteArticleStore(url[len('sqlite:///'):] or ':memory:')
+    if url.startswith('memory://'):
+        return MemoryArticleStore()
+    raise ValueError(f"Unsupported article store URL: {url}")
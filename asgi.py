@@ -0,0 +1,22 @@
+"""
+ASGI entry point for the Flask News Website
+
+Used by the "uvicorn" worker profile in gunicorn.conf.py:
+
+    GUNICORN_WORKER_CLASS=uvicorn gunicorn -c gunicorn.conf.py asgi:application
+
+or directly with ``uvicorn asgi:application``.
+
+Article streams (/api/news/<category>/stream) are served on the event loop
+by news_stream.StreamingASGI; everything else goes through a2wsgi's WSGI
+adapter, which runs the Flask app in a thread pool. (asgiref's WsgiToAsgi
+funnels every request through one thread-sensitive executor and fails
+alternate requests on a keep-alive connection under uvicorn.)
+"""
+
+from a2wsgi import WSGIMiddleware
+
+from app import app, open_news_stream
+from news_stream import StreamingASGI
+
+application = StreamingASGI(WSGIMiddleware(app), open_news_stream)
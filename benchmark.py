@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Load-testing and benchmark suite for the Flask News Website
+
+For every corpus size and gunicorn worker profile this:
+
+    1. generates (once, then reuses) a synthetic SQLite article corpus
+    2. starts gunicorn with gunicorn.conf.py on a free local port
+    3. drives /, /news?category=, /api/news/<category> and POST /contact
+       in turn at a fixed concurrency over keep-alive connections
+    4. records p50/p99 latency, throughput, errors and the RSS of every
+       worker, then stops gunicorn
+
+Results are printed as a table and written as JSON, which can be compared
+with an earlier run to spot regressions between commits:
+
+    python benchmark.py --sizes 1k,100k --output bench/baseline.json
+    python benchmark.py --sizes 1k,100k --compare bench/baseline.json
+
+The load generator runs in this process, so on a small machine it shares
+CPU with the server: compare runs made on the same machine and settings.
+Rate limiting is switched off for the run so the numbers measure the app,
+not the limiter.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from urllib.parse import urlencode
+
+from article_store import DATE_FORMAT, SQLiteArticleStore
+
+PROJECT_ROOT = Path(__file__).parent
+CATEGORIES = ('general', 'business', 'entertainment', 'health', 'science', 'sports', 'technology')
+SIZES = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+WORDS = """
+    market growth energy climate vaccine research league final championship
+    startup funding quantum network security policy election court museum
+    festival record launch satellite ocean battery chip model data health
+    study patients doctors trial season coach transfer stadium film series
+    album award streaming economy inflation rates bank trade exports city
+""".split()
+
+CONTACT_FORM = urlencode({
+    'name': 'Bench Mark',
+    'email': 'bench@example.com',
+    'subject': 'Benchmark message',
+    'message': 'Synthetic contact form submission from benchmark.py',
+}).encode('ascii')
+
+
+def generate_corpus(path, size, seed=42, batch=5000):
+    """
+    Write a synthetic corpus of ``size`` articles to a SQLite article store
+
+    The same size and seed always produce the same articles.
+    """
+    rng = random.Random(seed)
+    store = SQLiteArticleStore(str(path))
+    start = datetime(2024, 12, 15, tzinfo=timezone.utc)
+
+    written = 0
+    while written < size:
+        count = min(batch, size - written)
+        by_category = {}
+        for i in range(written, written + count):
+            published = start - timedelta(seconds=rng.randrange(365 * 86400))
+            title = ' '.join(rng.choices(WORDS, k=8)).capitalize()
+            by_category.setdefault(rng.choice(CATEGORIES), []).append({
+                'title': title,
+                'content': ' '.join(rng.choices(WORDS, k=40)).capitalize() + '.',
+                'author': f"Reporter {rng.randrange(200)}",
+                'date': published.strftime(DATE_FORMAT),
+                'published': int(published.timestamp()),
+                'url': f"https://bench.example/{seed}/{i}",
+                'image_url': None,
+                'source': f"Bench Source {rng.randrange(20)}",
+            })
+        for category, articles in by_category.items():
+            store.add_many(category, articles)
+        written += count
+    return path
+
+
+def corpus_path(data_dir, label, seed):
+    path = Path(data_dir) / f"corpus-{label}-{seed}.db"
+    if not path.exists():
+        print(f"📦 Generating {label} corpus ({SIZES[label]:,} articles)...")
+        began = time.perf_counter()
+        temp = path.with_suffix('.tmp')
+        for leftover in path.parent.glob(temp.name + '*'):
+            leftover.unlink()
+        generate_corpus(temp, SIZES[label], seed)
+        os.replace(temp, path)
+        print(f"   done in {time.perf_counter() - began:.1f}s")
+    return path
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Server:
+    """A gunicorn process serving app:app against one corpus"""
+
+    def __init__(self, corpus, profile, workers, scratch):
+        self.port = free_port()
+        env = dict(
+            os.environ,
+            ARTICLE_STORE_URL=f"sqlite:///{corpus}",
+            GUNICORN_WORKER_CLASS=profile,
+            RATE_LIMIT_ENABLED='False',
+            CONTACT_QUEUE_PATH=str(Path(scratch) / 'contact_queue.db'),
+            METRICS_URL='memory://',
+            INGEST_MODE='off',
+        )
+        env.pop('MAIL_SERVER', None)
+        application = 'asgi:application' if profile == 'uvicorn' else 'app:app'
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+             '--bind', f"127.0.0.1:{self.port}", '--workers', str(workers),
+             '--access-logfile', '/dev/null', '--error-logfile', str(Path(scratch) / 'gunicorn.log'),
+             application],
+            cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+
+    def wait_ready(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with status {self.process.returncode}")
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+                conn.request('GET', '/about')
+                conn.getresponse().read()
+                conn.close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError('gunicorn did not start in time')
+
+    def worker_rss(self):
+        """
+        RSS of each worker process from /proc (Linux only)
+
+        Returns:
+            list: {'pid', 'rss_kb', 'peak_rss_kb'} per worker
+        """
+        workers = []
+        for stat in Path('/proc').glob('[0-9]*/stat'):
+            try:
+                fields = stat.read_text().rsplit(')', 1)[1].split()
+                if int(fields[1]) != self.process.pid:
+                    continue
+                status = dict(
+                    line.split(':', 1) for line in (stat.parent / 'status').read_text().splitlines()
+                    if ':' in line
+                )
+            except (OSError, IndexError, ValueError):
+                continue
+            workers.append({
+                'pid': int(stat.parent.name),
+                'rss_kb': int(status['VmRSS'].split()[0]),
+                'peak_rss_kb': int(status['VmHWM'].split()[0]),
+            })
+        return sorted(workers, key=lambda worker: worker['pid'])
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+def scenarios():
+    """(name, method, path factory, body) for every benchmarked route"""
+    return [
+        ('home', 'GET', lambda rng: '/', None),
+        ('news', 'GET', lambda rng: f"/news?category={rng.choice(CATEGORIES)}", None),
+        ('api_news', 'GET', lambda rng: f"/api/news/{rng.choice(CATEGORIES)}?page_size=10", None),
+        ('contact', 'POST', lambda rng: '/contact', CONTACT_FORM),
+    ]
+
+
+def drive(port, method, make_path, body, concurrency, duration, warmup=1.0):
+    """
+    Send requests from ``concurrency`` keep-alive clients for ``duration`` seconds
+
+    Returns:
+        dict: requests, errors, p50_ms, p99_ms and rps
+    """
+    headers = {'Accept-Encoding': 'gzip'}
+    if body is not None:
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    started = time.monotonic()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    def client(number):
+        rng = random.Random(number)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local, failed = [], 0
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            began = time.perf_counter()
+            try:
+                conn.request(method, make_path(rng), body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                ok = False
+            elapsed = time.perf_counter() - began
+            if now >= measure_from:
+                if ok:
+                    local.append(elapsed)
+                else:
+                    failed += 1
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+
+    def percentile(fraction):
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000, 3)
+
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'p50_ms': percentile(0.50),
+        'p99_ms': percentile(0.99),
+        'rps': round(len(latencies) / duration, 1),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    results = []
+    data_dir = Path(args.data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    for label in args.sizes:
+        corpus = corpus_path(data_dir, label, args.seed)
+        for profile in args.profiles:
+            with tempfile.TemporaryDirectory() as scratch:
+                print(f"\n🚀 {label} corpus, {profile} x{args.workers} workers, concurrency {args.concurrency}")
+                server = Server(corpus, profile, args.workers, scratch)
+                try:
+                    server.wait_ready()
+                    for name, method, make_path, body in scenarios():
+                        if args.routes and name not in args.routes:
+                            continue
+                        stats = drive(server.port, method, make_path, body, args.concurrency, args.duration)
+                        result = dict(corpus=label, profile=profile, route=name, **stats)
+                        results.append(result)
+                        print(
+                            f"   {name:<10} {stats['rps']:>9.1f} req/s   p50 {stats['p50_ms']} ms   "
+                            f"p99 {stats['p99_ms']} ms   errors {stats['errors']}"
+                        )
+                    rss = server.worker_rss()
+                    for result in results:
+                        if result['corpus'] == label and result['profile'] == profile:
+                            result['worker_rss_kb'] = [worker['rss_kb'] for worker in rss]
+                            result['worker_peak_rss_kb'] = [worker['peak_rss_kb'] for worker in rss]
+                    if rss:
+                        sizes = ', '.join(f"{worker['rss_kb'] / 1024:.1f}" for worker in rss)
+                        print(f"   worker RSS (MB): {sizes}")
+                finally:
+                    server.stop()
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'workers': args.workers,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    Print per-route changes against a baseline run
+
+    Returns:
+        bool: True if any p99 latency got worse by more than ``threshold`` percent
+    """
+    previous = {(r['corpus'], r['profile'], r['route']): r for r in baseline['results']}
+    regressed = False
+    print(f"\n📊 Compared with {baseline['meta'].get('commit') or 'baseline'}:")
+    for result in current['results']:
+        key = (result['corpus'], result['profile'], result['route'])
+        old = previous.get(key)
+        if old is None or not old['p99_ms'] or not result['p99_ms']:
+            continue
+        rps_change = (result['rps'] - old['rps']) / old['rps'] * 100 if old['rps'] else 0.0
+        p99_change = (result['p99_ms'] - old['p99_ms']) / old['p99_ms'] * 100
+        flag = ''
+        if p99_change > threshold:
+            flag = '  ⚠️  regression'
+            regressed = True
+        print(f"   {'/'.join(key):<32} rps {rps_change:+6.1f}%   p99 {p99_change:+6.1f}%{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the app under gunicorn')
+    parser.add_argument('--sizes', default='1k,100k,1m', help=f"corpus sizes from {', '.join(SIZES)}")
+    parser.add_argument('--profiles', default='sync', help='gunicorn worker profiles (sync, gevent, uvicorn)')
+    parser.add_argument('--routes', default='', help='only these scenarios (home, news, api_news, contact)')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0, help='measured seconds per route')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', default='bench', help='where generated corpora are kept')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='baseline JSON from an earlier run')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='p99 increase (percent) reported as a regression')
+    args = parser.parse_args()
+
+    args.sizes = [size.strip().lower() for size in args.sizes.split(',') if size.strip()]
+    args.profiles = [profile.strip() for profile in args.profiles.split(',') if profile.strip()]
+    args.routes = [route.strip() for route in args.routes.split(',') if route.strip()]
+    unknown = [size for size in args.sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown corpus size(s): {', '.join(unknown)}")
+
+    report = run(args)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(report, indent=2) + '\n')
+        print(f"\n💾 Results written to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,90 @@
+"""
+Cached news card HTML for the Flask News Website
+
+A card depends only on its article, and articles never change once stored,
+so each card body is rendered from templates/_news_card.html once and kept
+in a bounded LRU keyed by article id. Pages and the HTML API variant are
+then built by joining cached strings instead of re-running the template
+loop for every article.
+
+The position-dependent wrapper (the entrance animation delay) is added
+while joining, so the same cached body serves every page an article
+appears on.
+"""
+
+import threading
+from collections import OrderedDict
+
+from markupsafe import Markup, escape
+
+CARD_TEMPLATE = '_news_card.html'
+
+# Cards animate in one after another, restarting every page of 12
+ANIMATION_STEP_MS = 100
+ANIMATION_CYCLE = 12
+
+
+class CardCache:
+    """LRU of rendered card bodies, keyed by article id"""
+
+    def __init__(self, jinja_env, max_entries=20000, enabled=True):
+        """
+        Args:
+            jinja_env (jinja2.Environment): Environment to render cards with
+            max_entries (int): Number of cards kept
+            enabled (bool): When False every card is rendered afresh (debug
+                mode, where templates reload on change)
+        """
+        self.jinja_env = jinja_env
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._cards = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def card(self, article):
+        """Return the rendered body of one article's card"""
+        if self.enabled:
+            with self._lock:
+                html = self._cards.get(article.id)
+                if html is not None:
+                    self._cards.move_to_end(article.id)
+                    self.hits += 1
+                    return html
+
+        html = self.jinja_env.get_template(CARD_TEMPLATE).render(article=article)
+        if self.enabled:
+            with self._lock:
+                self.misses += 1
+                self._cards[article.id] = html
+                while len(self._cards) > self.max_entries:
+                    self._cards.popitem(last=False)
+        return html
+
+    def render(self, articles, offset=0):
+        """
+        Join the cards for a list of articles
+
+        Args:
+            articles (list): Articles to show
+            offset (int): Number of cards already on the page, so animation
+                delays continue where the previous page left off
+
+        Returns:
+            Markup: The <article class="news-card"> elements
+        """
+        parts = []
+        for index, article in enumerate(articles, offset):
+            delay = index % ANIMATION_CYCLE * ANIMATION_STEP_MS
+            parts.append(
+                f'<article class="news-card" data-article-id="{article.id}" '
+                f'data-category="{escape(article.category)}" '
+                f'data-aos="fade-up" data-aos-delay="{delay}">\n'
+                f'{self.card(article)}</article>\n'
+            )
+        return Markup(''.join(parts))
+
+    def clear(self):
+        with self._lock:
+            self._cards.clear()
@@ -0,0 +1,273 @@
+"""
+Dynamic response compression for the Flask News Website
+
+CompressionMiddleware wraps the WSGI app and compresses HTML, JSON and other
+text responses with the best encoding the client accepts: zstd or brotli
+when the optional ``zstandard`` / ``brotli`` packages are installed, gzip
+otherwise. Buffered responses below ``min_size`` are left alone; streamed
+responses (no Content-Length) are compressed chunk by chunk with a flush
+after each chunk so the client sees data as soon as it is produced.
+
+Responses that already carry a Content-Encoding pass straight through. The
+app uses that to cache compressed page bodies (see cached_render in app.py)
+instead of recompressing them on every request.
+"""
+
+import zlib
+from functools import lru_cache
+
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = frozenset({
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/javascript',
+    'application/javascript',
+    'application/json',
+    'application/x-ndjson',
+    'image/svg+xml',
+})
+
+DEFAULT_LEVELS = {'zstd': 3, 'br': 5, 'gzip': 6}
+
+
+def available_encodings():
+    """Encodings this process can produce, in order of server preference"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+    encodings.append('gzip')
+    return tuple(encodings)
+
+
+class _GzipStream:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class _ZstdStream:
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data) + \
+            self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+_STREAMS = {'gzip': _GzipStream, 'br': _BrotliStream, 'zstd': _ZstdStream}
+
+
+class Compressor:
+    """Encoding negotiation and compression settings shared by the app and middleware"""
+
+    def __init__(self, level=None, min_size=500, levels=None):
+        """
+        Args:
+            level (int): gzip compression level (1-9)
+            min_size (int): Buffered bodies smaller than this are sent as-is
+            levels (dict): Per-encoding levels overriding DEFAULT_LEVELS
+        """
+        self.levels = dict(DEFAULT_LEVELS, **(levels or {}))
+        if level is not None:
+            self.levels['gzip'] = level
+        self.min_size = min_size
+        self.encodings = available_encodings()
+        self.negotiate = lru_cache(maxsize=256)(self._negotiate)
+
+    def _negotiate(self, accept_encoding):
+        """
+        Pick the encoding for an Accept-Encoding header
+
+        Returns:
+            str: 'zstd', 'br' or 'gzip', or None for an uncompressed response
+        """
+        if not accept_encoding:
+            return None
+        accepted = parse_accept_header(accept_encoding)
+        best, best_quality = None, 0
+        for encoding in self.encodings:
+            quality = accepted[encoding]
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def compress(self, data, encoding):
+        """Compress a complete body in one call"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        level = self.levels[encoding]
+        if encoding == 'gzip':
+            return zlib.compress(data, level, wbits=31)
+        if encoding == 'br':
+            return brotli.compress(data, quality=level)
+        return zstandard.ZstdCompressor(level=level).compress(data)
+
+    def stream(self, chunks, encoding):
+        """Compress an iterable of chunks, flushing after each non-empty chunk"""
+        stream = _STREAMS[encoding](self.levels[encoding])
+        for chunk in chunks:
+            if chunk:
+                yield stream.compress(chunk)
+        yield stream.finish()
+
+    def compress_response(self, response, encoding):
+        """
+        Compress a Flask/Werkzeug response object in place
+
+        Leaves the response untouched when there is no encoding, the body is
+        streamed, already encoded, not a text type or below min_size.
+        """
+        response.vary.add('Accept-Encoding')
+        if (
+            encoding is None
+            or response.status_code != 200
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES
+        ):
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+        response.set_data(self.compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+class CompressionMiddleware:
+    """WSGI middleware compressing text responses the app left uncompressed"""
+
+    def __init__(self, app, compressor):
+        self.app = app
+        self.compressor = compressor
+
+    def __call__(self, environ, start_response):
+        encoding = self.compressor.negotiate(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None or environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.app(environ, start_response)
+
+        captured = {}
+        written = []
+
+        def capture_start_response(status, headers, exc_info=None):
+            captured['status'] = status
+            captured['headers'] = headers
+            captured['exc_info'] = exc_info
+            return written.append
+
+        app_iter = self.app(environ, capture_start_response)
+        status = captured['status']
+        headers = Headers(captured['headers'])
+
+        def passthrough():
+            start_response(status, captured['headers'], captured['exc_info'])
+            if not written:
+                return app_iter
+            return _ClosingIterator(self._chain(written, app_iter), app_iter)
+
+        if not self._should_compress(status, headers):
+            return passthrough()
+
+        length = headers.get('Content-Length', type=int)
+        if length is not None and length < self.compressor.min_size:
+            return passthrough()
+
+        self._mark_encoded(headers, encoding)
+
+        if length is None:
+            # Streamed body: compress and flush chunk by chunk
+            start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+            return _ClosingIterator(
+                self.compressor.stream(self._chain(written, app_iter), encoding), app_iter
+            )
+
+        # Buffered body: compress in one shot
+        try:
+            data = b''.join(self._chain(written, app_iter))
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+        data = self.compressor.compress(data, encoding)
+        headers['Content-Length'] = str(len(data))
+        start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+        return [data]
+
+    @staticmethod
+    def _should_compress(status, headers):
+        if not status.startswith('200'):
+            return False
+        if 'Content-Encoding' in headers or 'Content-Range' in headers:
+            return False
+        if 'no-transform' in headers.get('Cache-Control', ''):
+            return False
+        mimetype = headers.get('Content-Type', '').split(';')[0].strip()
+        return mimetype in COMPRESSIBLE_TYPES
+
+    @staticmethod
+    def _mark_encoded(headers, encoding):
+        headers['Content-Encoding'] = encoding
+        vary = headers.get('Vary')
+        if not vary:
+            headers['Vary'] = 'Accept-Encoding'
+        elif 'accept-encoding' not in vary.lower():
+            headers['Vary'] = f"{vary}, Accept-Encoding"
+        # A strong validator must not be shared by the compressed and
+        # uncompressed representations
+        etag = headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            headers['ETag'] = f"W/{etag}"
+
+    @staticmethod
+    def _chain(written, app_iter):
+        yield from written
+        yield from app_iter
+
+
+class _ClosingIterator:
+    """Iterate a compressed stream, closing the wrapped app iterable afterwards"""
+
+    def __init__(self, iterable, app_iter):
+        self._iterable = iterable
+        self._app_iter = app_iter
+
+    def __iter__(self):
+        return iter(self._iterable)
+
+    def close(self):
+        if hasattr(self._app_iter, 'close'):
+            self._app_iter.close()
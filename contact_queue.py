@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Durable contact form queue for the Flask News Website
+
+contact() only appends the submission to a SQLite (WAL) queue, which takes
+well under a millisecond, and returns. A background ContactWorker drains
+the queue:
+
+    - claims a batch of submissions with a lease, so several workers (one
+      per gunicorn process, or ``python contact_queue.py``) never deliver
+      the same message twice
+    - copies the whole batch into the contact_messages table in one
+      transaction
+    - emails each message over one pooled SMTP connection, retrying with
+      exponential backoff when the mail server is down or slow
+
+Submissions survive restarts: anything not yet delivered is still in the
+queue file and is picked up again once its lease expires.
+
+smtp_sink.py runs a local SMTP server for trying this out.
+"""
+
+import logging
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+from email.message import EmailMessage
+
+logger = logging.getLogger(__name__)
+
+# Submissions claimed per round
+BATCH_SIZE = 50
+# Seconds a claimed batch is reserved for the claiming worker
+LEASE_SECONDS = 120
+# Give up on a message after this many failed deliveries
+MAX_ATTEMPTS = 8
+
+
+class ContactQueue:
+    """SQLite-backed queue of contact form submissions"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS contact_queue (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            message TEXT NOT NULL,
+            received REAL NOT NULL,
+            stored INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            available REAL NOT NULL,
+            error TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_contact_queue_available ON contact_queue (available);
+        CREATE TABLE IF NOT EXISTS contact_messages (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            message TEXT NOT NULL,
+            received REAL NOT NULL,
+            delivered REAL
+        );
+    """
+
+    FIELDS = ('id', 'name', 'email', 'subject', 'message', 'received', 'stored', 'attempts')
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        # Set on enqueue so a worker in the same process starts at once
+        self.ready = threading.Event()
+
+    def _connection(self):
+        # One connection per process; never reuse one inherited across fork
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            # WAL + NORMAL: commits survive a crash of the process, and only
+            # a power loss can drop the last few
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def enqueue(self, name, email, subject, message):
+        """
+        Add a submission to the queue
+
+        Returns:
+            int: The submission id
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                cursor = conn.execute(
+                    'INSERT INTO contact_queue (name, email, subject, message, received, available) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (name, email, subject, message, now, now),
+                )
+        self.ready.set()
+        return cursor.lastrowid
+
+    def claim(self, limit=BATCH_SIZE, lease=LEASE_SECONDS):
+        """
+        Reserve up to ``limit`` due submissions for ``lease`` seconds
+
+        Returns:
+            list: Submissions as dicts
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                rows = conn.execute(
+                    'UPDATE contact_queue SET available = ? WHERE id IN ('
+                    '  SELECT id FROM contact_queue WHERE available <= ? ORDER BY id LIMIT ?'
+                    ') RETURNING {}'.format(', '.join(self.FIELDS)),
+                    (now + lease, now, limit),
+                ).fetchall()
+        return sorted((dict(row) for row in rows), key=lambda row: row['id'])
+
+    def store(self, submissions):
+        """Copy submissions into contact_messages in one transaction"""
+        pending = [s for s in submissions if not s['stored']]
+        if not pending:
+            return
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    'INSERT OR IGNORE INTO contact_messages (id, name, email, subject, message, received) '
+                    'VALUES (:id, :name, :email, :subject, :message, :received)',
+                    pending,
+                )
+                conn.executemany(
+                    'UPDATE contact_queue SET stored = 1 WHERE id = ?', [(s['id'],) for s in pending]
+                )
+        for submission in pending:
+            submission['stored'] = 1
+
+    def complete(self, delivered):
+        """Remove delivered submissions from the queue"""
+        if not delivered:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    'UPDATE contact_messages SET delivered = ? WHERE id = ?',
+                    [(now, s['id']) for s in delivered],
+                )
+                conn.executemany('DELETE FROM contact_queue WHERE id = ?', [(s['id'],) for s in delivered])
+
+    def retry(self, submission, error):
+        """Put a failed submission back with exponential backoff, or drop it"""
+        attempts = submission['attempts'] + 1
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                if attempts >= MAX_ATTEMPTS:
+                    logger.error("Giving up on contact message %s: %s", submission['id'], error)
+                    conn.execute('DELETE FROM contact_queue WHERE id = ?', (submission['id'],))
+                    return
+                conn.execute(
+                    'UPDATE contact_queue SET attempts = ?, available = ?, error = ? WHERE id = ?',
+                    (attempts, time.time() + min(3600, 2 ** attempts * 5), str(error), submission['id']),
+                )
+
+    def __len__(self):
+        with self._lock:
+            return self._connection().execute('SELECT COUNT(*) FROM contact_queue').fetchone()[0]
+
+
+def one_line(value):
+    """``value`` with any line breaks replaced by spaces, for a mail header"""
+    return ' '.join(value.splitlines())
+
+
+class Mailer:
+    """Sends contact messages over one reused SMTP connection"""
+
+    def __init__(self, host, port=25, use_tls=False, username=None, password=None,
+                 sender=None, recipient=None, timeout=10):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.sender = sender or username or 'noreply@localhost'
+        self.recipient = recipient or self.sender
+        self.timeout = timeout
+        self._smtp = None
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password)
+        return smtp
+
+    def build(self, submission):
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = self.recipient
+        # Headers come from the form: a line break would inject more of them
+        # (and EmailMessage refuses it), so keep each on one line
+        message['Reply-To'] = one_line(f"{submission['name']} <{submission['email']}>")
+        message['Subject'] = one_line(f"[Contact] {submission['subject']}")
+        message.set_content(
+            f"From: {submission['name']} <{submission['email']}>\n\n{submission['message']}\n"
+        )
+        return message
+
+    def send(self, submission):
+        """Send one message, reconnecting once if the pooled connection dropped"""
+        message = self.build(submission)
+        for attempt in (1, 2):
+            if self._smtp is None:
+                self._smtp = self._connect()
+            try:
+                self._smtp.send_message(message)
+                return
+            except smtplib.SMTPServerDisconnected:
+                self._smtp = None
+                if attempt == 2:
+                    raise
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+
+class ContactWorker:
+    """Drains a ContactQueue in a background thread"""
+
+    def __init__(self, queue, mailer=None, poll_interval=2.0):
+        """
+        Args:
+            queue (ContactQueue): Queue to drain
+            mailer (Mailer): Delivers messages; with None, submissions are
+                only stored in contact_messages
+            poll_interval (float): Seconds between checks for submissions
+                queued by other processes
+        """
+        self.queue = queue
+        self.mailer = mailer
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def process_batch(self):
+        """
+        Store and deliver one claimed batch
+
+        Returns:
+            int: Number of submissions claimed
+        """
+        batch = self.queue.claim()
+        if not batch:
+            return 0
+        self.queue.store(batch)
+
+        delivered, error = [], None
+        try:
+            for submission in batch:
+                if self.mailer is not None:
+                    if error is None:
+                        try:
+                            self.mailer.send(submission)
+                        except (smtplib.SMTPException, OSError) as e:
+                            # Back off the rest of the batch too instead of
+                            # waiting out the same failure for every message
+                            logger.warning("Contact message %s not delivered: %s", submission['id'], e)
+                            self.mailer.close()
+                            error = e
+                        except Exception as e:
+                            # Something wrong with this message alone; the
+                            # others are still delivered
+                            logger.warning("Contact message %s not delivered: %s", submission['id'], e)
+                            self.queue.retry(submission, e)
+                            continue
+                    if error is not None:
+                        self.queue.retry(submission, error)
+                        continue
+                delivered.append(submission)
+        finally:
+            # Sent messages are acked even if the batch stopped early, so
+            # they are not sent again when the lease runs out
+            self.queue.complete(delivered)
+        return len(batch)
+
+    def drain(self):
+        """Process batches until nothing is due"""
+        total = 0
+        while True:
+            claimed = self.process_batch()
+            total += claimed
+            if claimed < BATCH_SIZE:
+                return total
+
+    def run(self):
+        """Drain until stop() is called"""
+        while not self._stop.is_set():
+            self.queue.ready.clear()
+            try:
+                self.drain()
+            except Exception as e:
+                logger.warning("Contact worker error: %s", e)
+            self.queue.ready.wait(self.poll_interval)
+        if self.mailer is not None:
+            self.mailer.close()
+
+    def start(self):
+        """Run the worker in a daemon thread"""
+        self._thread = threading.Thread(target=self.run, name='contact-worker', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        self.queue.ready.set()
+
+
+def mailer_from_env(environ=os.environ):
+    """Build a Mailer from the MAIL_* settings, or None if MAIL_SERVER is unset"""
+    host = environ.get('MAIL_SERVER')
+    if not host:
+        return None
+    return Mailer(
+        host,
+        port=int(environ.get('MAIL_PORT', 25)),
+        use_tls=environ.get('MAIL_USE_TLS', 'False').lower() == 'true',
+        username=environ.get('MAIL_USERNAME'),
+        password=environ.get('MAIL_PASSWORD'),
+        sender=environ.get('MAIL_SENDER'),
+        recipient=environ.get('CONTACT_RECIPIENT'),
+    )
+
+
+def main():
+    """Run the contact worker as a standalone process"""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    queue = ContactQueue(os.environ.get('CONTACT_QUEUE_PATH', 'contact_queue.db'))
+    worker = ContactWorker(queue, mailer_from_env())
+    print(f"📬 Delivering contact messages from {queue.path} (Ctrl+C to stop)")
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        worker.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
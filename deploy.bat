@@ -23,6 +23,17 @@ REM Install dependencies
 echo 📥 Installing dependencies...
 pip install -r requirements.txt
 
+REM Build fingerprinted, precompressed static assets
+echo 📦 Building static assets...
+python static_assets.py
+
+REM Security audit (incremental: unchanged files are not rescanned)
+echo 🔒 Running security audit...
+python final_security_audit.py --json audit_report.json > nul
+if errorlevel 1 (
+    echo ⚠️  WARNING: Security audit found critical issues - see audit_report.json
+)
+
 REM Check environment variables
 echo 🔧 Checking environment configuration...
 if not exist ".env" (
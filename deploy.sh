@@ -24,6 +24,16 @@ pip install --upgrade pip
 echo "📥 Installing dependencies..."
 pip install -r requirements.txt
 
+# Build fingerprinted, precompressed static assets
+echo "📦 Building static assets..."
+python static_assets.py
+
+# Security audit (incremental: unchanged files are not rescanned)
+echo "🔒 Running security audit..."
+if ! python final_security_audit.py --json audit_report.json > /dev/null; then
+    echo "⚠️  WARNING: Security audit found critical issues - see audit_report.json"
+fi
+
 # Check environment variables
 echo "🔧 Checking environment configuration..."
 if [ ! -f ".env" ]; then
@@ -0,0 +1,160 @@
+"""
+Facet counts for the news filter
+
+FacetIndex keeps article counts per category, per source and per day of
+publication. Like search.SearchIndex it is maintained incrementally:
+sync() reads only the articles added to the store since the last sync, so
+each new article costs a few counter increments and the store is never
+rescanned.
+
+Facet payloads - categories, the top sources and the date buckets below,
+overall or within one category - are built once per store version and
+day and then served from a dict, so a request costs one version() lookup
+and one dict lookup.
+
+Date buckets are cumulative and relative to the current UTC day:
+
+    today    published today
+    week     in the last 7 days
+    month    in the last 30 days
+    older    everything else, including undated articles
+"""
+
+import threading
+import time
+from collections import Counter
+
+# Articles pulled from the store per sync() round trip
+SYNC_BATCH = 1000
+# Sources listed in a facet payload, most articles first
+TOP_SOURCES = 20
+# (bucket, label, days) - see the module docstring
+DATE_BUCKETS = (
+    ('today', 'Today', 1),
+    ('week', 'This week', 7),
+    ('month', 'This month', 30),
+)
+# Shown first in the category filter; the rest follow alphabetically
+DEFAULT_CATEGORY = 'general'
+
+SECONDS_PER_DAY = 86400
+
+
+def today():
+    """Current UTC day number, as used for the date buckets"""
+    return int(time.time()) // SECONDS_PER_DAY
+
+
+class FacetIndex:
+    """Incrementally maintained category, source and date counts"""
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._categories = Counter()
+        # category (None for all) -> Counter of source / day number
+        self._sources = {None: Counter()}
+        self._days = {None: Counter()}
+        self._last_id = 0
+        self._synced_version = None
+        # (category, day) -> facet payload for the synced version
+        self._payloads = {}
+
+    def __len__(self):
+        return sum(self._categories.values())
+
+    def add(self, article):
+        """Count one stored Article"""
+        category = article.category
+        day = article.published // SECONDS_PER_DAY if article.published else None
+        self._categories[category] += 1
+        for scope in (None, category):
+            if article.source:
+                self._sources.setdefault(scope, Counter())[article.source] += 1
+            if day is not None:
+                self._days.setdefault(scope, Counter())[day] += 1
+        self._last_id = max(self._last_id, article.id)
+
+    def sync(self):
+        """
+        Count articles added to the store since the last sync
+
+        Costs one version() lookup when nothing has changed.
+
+        Returns:
+            int: Number of articles counted
+        """
+        version = self.store.version()
+        if version == self._synced_version:
+            return 0
+        counted = 0
+        with self._lock:
+            if version == self._synced_version:
+                return 0
+            while True:
+                batch = self.store.since(self._last_id, SYNC_BATCH)
+                for article in batch:
+                    self.add(article)
+                counted += len(batch)
+                if len(batch) < SYNC_BATCH:
+                    break
+            self._payloads = {}
+            self._synced_version = version
+        return counted
+
+    def categories(self):
+        """
+        Category filter options, the default category first
+
+        Returns:
+            list: [{'value', 'label', 'count'}]
+        """
+        return self.facets()['categories']
+
+    def facets(self, category=None):
+        """
+        Facet counts, overall or within one category
+
+        Args:
+            category (str): Limit the source and date facets to a category
+
+        Returns:
+            dict: ``total`` plus ``categories``, ``sources`` and ``dates``,
+            each a list of {'value', 'label', 'count'}
+        """
+        self.sync()
+        key = (category, today())
+        if category is not None and category not in self._categories:
+            # Not cached, so made-up categories cannot grow the payload dict
+            return self._build(category, key[1])
+        payload = self._payloads.get(key)
+        if payload is None:
+            with self._lock:
+                payload = self._payloads[key] = self._build(category, key[1])
+        return payload
+
+    def _build(self, category, day):
+        names = sorted(self._categories, key=lambda name: (name != DEFAULT_CATEGORY, name))
+        sources = self._sources.get(category, Counter())
+        days = self._days.get(category, Counter())
+        total = self._categories[category] if category is not None else sum(self._categories.values())
+
+        dates = []
+        for value, label, span in DATE_BUCKETS:
+            # A day ahead too: feeds in later time zones publish "tomorrow"
+            count = sum(days.get(number, 0) for number in range(day - span + 1, day + 2))
+            dates.append({'value': value, 'label': label, 'count': count})
+        dates.append({'value': 'older', 'label': 'Older', 'count': total - dates[-1]['count']})
+
+        return {
+            'total': total,
+            'categories': [
+                {'value': name, 'label': name.title(), 'count': self._categories[name]}
+                for name in names
+            ],
+            'sources': [
+                {'value': source, 'label': source, 'count': count}
+                for source, count in sources.most_common(TOP_SOURCES)
+            ],
+            'dates': dates,
+        }
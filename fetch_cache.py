@@ -0,0 +1,377 @@
+"""
+Two-level cache of article store results for the Flask News Website
+
+fetch_news() and fetch_news_page() read through a FetchCache:
+
+    level 1  an in-process LRU of recent results, fresh for ``ttl`` seconds
+    level 2  an optional SQLite file shared by every gunicorn worker, so a
+             result computed by one worker is reused by the others
+
+Each result is stored with the (version_tag, modified) state it was computed
+under (see ArticleStore.page_state). It is fresh while that tag still
+matches the store's and it is younger than ``ttl``.
+
+When a hot key expires or is invalidated, concurrent requests must not all
+recompute it:
+
+    - single flight: one thread per process recomputes a key and the others
+      wait for its result; with the shared tier a lease row extends this
+      across workers, the losers picking the result up from SQLite
+    - stale-while-revalidate: a result no older than ``ttl + stale_ttl`` is
+      still served while one background thread refreshes it
+
+get() returns the state a result was computed under alongside it, so ETags
+and cached pages built from a stale result are tagged with the older
+version and are replaced once the refresh lands.
+
+Use create_fetch_cache() with ``memory://`` (in-process only) or
+``sqlite:///fetch_cache.db`` (in-process plus shared).
+"""
+
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Seconds a worker may hold a key's lease before others give up waiting
+LEASE_SECONDS = 5.0
+# How often a worker waiting on another worker's lease checks the shared tier
+LEASE_POLL_SECONDS = 0.01
+
+
+class _Flight:
+    """One in-progress computation of a key, shared by every caller waiting on it"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SQLiteFetchTier:
+    """Results shared between worker processes through a SQLite file"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS fetch_cache (
+            key TEXT PRIMARY KEY,
+            tag TEXT NOT NULL,
+            modified REAL NOT NULL,
+            value BLOB NOT NULL,
+            stored REAL NOT NULL,
+            accessed REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_fetch_cache_accessed ON fetch_cache (accessed);
+        CREATE TABLE IF NOT EXISTS fetch_leases (
+            key TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        # One connection per process; never reuse one inherited across fork
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key):
+        """
+        Look up a shared result
+
+        Returns:
+            tuple: (value, state, stored), or None if missing
+        """
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                'SELECT value, tag, modified, stored FROM fetch_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            with conn:
+                conn.execute('UPDATE fetch_cache SET accessed = ? WHERE key = ?', (time.time(), key))
+        value, tag, modified, stored = row
+        return pickle.loads(value), (tag, modified), stored
+
+    def set(self, key, value, state, stored):
+        """Store a result computed under ``state`` at time ``stored``"""
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO fetch_cache (key, tag, modified, value, stored, accessed) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, state[0], state[1], sqlite3.Binary(blob), stored, time.time()),
+                )
+                excess = conn.execute('SELECT count(*) FROM fetch_cache').fetchone()[0] - self.max_entries
+                if excess > 0:
+                    conn.execute(
+                        'DELETE FROM fetch_cache WHERE key IN '
+                        '(SELECT key FROM fetch_cache ORDER BY accessed LIMIT ?)',
+                        (excess,),
+                    )
+
+    def acquire(self, key, owner, seconds=LEASE_SECONDS):
+        """
+        Take the lease to recompute ``key`` unless another live owner holds it
+
+        Returns:
+            bool: True if ``owner`` now holds the lease
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                cursor = conn.execute(
+                    'INSERT INTO fetch_leases (key, owner, expires) VALUES (?, ?, ?) '
+                    'ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires = excluded.expires '
+                    'WHERE fetch_leases.expires < ?',
+                    (key, owner, now + seconds, now),
+                )
+        return cursor.rowcount == 1
+
+    def release(self, key, owner):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute('DELETE FROM fetch_leases WHERE key = ? AND owner = ?', (key, owner))
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute('DELETE FROM fetch_cache')
+                conn.execute('DELETE FROM fetch_leases')
+
+
+class FetchCache:
+    """In-process LRU with a TTL, optionally backed by a shared tier"""
+
+    def __init__(self, shared=None, max_entries=1024, ttl=30.0, stale_ttl=60.0, enabled=True):
+        """
+        Args:
+            shared (SQLiteFetchTier): Second level shared by workers, or None
+            max_entries (int): Results kept in process
+            ttl (float): Seconds a result stays fresh
+            stale_ttl (float): Further seconds a result may be served while
+                it is refreshed in the background (0 disables it)
+            enabled (bool): When False every call computes afresh
+        """
+        self.shared = shared
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.hits = 0
+        self.shared_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key, state, compute):
+        """
+        Return the result for ``key``, computing it at most once at a time
+
+        Args:
+            key (str): Cache key, e.g. 'page:sports:12:'
+            state (tuple): Current (version_tag, modified) of the data behind
+                the key, from article_store.page_state()
+            compute (callable): Returns the result; must be picklable when
+                the shared tier is used
+
+        Returns:
+            tuple: (result, state) - the state the result was computed under,
+            older than ``state`` while a stale result is served
+        """
+        if not self.enabled:
+            return compute(), state
+
+        now = time.time()
+        entry = self._local_get(key)
+        if entry is not None and self._fresh(entry, state, now):
+            self.hits += 1
+            return entry[0], entry[1]
+
+        if self.shared is not None:
+            shared = self.shared.get(key)
+            if shared is not None and (entry is None or shared[2] > entry[2]):
+                entry = shared
+                self._local_set(key, entry)
+                if self._fresh(entry, state, now):
+                    self.shared_hits += 1
+                    return entry[0], entry[1]
+
+        if entry is not None and now - entry[2] < self.ttl + self.stale_ttl:
+            self.stale_hits += 1
+            self._refresh(key, state, compute)
+            return entry[0], entry[1]
+
+        return self._load(key, state, compute)
+
+    def _fresh(self, entry, state, now):
+        return entry[1][0] == state[0] and now - entry[2] < self.ttl
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _local_set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _join(self, key):
+        """The flight computing ``key`` and whether the caller leads it"""
+        if self._pid != os.getpid():
+            # Forked (gunicorn preload): threads computing in the parent are
+            # gone, so their flights would never land here
+            self._lock = threading.Lock()
+            self._flights = {}
+            self._pid = os.getpid()
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def _land(self, key, flight):
+        with self._lock:
+            del self._flights[key]
+        flight.done.set()
+
+    def _load(self, key, state, compute):
+        # Nothing servable: the leader computes while followers wait for it
+        flight, leader = self._join(key)
+        if not leader:
+            self.coalesced += 1
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if flight.result is None:
+                # Joined a background refresh that left the key to another worker
+                return self._load(key, state, compute)
+            return flight.result
+
+        self.misses += 1
+        try:
+            flight.result = self._compute(key, state, compute, wait=True)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            self._land(key, flight)
+
+    def _refresh(self, key, state, compute):
+        # A stale result is being served: refresh it off the request path,
+        # unless a refresh of this key is already under way
+        flight, leader = self._join(key)
+        if not leader:
+            return
+
+        def run():
+            try:
+                flight.result = self._compute(key, state, compute, wait=False)
+            except Exception as e:
+                flight.error = e
+                logger.warning("Refreshing %s failed, still serving the stale result: %s", key, e)
+            finally:
+                self._land(key, flight)
+
+        threading.Thread(target=run, name=f"fetch-refresh:{key}", daemon=True).start()
+
+    def _compute(self, key, state, compute, wait):
+        if self.shared is None:
+            return self._store(key, compute(), state)
+
+        owner = f"{os.getpid()}:{threading.get_ident()}"
+        if not self.shared.acquire(key, owner):
+            # Another worker is computing this key
+            if not wait:
+                return None
+            found = self._wait_shared(key, state)
+            if found is not None:
+                return found
+        try:
+            return self._store(key, compute(), state)
+        finally:
+            self.shared.release(key, owner)
+
+    def _wait_shared(self, key, state):
+        deadline = time.monotonic() + LEASE_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(LEASE_POLL_SECONDS)
+            entry = self.shared.get(key)
+            if entry is not None and self._fresh(entry, state, time.time()):
+                self._local_set(key, entry)
+                self.coalesced += 1
+                return entry[0], entry[1]
+        # The lease holder died or is slow; compute it here instead
+        return None
+
+    def _store(self, key, value, state):
+        stored = time.time()
+        self._local_set(key, (value, state, stored))
+        if self.shared is not None:
+            self.shared.set(key, value, state, stored)
+        return value, state
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+
+def create_fetch_cache(url, max_entries=1024, ttl=30.0, stale_ttl=60.0, enabled=True):
+    """
+    Build a fetch cache from a URL
+
+    Args:
+        url (str): ``memory://`` or ``sqlite:///path/to/fetch_cache.db``
+        max_entries (int): Results kept per process (and, times 8, in the
+            shared tier)
+        ttl (float): Seconds a result stays fresh
+        stale_ttl (float): Further seconds a stale result may be served
+        enabled (bool): When False the cache is bypassed
+
+    Returns:
+        FetchCache: The configured cache
+    """
+    if url.startswith('sqlite:///'):
+        shared = SQLiteFetchTier(url[len('sqlite:///'):], max_entries * 8)
+    elif url.startswith('memory://'):
+        shared = None
+    else:
+        raise ValueError(f"Unsupported fetch cache URL: {url}")
+    return FetchCache(shared, max_entries=max_entries, ttl=ttl, stale_ttl=stale_ttl, enabled=enabled)
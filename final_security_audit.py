@@ -6,8 +6,16 @@
 This script performs a comprehensive security audit and verifies the project 
 is ready for GitHub publication.
 
+The source scan walks the whole tree (templates/ and static/ included) in a
+process pool with one combined pattern. Results are cached by content hash
+in .audit_cache.json, so reruns only read files that changed.
+
+    python final_security_audit.py                    # text report
+    python final_security_audit.py --json audit.json  # plus a JSON report with per-check timings
+    python final_security_audit.py --json -           # JSON only, on stdout
+
 Author: AI Assistant
-Version: 1.0.0
+Version: 1.1.0
 Date: 2025
 """
 
@@ -15,15 +23,93 @@ import os
 import sys
 import json
 import re
+import time
+import hashlib
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
+# Source scan rules: (check name, description). Every rule flags
+# "<name> = '<literal>'", and all of them are compiled into one pattern so
+# each file is searched in a single pass
+SECURITY_PATTERNS = [
+    ('password', 'Hardcoded password'),
+    ('secret', 'Hardcoded secret'),
+    ('token', 'Hardcoded token'),
+]
+ASSIGNED_LITERAL = r'\s*=\s*["\'][^"\']+["\']'
+COMBINED_PATTERN = re.compile(
+    # The lookahead lets the engine skip positions no rule can start at
+    '(?=[' + ''.join(sorted({name[0] for name, _ in SECURITY_PATTERNS})) + '])'
+    '(?:' + '|'.join(f"(?P<{name}>{name})" for name, _ in SECURITY_PATTERNS) + ')'
+    + ASSIGNED_LITERAL,
+    re.IGNORECASE
+)
+DESCRIPTIONS = dict(SECURITY_PATTERNS)
+
+# Changes whenever the rules do, so cached results are never reused across them
+RULES_VERSION = hashlib.sha1(COMBINED_PATTERN.pattern.encode('utf-8')).hexdigest()[:12]
+
+# Text files worth scanning, and directories that are never project source
+SCAN_SUFFIXES = {
+    '.py', '.html', '.htm', '.js', '.css', '.sh', '.bat', '.json', '.yml', '.yaml',
+    '.toml', '.cfg', '.ini', '.conf', '.txt', '.md', '.env', '.example'
+}
+SKIP_DIRS = {
+    '.git', '__pycache__', 'venv', '.venv', 'env', 'node_modules', '.tox', '.nox',
+    '.mypy_cache', '.pytest_cache', 'dist', 'build', 'bench', 'image_cache'
+}
+MAX_SCAN_BYTES = 2 * 1024 * 1024
+CACHE_NAME = '.audit_cache.json'
+# Below this many files to scan, a process pool costs more than it saves
+POOL_THRESHOLD = 32
+
+
+def scan_file(job):
+    """
+    Scan one file for hardcoded credentials (runs in the process pool)
+    
+    Args:
+        job (tuple): (absolute path, content hash from the cache or None)
+    
+    Returns:
+        tuple: (content hash, findings) - findings is None when the hash
+        matches the cached one and the cached findings still apply
+    """
+    path, cached_hash = job
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if digest == cached_hash:
+        return digest, None
+    
+    content = data.decode('utf-8', errors='replace')
+    findings = []
+    for match in COMBINED_PATTERN.finditer(content):
+        text = match.group()
+        # Skip if it's referencing environment variables
+        if 'os.environ' in text or 'getenv' in text:
+            continue
+        findings.append({
+            'line': content.count('\n', 0, match.start()) + 1,
+            'check': match.lastgroup,
+            'description': DESCRIPTIONS[match.lastgroup],
+        })
+    return digest, findings
+
 class SecurityAudit:
-    def __init__(self):
+    def __init__(self, jobs=None, use_cache=True):
         self.project_root = Path(__file__).parent
         self.issues = []
         self.warnings = []
         self.passed_checks = []
+        self.jobs = jobs or os.cpu_count() or 1
+        self.use_cache = use_cache
+        self.findings = []
+        self.scan_stats = {}
+        self.timings = []
         
     def print_header(self):
         """Print audit header"""
@@ -124,31 +210,96 @@ class SecurityAudit:
             self.passed_checks.append("✅ .env.example properly configured")
             print("   ✅ Environment template is safe")
             
+    def source_files(self):
+        """Every scannable text file in the project, as paths relative to the root"""
+        files = []
+        for directory, subdirs, names in os.walk(self.project_root):
+            subdirs[:] = sorted(d for d in subdirs if d not in SKIP_DIRS and not d.endswith('.egg-info'))
+            for name in sorted(names):
+                if name == CACHE_NAME:
+                    continue
+                path = Path(directory, name)
+                if path.suffix.lower() in SCAN_SUFFIXES or name.startswith('.env'):
+                    files.append(path.relative_to(self.project_root).as_posix())
+        return files
+    
+    def load_cache(self):
+        cache_path = self.project_root / CACHE_NAME
+        if not self.use_cache or not cache_path.exists():
+            return {}
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if cache.get('rules') != RULES_VERSION:
+            return {}
+        return cache.get('files', {})
+    
+    def save_cache(self, files):
+        cache_path = self.project_root / CACHE_NAME
+        tmp = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'rules': RULES_VERSION, 'files': files}, f)
+        os.replace(tmp, cache_path)
+    
     def check_code_security(self):
         """Check source code for potential security issues"""
         print("\n🔍 Scanning source code for security issues...")
         
-        python_files = list(self.project_root.glob('*.py'))
+        cache = self.load_cache()
+        results = {}
+        pending = []
+        skipped = 0
+        
+        for relative in self.source_files():
+            stat = (self.project_root / relative).stat()
+            if stat.st_size > MAX_SCAN_BYTES:
+                skipped += 1
+                continue
+            entry = cache.get(relative)
+            # Same size and mtime: trust the cached result without reading
+            if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+                results[relative] = entry
+                continue
+            pending.append((relative, stat, entry))
+        
+        jobs = [(str(self.project_root / relative), entry and entry['sha256']) for relative, _, entry in pending]
+        if len(jobs) >= POOL_THRESHOLD and self.jobs > 1:
+            with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+                scanned = list(pool.map(scan_file, jobs, chunksize=max(1, len(jobs) // (self.jobs * 4))))
+        else:
+            scanned = [scan_file(job) for job in jobs]
         
-        security_patterns = [
-            (r'password\s*=\s*["\'][^"\']+["\']', 'Hardcoded password'),
-            (r'secret\s*=\s*["\'][^"\']+["\']', 'Hardcoded secret'),
-            (r'token\s*=\s*["\'][^"\']+["\']', 'Hardcoded token'),
-        ]
+        rescanned = 0
+        for (relative, stat, entry), (digest, findings) in zip(pending, scanned):
+            if findings is None:
+                # Touched but unchanged content: keep the cached findings
+                findings = entry['findings']
+            else:
+                rescanned += 1
+            results[relative] = {
+                'size': stat.st_size,
+                'mtime': stat.st_mtime_ns,
+                'sha256': digest,
+                'findings': findings,
+            }
+        self.save_cache(results)
+        
+        self.scan_stats = {
+            'files': len(results),
+            'scanned': rescanned,
+            'cached': len(results) - rescanned,
+            'skipped_large': skipped,
+            'processes': self.jobs if len(jobs) >= POOL_THRESHOLD and self.jobs > 1 else 1,
+        }
+        print(f"   📄 {len(results)} files, {rescanned} scanned, {len(results) - rescanned} unchanged")
         
         issues_found = []
-        
-        for py_file in python_files:
-            with open(py_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
-            for pattern, description in security_patterns:
-                matches = re.finditer(pattern, content, re.IGNORECASE)
-                for match in matches:
-                    # Skip if it's referencing environment variables
-                    if 'os.environ' in match.group() or 'getenv' in match.group():
-                        continue
-                    issues_found.append(f"{py_file.name}: {description}")
+        for relative in sorted(results):
+            for finding in results[relative]['findings']:
+                self.findings.append({'path': relative, **finding})
+                issues_found.append(f"{relative}:{finding['line']}: {finding['description']}")
                     
         if issues_found:
             for issue in issues_found:
@@ -281,18 +432,56 @@ class SecurityAudit:
         """Run complete security audit"""
         self.print_header()
         
-        # Run all checks
-        self.check_sensitive_files()
-        self.check_gitignore()
-        self.check_environment_template()
-        self.check_code_security()
-        self.check_requirements()
-        self.check_documentation()
-        self.check_project_structure()
-        self.check_deployment_readiness()
+        # Run all checks, timing each
+        checks = [
+            self.check_sensitive_files,
+            self.check_gitignore,
+            self.check_environment_template,
+            self.check_code_security,
+            self.check_requirements,
+            self.check_documentation,
+            self.check_project_structure,
+            self.check_deployment_readiness,
+        ]
+        for check in checks:
+            counts = (len(self.passed_checks), len(self.warnings), len(self.issues))
+            start = time.perf_counter()
+            check()
+            self.timings.append({
+                'check': check.__name__[len('check_'):],
+                'seconds': round(time.perf_counter() - start, 6),
+                'passed': len(self.passed_checks) - counts[0],
+                'warnings': len(self.warnings) - counts[1],
+                'issues': len(self.issues) - counts[2],
+            })
         
         # Print summary
-        self.print_summary()
+        return self.print_summary()
+    
+    def report(self):
+        """Machine-readable results of the last run"""
+        if self.issues:
+            status = 'not_ready'
+        elif self.warnings:
+            status = 'warnings'
+        else:
+            status = 'ready'
+        return {
+            'generated': datetime.now().isoformat(timespec='seconds'),
+            'project_root': str(self.project_root),
+            'status': status,
+            'score': {
+                'passed': len(self.passed_checks),
+                'total': len(self.passed_checks) + len(self.warnings) + len(self.issues),
+            },
+            'checks': self.timings,
+            'seconds': round(sum(timing['seconds'] for timing in self.timings), 6),
+            'scan': self.scan_stats,
+            'findings': self.findings,
+            'passed': self.passed_checks,
+            'warnings': self.warnings,
+            'issues': self.issues,
+        }
         
     def print_summary(self):
         """Print audit summary"""
@@ -352,11 +541,28 @@ class SecurityAudit:
 
 def main():
     """Run the security audit"""
-    audit = SecurityAudit()
-    exit_code = audit.run_audit()
+    parser = argparse.ArgumentParser(description='Security and GitHub readiness audit')
+    parser.add_argument('--json', metavar='PATH',
+                        help='write a JSON report to PATH ("-" for stdout, which silences the text report)')
+    parser.add_argument('--jobs', type=int, default=None, help='processes for the source scan (default: CPU count)')
+    parser.add_argument('--no-cache', action='store_true', help=f'rescan every file instead of reusing {CACHE_NAME}')
+    args = parser.parse_args()
     
-    print("\n🔒 Security audit completed!")
-    print("   Run this script regularly to maintain security standards.")
+    audit = SecurityAudit(jobs=args.jobs, use_cache=not args.no_cache)
+    
+    # With the JSON on stdout, keep the human-readable report off it
+    quiet = contextlib.redirect_stdout(sys.stderr) if args.json == '-' else contextlib.nullcontext()
+    with quiet:
+        exit_code = audit.run_audit()
+        print("\n🔒 Security audit completed!")
+        print("   Run this script regularly to maintain security standards.")
+    
+    if args.json == '-':
+        json.dump(audit.report(), sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    elif args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(audit.report(), f, indent=2, ensure_ascii=False)
     
     sys.exit(exit_code)
 
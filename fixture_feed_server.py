@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Local stand-in feed server for developing and testing ingest.py
+
+Serves generated RSS 2.0, Atom and JSON Feed documents with ETag and
+Last-Modified validators (answering conditional GETs with 304), keep-alive
+connections and optional gzip:
+
+    /rss.xml     RSS 2.0
+    /atom.xml    Atom
+    /feed.json   JSON Feed 1.1
+
+``?items=N`` controls the number of entries (default 20) and ``?seed=S``
+changes their URLs, which simulates new articles being published.
+
+    python fixture_feed_server.py --port 8001
+    NEWS_FEEDS=technology=http://127.0.0.1:8001/rss.xml python ingest.py --once
+
+From Python, serve(port=0) starts it on a free port in a background thread.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+BASE_TIME = datetime(2024, 12, 15, 12, 0, tzinfo=timezone.utc)
+IMAGE_URL = 'https://images.unsplash.com/photo-1504711434969-e33886168f5c?w=800&h=400&fit=crop'
+
+
+def _entries(count, seed):
+    for index in range(count):
+        yield {
+            'title': f"Fixture story {seed}-{index}",
+            'url': f"https://fixture.example/{seed}/{index}",
+            'summary': f"Summary of fixture story {index} for seed {seed}. " * 3,
+            'author': f"Reporter {index % 5}",
+            'published': BASE_TIME - timedelta(minutes=15 * index),
+            'image': IMAGE_URL,
+        }
+
+
+def render_rss(count, seed):
+    items = ''.join(
+        f"<item><title>{escape(e['title'])}</title><link>{e['url']}</link>"
+        f"<description>{escape(e['summary'])}</description>"
+        f"<dc:creator>{escape(e['author'])}</dc:creator>"
+        f"<pubDate>{format_datetime(e['published'])}</pubDate>"
+        f"<enclosure url=\"{escape(e['image'])}\" type=\"image/jpeg\" length=\"0\"/></item>"
+        for e in _entries(count, seed)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0" xmlns:dc="http://purl.org/dc/elements/1.1/">'
+        f"<channel><title>Fixture RSS</title><link>https://fixture.example/</link>{items}</channel></rss>"
+    )
+
+
+def render_atom(count, seed):
+    entries = ''.join(
+        f"<entry><title>{escape(e['title'])}</title><link href=\"{e['url']}\"/>"
+        f"<id>{e['url']}</id><summary>{escape(e['summary'])}</summary>"
+        f"<author><name>{escape(e['author'])}</name></author>"
+        f"<updated>{e['published'].isoformat()}</updated>"
+        f"<link rel=\"enclosure\" type=\"image/jpeg\" href=\"{escape(e['image'])}\"/></entry>"
+        for e in _entries(count, seed)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<feed xmlns="http://www.w3.org/2005/Atom">'
+        f"<title>Fixture Atom</title><updated>{BASE_TIME.isoformat()}</updated>{entries}</feed>"
+    )
+
+
+def render_json(count, seed):
+    return json.dumps({
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': 'Fixture JSON Feed',
+        'items': [
+            {
+                'id': e['url'],
+                'url': e['url'],
+                'title': e['title'],
+                'summary': e['summary'],
+                'image': e['image'],
+                'date_published': e['published'].isoformat(),
+                'authors': [{'name': e['author']}],
+            }
+            for e in _entries(count, seed)
+        ],
+    })
+
+
+FEEDS = {
+    '/rss.xml': ('application/rss+xml; charset=utf-8', render_rss),
+    '/atom.xml': ('application/atom+xml; charset=utf-8', render_atom),
+    '/feed.json': ('application/feed+json; charset=utf-8', render_json),
+}
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    """Serves the fixture feeds with conditional GET support"""
+
+    protocol_version = 'HTTP/1.1'
+    # Number of requests served, handy for checking conditional GETs and pooling
+    requests_served = 0
+
+    def do_GET(self):
+        type(self).requests_served += 1
+        parts = urlsplit(self.path)
+        if parts.path not in FEEDS:
+            self._send(404, b'Not Found', 'text/plain')
+            return
+
+        query = parse_qs(parts.query)
+        count = int(query.get('items', ['20'])[0])
+        seed = query.get('seed', ['1'])[0]
+        content_type, render = FEEDS[parts.path]
+        body = render(count, seed).encode('utf-8')
+
+        etag = '"{}"'.format(hashlib.sha1(body).hexdigest()[:16])
+        last_modified = format_datetime(BASE_TIME, usegmt=True)
+        if self.headers.get('If-None-Match') == etag or (
+            not self.headers.get('If-None-Match')
+            and self.headers.get('If-Modified-Since') == last_modified
+        ):
+            self._send(304, b'', None, {'ETag': etag, 'Last-Modified': last_modified})
+            return
+
+        headers = {'ETag': etag, 'Last-Modified': last_modified}
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            headers['Content-Encoding'] = 'gzip'
+        self._send(200, body, content_type, headers)
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host='127.0.0.1', port=0):
+    """
+    Start the fixture server in a daemon thread
+
+    Returns:
+        ThreadingHTTPServer: The running server; its base URL is
+        f"http://{host}:{server.server_port}"
+    """
+    server = ThreadingHTTPServer((host, port), FeedHandler)
+    threading.Thread(target=server.serve_forever, name='fixture-feeds', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve fixture RSS/Atom/JSON feeds')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), FeedHandler)
+    print(f"📡 Fixture feeds on http://{args.host}:{args.port}{{/rss.xml,/atom.xml,/feed.json}}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
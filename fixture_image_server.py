@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Local stand-in image host for developing and testing image_proxy.py
+
+Serves generated PNG images, so the proxy can be exercised without
+reaching images.unsplash.com:
+
+    /photo.png?w=800&h=400&seed=3    gradient image of the given size
+    /not-an-image                    an HTML page (the proxy must refuse it)
+    /redirect?to=<url>               302 to another URL (which the proxy
+                                     must check like the first one)
+
+Responses carry an ETag and honour If-None-Match. requests_served counts
+every request, which shows whether a source was fetched only once.
+
+    python fixture_image_server.py --port 8002
+    IMAGE_PROXY_ALLOW=127.0.0.1/32 python app.py    # loopback is refused otherwise
+
+From Python, serve(port=0) starts it on a free port in a background thread.
+"""
+
+import argparse
+import hashlib
+import struct
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+MAX_SIDE = 4000
+
+
+def _chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def render_png(width, height, seed=0):
+    """Encode an RGB gradient as a PNG without any imaging library"""
+    tint = seed * 47 % 256
+    rows = bytearray()
+    for y in range(height):
+        rows.append(0)
+        green = y * 255 // max(height - 1, 1)
+        for x in range(width):
+            rows += bytes((x * 255 // max(width - 1, 1), green, tint))
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + _chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        + _chunk(b'IDAT', zlib.compress(bytes(rows), 6))
+        + _chunk(b'IEND', b'')
+    )
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    """Serves the fixture images with conditional GET support"""
+
+    protocol_version = 'HTTP/1.1'
+    # Number of requests served, handy for checking the proxy fetches once
+    requests_served = 0
+
+    def do_GET(self):
+        type(self).requests_served += 1
+        parts = urlsplit(self.path)
+
+        if parts.path == '/not-an-image':
+            self._send(200, b'<html><body>Not an image</body></html>', 'text/html; charset=utf-8')
+            return
+        if parts.path == '/redirect':
+            location = parse_qs(parts.query).get('to', [''])[0]
+            self._send(302, b'', None, {'Location': location})
+            return
+        if parts.path != '/photo.png':
+            self._send(404, b'Not Found', 'text/plain')
+            return
+
+        query = parse_qs(parts.query)
+        try:
+            width = min(int(query.get('w', ['800'])[0]), MAX_SIDE)
+            height = min(int(query.get('h', ['400'])[0]), MAX_SIDE)
+            seed = int(query.get('seed', ['0'])[0])
+        except ValueError:
+            self._send(400, b'Bad Request', 'text/plain')
+            return
+
+        etag = '"{}"'.format(hashlib.sha1(f"{width}x{height}:{seed}".encode()).hexdigest()[:16])
+        if self.headers.get('If-None-Match') == etag:
+            self._send(304, b'', None, {'ETag': etag})
+            return
+        self._send(200, render_png(width, height, seed), 'image/png', {'ETag': etag})
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host='127.0.0.1', port=0):
+    """
+    Start the fixture server in a daemon thread
+
+    Returns:
+        ThreadingHTTPServer: The running server; its base URL is
+        f"http://{host}:{server.server_port}"
+    """
+    server = ThreadingHTTPServer((host, port), ImageHandler)
+    threading.Thread(target=server.serve_forever, name='fixture-images', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve generated fixture images')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8002)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), ImageHandler)
+    print(f"🖼️  Fixture images on http://{args.host}:{args.port}/photo.png?w=800&h=400")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,44 @@
 # Gunicorn configuration file for production deployment
+import gc
+import os
+import sys
+
 bind = "0.0.0.0:5000"
 workers = 4
-worker_class = "sync"
+
+# Worker profile (GUNICORN_WORKER_CLASS):
+#   sync    - one request at a time per worker (default)
+#   gevent  - cooperative workers, each serving up to worker_connections
+#             requests at once (pip install gevent)
+#   uvicorn - ASGI workers; start with asgi:application instead of app:app
+#             (uvicorn and a2wsgi, see requirements.txt)
+WORKER_PROFILES = {
+    "sync": "sync",
+    "gevent": "gevent",
+    "uvicorn": "uvicorn.workers.UvicornWorker",
+}
+worker_class = WORKER_PROFILES[os.environ.get("GUNICORN_WORKER_CLASS", "sync")]
+# Article streams hold their connection open, which would tie up a sync
+# worker; the news page only subscribes when they are enabled
+os.environ.setdefault("STREAM_ENABLED", str(worker_class != "sync"))
+# With memory:// each worker counts on its own and a scrape reports
+# whichever worker answered it, so several workers share a SQLite file
+if workers > 1:
+    os.environ.setdefault("METRICS_URL", "sqlite:///metrics.db")
+# X-Forwarded-For is resolved once, by the app (TRUSTED_PROXIES); uvicorn
+# workers would otherwise rewrite the client address from it first
+forwarded_allow_ips = ""
+# Only used by the gevent profile
 worker_connections = 1000
 timeout = 30
 keepalive = 5
-max_requests = 1000
+# Recycling a uvicorn worker drops the keep-alive connections open to it
+# without a response (sync and gevent workers close them cleanly), so the
+# uvicorn profile is not recycled
+max_requests = 0 if worker_class == WORKER_PROFILES["uvicorn"] else 1000
 max_requests_jitter = 100
+# With ARTICLE_STORE_URL=snapshot:///..., the master maps the snapshot before
+# forking, so every worker (including recycled ones) shares the same pages
 preload_app = True
 enable_stdio_inheritance = True
 
@@ -23,3 +55,46 @@ proc_name = "flask_news_app"
 limit_request_line = 4094
 limit_request_fields = 100
 limit_request_field_size = 8190
+
+# Server hooks
+def when_ready(server):
+    """Warm the preloaded app in the master, so every forked worker starts warm"""
+    if not server.cfg.preload_app:
+        return
+    import app
+    server.log.info("App startup: %s", app.startup.report())
+    phases = app.warm_up(persist_index=True)
+    server.log.info("Master warm-up: %s", app.startup.report(phases))
+    # Keep the cyclic GC from touching (and so copying) the inherited heap
+    gc.freeze()
+
+def post_fork(server, worker):
+    """Start per-worker background threads - threads do not survive the fork"""
+    import app
+    app.start_ingester()
+    app.start_contact_worker()
+
+def post_worker_init(worker):
+    """Catch up on anything published since the master warmed up, before serving"""
+    import app
+    phases = app.warm_up(record=True)
+    worker.log.info("Worker warm-up: %s", app.startup.report(phases))
+
+def worker_exit(server, worker):
+    """Write the worker's final metrics and article views before it goes away"""
+    import app
+    app.metrics.flush()
+    app.view_counter.flush()
+    # On a clean exit (e.g. recycled by max_requests) skip interpreter
+    # teardown: freeing a warm heap object by object takes longer than the
+    # worker's whole warm-up and dirties pages shared with the master
+    exc = sys.exc_info()[1]
+    if isinstance(exc, SystemExit) and exc.code in (0, None):
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(0)
+
+def child_exit(server, worker):
+    """Fold an exited worker's metrics into the retired totals"""
+    import app
+    app.metrics.retire(worker.pid)
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Local image proxy for article images
+
+Cards no longer hotlink ``image_url``. Each image is served from
+``/img/<hash>`` instead, where the hash stands for a source URL the app has
+rendered:
+
+    - the source is fetched once and the original is kept on disk, shared
+      by every worker and kept across restarts
+    - WebP and AVIF variants at several widths are produced in a process
+      pool (Pillow is used when installed; AVIF needs a Pillow built with
+      AVIF support) and served from ``/img/<hash>/<width>.<format>``
+    - every response is immutable with a long max-age and an ETag
+
+Only http(s) URLs registered through ImageProxy.register() - which the
+templates do while rendering - can be fetched, so the route is not an open
+proxy. Fetches never follow a redirect to another scheme and stop at
+MAX_SOURCE_BYTES. Image URLs come from feeds, so every connection -
+including each redirect - goes only to a public address the host resolved
+to (see public_addresses()); loopback, private, link-local and reserved
+addresses are refused unless listed in ``allow``.
+
+Cache layout under IMAGE_CACHE_DIR::
+
+    ab/ab12.../url          source URL
+    ab/ab12.../original     fetched bytes (content type in original.type)
+    ab/ab12.../640.webp     variants, encoded once the original is fetched
+
+fixture_image_server.py serves generated images locally for trying this out.
+"""
+
+import hashlib
+import ipaddress
+import logging
+import os
+import socket
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import urlsplit
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'FlaskNewsImageProxy/1.0'
+
+# Widths offered in srcset; variants are never wider than the original
+WIDTHS = (320, 640, 960, 1280)
+# Preferred first, as listed in <picture>
+FORMATS = {
+    'avif': ('image/avif', 'AVIF', {'quality': 55}),
+    'webp': ('image/webp', 'WEBP', {'quality': 78, 'method': 4}),
+}
+# Card images span the grid column on small screens, a third of it otherwise
+SIZES = '(max-width: 768px) 100vw, (max-width: 1200px) 50vw, 400px'
+
+MAX_SOURCE_BYTES = 10 * 1024 * 1024
+FETCH_TIMEOUT = 10
+# Seconds a request waits for a variant before falling back to the original
+VARIANT_TIMEOUT = 15
+IMMUTABLE_MAX_AGE = 31536000
+# For the original served in place of a variant that is not ready yet
+FALLBACK_MAX_AGE = 60
+# Hashes remembered as registered; older ones are just checked on disk again
+MAX_REGISTERED = 10000
+# Locks serialising fetches, shared between hashes
+LOCK_STRIPES = 64
+SCHEMES = ('http', 'https')
+
+
+def image_hash(url):
+    """Cache key of a source image URL"""
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+
+
+def available_formats():
+    """Variant formats this Pillow build can write, best first"""
+    if Image is None:
+        return []
+    return [name for name in FORMATS if features.check(name)]
+
+
+def make_variant(original, target, width, fmt):
+    """
+    Resize an original to ``width`` and encode it as ``fmt``
+
+    Runs in the process pool, so it only takes and returns paths.
+
+    Returns:
+        str: The written variant path
+    """
+    _, pil_format, options = FORMATS[fmt]
+    with Image.open(original) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        image.save(tmp, pil_format, **options)
+    os.replace(tmp, target)
+    return target
+
+
+def public_addresses(host, port, allow=()):
+    """
+    Resolve ``host`` to the addresses a source image may be fetched from
+
+    Addresses that are not globally routable - loopback, RFC 1918,
+    link-local (169.254.169.254 cloud metadata), multicast, reserved - are
+    left out unless they fall in one of the ``allow`` networks.
+
+    Returns:
+        list: IP address strings, in resolver order
+
+    Raises:
+        ValueError: If the host resolves to no usable address
+    """
+    usable = []
+    for _, _, _, _, sockaddr in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM):
+        address = ipaddress.ip_address(sockaddr[0].split('%')[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if (address.is_global and not address.is_multicast) or any(address in network for network in allow):
+            usable.append(str(address))
+    if not usable:
+        raise ValueError(f"{host} does not resolve to a public address")
+    return usable
+
+
+def _public_connection(allow):
+    """socket.create_connection() that only connects to public_addresses()"""
+    def create_connection(address, timeout, source_address=None):
+        host, port = address
+        error = None
+        # Connect to the checked address itself, so a second lookup cannot
+        # answer differently
+        for ip in public_addresses(host, port, allow):
+            try:
+                return socket.create_connection((ip, port), timeout, source_address)
+            except OSError as e:
+                error = e
+        raise error
+
+    return create_connection
+
+
+class ImageProxy:
+    """Disk cache of source images and their resized variants"""
+
+    def __init__(self, cache_dir, workers=2, enabled=True, allow=()):
+        """
+        Args:
+            cache_dir (str): Directory holding originals and variants
+            workers (int): Processes encoding variants
+            enabled (bool): When False, templates link the source URLs directly
+            allow (iterable): Networks (e.g. '127.0.0.1/32' for
+                fixture_image_server.py) that may be fetched from although
+                they are not public
+        """
+        self.cache_dir = Path(cache_dir)
+        self.workers = workers
+        self.enabled = enabled
+        self.allow = [ipaddress.ip_network(network, strict=False) for network in allow]
+        self.formats = available_formats()
+        self._registered = OrderedDict()
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        # (key, width, format) -> Future of a variant being encoded
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+        self.fetches = 0
+        self.variants_made = 0
+
+    def _dir(self, key):
+        return self.cache_dir / key[:2] / key
+
+    def register(self, url):
+        """
+        Allow ``url`` to be served through the proxy
+
+        Returns:
+            str: Its hash
+        """
+        key = image_hash(url)
+        if key not in self._registered:
+            directory = self._dir(key)
+            if not (directory / 'url').exists():
+                directory.mkdir(parents=True, exist_ok=True)
+                tmp = directory / f"url.{os.getpid()}.tmp"
+                tmp.write_text(url, encoding='utf-8')
+                os.replace(tmp, directory / 'url')
+            with self._lock:
+                self._registered[key] = True
+                if len(self._registered) > MAX_REGISTERED:
+                    self._registered.popitem(last=False)
+        return key
+
+    def sources(self, url):
+        """
+        Template data for a responsive image
+
+        Returns:
+            dict: ``src`` (original), ``sources`` ([{'type', 'srcset'}], best
+            format first) and ``sizes``
+        """
+        if not url or not self.enabled or urlsplit(url).scheme.lower() not in SCHEMES:
+            return {'src': url, 'sources': [], 'sizes': SIZES}
+        key = self.register(url)
+        return {
+            'src': f"/img/{key}",
+            'sources': [
+                {
+                    'type': FORMATS[fmt][0],
+                    'srcset': ', '.join(f"/img/{key}/{width}.{fmt} {width}w" for width in WIDTHS),
+                }
+                for fmt in self.formats
+            ],
+            'sizes': SIZES,
+        }
+
+    def _key_lock(self, key):
+        return self._locks[int(key[:8], 16) % LOCK_STRIPES]
+
+    def original(self, key):
+        """
+        Path and content type of the cached original, fetching it on first use
+
+        Returns:
+            tuple: (Path, content_type), or None if the hash is unknown or
+            the source could not be fetched
+        """
+        directory = self._dir(key)
+        path, type_path = directory / 'original', directory / 'original.type'
+        if path.exists():
+            return path, type_path.read_text()
+
+        try:
+            url = (directory / 'url').read_text(encoding='utf-8')
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+        # One fetch per image and process; other workers that lose the race
+        # just overwrite the same bytes
+        with self._key_lock(key):
+            if path.exists():
+                return path, type_path.read_text()
+            try:
+                body, content_type = self._fetch(url)
+            except (OSError, ValueError) as e:
+                logger.warning("Image %s not fetched: %s", url, e)
+                return None
+            tmp = directory / f"original.{os.getpid()}.tmp"
+            tmp.write_bytes(body)
+            type_path.write_text(content_type)
+            os.replace(tmp, path)
+            self.fetches += 1
+
+        # Encode the variants in the background so they are ready when the
+        # browser asks for them
+        for fmt in self.formats:
+            for width in WIDTHS:
+                self._submit(key, width, fmt)
+        return path, content_type
+
+    def _fetch(self, url):
+        # Imported here: only a worker that meets an uncached image needs it
+        import http.client
+        import urllib.request
+
+        connect = _public_connection(self.allow)
+
+        class Public:
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self._create_connection = connect
+
+        class Connection(Public, http.client.HTTPConnection):
+            pass
+
+        class SecureConnection(Public, http.client.HTTPSConnection):
+            pass
+
+        class HTTPHandler(urllib.request.HTTPHandler):
+            def http_open(self, req):
+                return self.do_open(Connection, req)
+
+        class HTTPSHandler(urllib.request.HTTPSHandler):
+            def https_open(self, req):
+                return self.do_open(SecureConnection, req, context=self._context)
+
+        class Redirects(urllib.request.HTTPRedirectHandler):
+            def redirect_request(self, req, fp, code, msg, headers, newurl):
+                if urlsplit(newurl).scheme.lower() not in SCHEMES:
+                    raise ValueError(f"redirect to {newurl}")
+                return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+        if urlsplit(url).scheme.lower() not in SCHEMES:
+            raise ValueError(f"not an http(s) URL: {url}")
+        # No HTTP(S)_PROXY from the environment: the address check has to
+        # apply to the image host, not to a proxy
+        opener = urllib.request.build_opener(
+            urllib.request.ProxyHandler({}), HTTPHandler, HTTPSHandler, Redirects
+        )
+        request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT, 'Accept': 'image/*'})
+        with opener.open(request, timeout=FETCH_TIMEOUT) as response:
+            content_type = response.headers.get_content_type()
+            if not content_type.startswith('image/'):
+                raise ValueError(f"not an image: {content_type}")
+            if int(response.headers.get('Content-Length') or 0) > MAX_SOURCE_BYTES:
+                raise ValueError('image too large')
+            body = response.read(MAX_SOURCE_BYTES + 1)
+        if len(body) > MAX_SOURCE_BYTES:
+            raise ValueError('image too large')
+        return body, content_type
+
+    def _executor(self):
+        # Pools do not survive a fork; start one per worker process. Encoders
+        # are spawned rather than forked from a threaded worker
+        if self._pool is None or self._pool_pid != os.getpid():
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+            )
+            self._pool_pid = os.getpid()
+        return self._pool
+
+    def _submit(self, key, width, fmt):
+        """Queue a variant unless it is already being made, returning its Future"""
+        from concurrent.futures.process import BrokenProcessPool
+
+        directory = self._dir(key)
+        job = (key, width, fmt)
+        with self._lock:
+            future = self._jobs.get(job)
+            created = future is None
+            if created:
+                args = (make_variant, str(directory / 'original'), str(directory / f"{width}.{fmt}"), width, fmt)
+                try:
+                    future = self._executor().submit(*args)
+                except BrokenProcessPool:
+                    # An encoder process died (e.g. killed for memory); start over
+                    self._pool = None
+                    future = self._executor().submit(*args)
+                self._jobs[job] = future
+        if created:
+            future.add_done_callback(lambda done: self._variant_done(job, done))
+        return future
+
+    def _variant_done(self, job, future):
+        with self._lock:
+            if self._jobs.get(job) is future:
+                del self._jobs[job]
+        if future.exception() is None:
+            self.variants_made += 1
+        else:
+            logger.warning("Image variant %s not made: %s", job, future.exception())
+
+    def variant(self, key, width, fmt):
+        """
+        Path and content type of a resized variant, making it if needed
+
+        Falls back to the original when the format is unsupported or
+        encoding fails or takes too long (see is_variant()).
+
+        Returns:
+            tuple: (Path, content_type), or None as for original()
+        """
+        original = self.original(key)
+        if original is None or fmt not in self.formats or width not in WIDTHS:
+            return original
+
+        path = self._dir(key) / f"{width}.{fmt}"
+        if not path.exists():
+            try:
+                self._submit(key, width, fmt).result(timeout=VARIANT_TIMEOUT)
+            except Exception as e:
+                # Timeouts, or anything Pillow raises for a corrupt source
+                logger.warning("Serving original for %s/%s.%s: %s", key, width, fmt, e)
+                return original
+        return path, FORMATS[fmt][0]
+
+    @staticmethod
+    def is_variant(found):
+        """Whether variant() returned the variant rather than the original"""
+        return found is not None and found[0].name != 'original'
+
+    def close(self):
+        if self._pool is not None and self._pool_pid == os.getpid():
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
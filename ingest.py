@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Background news ingestion for the Flask News Website
+
+Polls RSS, Atom and JSON feeds and writes new articles into the article
+store, so request handlers only ever read local data.
+
+    - conditional GETs (ETag / Last-Modified) so unchanged feeds cost a 304
+    - keep-alive connections pooled per host
+    - feeds are parsed as they stream in (ElementTree.iterparse, or ijson
+      for JSON feeds when installed), never buffered whole
+    - duplicates are dropped by URL hash inside the store
+
+Configure feeds with NEWS_FEEDS as comma-separated ``category=url`` pairs.
+Run it either as a thread inside each worker (INGEST_MODE=thread, started
+from gunicorn's post_fork hook) or as a separate process sharing a SQLite
+article store:
+
+    python ingest.py           # poll forever
+    python ingest.py --once    # poll every feed once and exit
+
+fixture_feed_server.py serves sample feeds locally for trying this out.
+"""
+
+import argparse
+import gzip
+import http.client
+import itertools
+import json
+import logging
+import re
+import threading
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from html import unescape
+from urllib.parse import urlsplit
+
+from article_store import DATE_FORMAT
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'FlaskNewsIngester/1.0'
+MAX_CONTENT_LENGTH = 500
+# Articles written to the store per transaction while a feed streams in
+BATCH_SIZE = 100
+
+_TAGS = re.compile(r'<[^>]+>')
+_SPACES = re.compile(r'\s+')
+
+
+class Feed:
+    """A feed to poll, with the validators from its last successful fetch"""
+
+    def __init__(self, url, category, source=None):
+        self.url = url
+        self.category = category
+        self.source = source
+        self.etag = None
+        self.last_modified = None
+
+    def __repr__(self):
+        return f"Feed({self.url!r}, {self.category!r})"
+
+
+def parse_feeds(spec):
+    """
+    Parse a NEWS_FEEDS value such as 'technology=https://a/rss,sports=https://b/atom'
+
+    Returns:
+        list: Feed instances
+    """
+    feeds = []
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        category, _, url = entry.partition('=')
+        if not url:
+            raise ValueError(f"Feed entries must look like category=url, got {entry!r}")
+        feeds.append(Feed(url.strip(), category.strip()))
+    return feeds
+
+
+class ConnectionPool:
+    """Keeps one keep-alive HTTP(S) connection per host"""
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+        self._connections = {}
+
+    def get(self, url, headers):
+        """
+        Send a GET request, reusing the host's connection when possible
+
+        Returns:
+            http.client.HTTPResponse: The response; read it fully (or close
+            it) before the next request to the same host
+        """
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        key = (parts.scheme, parts.netloc)
+        for attempt in (1, 2):
+            conn = self._connections.get(key)
+            if conn is None:
+                connection_class = (
+                    http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+                )
+                conn = connection_class(parts.netloc, timeout=self.timeout)
+                self._connections[key] = conn
+            try:
+                conn.request('GET', path, headers=headers)
+                return conn.getresponse()
+            except (http.client.HTTPException, OSError):
+                # Server closed an idle keep-alive connection - retry once on a new one
+                conn.close()
+                del self._connections[key]
+                if attempt == 2:
+                    raise
+
+    def close(self):
+        for conn in self._connections.values():
+            conn.close()
+        self._connections.clear()
+
+
+def _clean_text(value):
+    if not value:
+        return ''
+    text = _SPACES.sub(' ', _TAGS.sub(' ', unescape(value))).strip()
+    if len(text) > MAX_CONTENT_LENGTH:
+        text = text[:MAX_CONTENT_LENGTH].rsplit(' ', 1)[0] + '…'
+    return text
+
+
+def _parse_date(value):
+    """Parse RFC 822 (RSS) or ISO 8601 (Atom / JSON Feed) dates to aware datetimes"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _timestamp(value):
+    """Aware datetime from epoch seconds, or None if ``value`` is not a number"""
+    try:
+        return datetime.fromtimestamp(int(value), tz=timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+def _web_url(url, default=None):
+    """
+    ``url`` if it is an http(s) URL, else ``default``
+
+    Feed URLs end up in href and src attributes, where autoescaping does not
+    stop a ``javascript:`` or ``data:`` URL.
+    """
+    url = (url or '').strip()
+    try:
+        scheme = urlsplit(url).scheme.lower()
+    except ValueError:
+        return default
+    return url if scheme in ('http', 'https') else default
+
+
+def _make_article(title, url, content, author, published, image_url, source):
+    published = published or datetime.now(timezone.utc)
+    return {
+        'title': _clean_text(title),
+        'content': _clean_text(content),
+        'author': _clean_text(author) or None,
+        'date': published.astimezone(timezone.utc).strftime(DATE_FORMAT),
+        'published': int(published.timestamp()),
+        'url': _web_url(url, '#'),
+        'image_url': _web_url(image_url),
+        'source': source,
+    }
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_xml_feed(stream, source=None):
+    """
+    Stream articles out of an RSS 2.0 or Atom document
+
+    Each <item>/<entry> is converted as soon as it has been read and then
+    cleared, so memory use does not grow with the size of the feed.
+    """
+    feed_title = source
+    path = []
+    for event, element in ElementTree.iterparse(stream, events=('start', 'end')):
+        tag = _local(element.tag)
+        if event == 'start':
+            path.append(tag)
+            continue
+
+        path.pop()
+        parent = path[-1] if path else None
+        if tag == 'title' and parent in ('channel', 'feed') and feed_title is None:
+            feed_title = (element.text or '').strip()
+        elif tag in ('item', 'entry'):
+            yield _xml_entry(element, feed_title or 'News Feed')
+            element.clear()
+
+
+def _xml_entry(element, source):
+    fields = {}
+    link = image_url = None
+    for child in element:
+        tag = _local(child.tag)
+        if tag == 'link':
+            rel = child.get('rel', 'alternate')
+            href = child.get('href') or (child.text or '').strip()
+            if rel == 'enclosure' and child.get('type', '').startswith('image/'):
+                image_url = image_url or href
+            elif rel == 'alternate' and link is None:
+                link = href
+        elif tag == 'enclosure' and child.get('type', '').startswith('image/'):
+            image_url = image_url or child.get('url')
+        elif tag in ('content', 'thumbnail') and child.get('url'):
+            # media:content / media:thumbnail
+            image_url = image_url or child.get('url')
+        elif tag == 'author':
+            name = child.find('{http://www.w3.org/2005/Atom}name')
+            fields['author'] = name.text if name is not None else child.text
+        else:
+            fields.setdefault(tag, child.text)
+
+    return _make_article(
+        title=fields.get('title'),
+        url=link or fields.get('guid'),
+        content=fields.get('description') or fields.get('summary') or fields.get('content'),
+        author=fields.get('author') or fields.get('creator'),
+        published=_parse_date(fields.get('pubDate') or fields.get('published') or fields.get('updated')),
+        image_url=image_url,
+        source=source,
+    )
+
+
+def parse_json_feed(stream, source=None):
+    """
+    Read articles from a JSON Feed (jsonfeed.org) or a /api/news response
+
+    Streams item by item when ijson is installed, otherwise loads the
+    document in one go.
+    """
+    if ijson is not None:
+        items = ijson.items(stream, 'items.item')
+    else:
+        document = json.load(stream)
+        items = document.get('items') or document.get('articles') or []
+        source = source or document.get('title')
+
+    for item in items:
+        if 'content' in item and 'published' in item:
+            # Already in our own article format, but from another server:
+            # cleaned like any other feed so its URLs cannot carry script
+            yield _make_article(
+                title=item.get('title'),
+                url=item.get('url'),
+                content=item.get('content'),
+                author=item.get('author'),
+                published=_timestamp(item.get('published')) or _parse_date(item.get('date')),
+                image_url=item.get('image_url'),
+                source=item.get('source') or source or 'News Feed',
+            )
+            continue
+        authors = item.get('authors') or ([item['author']] if item.get('author') else [])
+        yield _make_article(
+            title=item.get('title'),
+            url=item.get('url') or item.get('external_url'),
+            content=item.get('summary') or item.get('content_text') or item.get('content_html'),
+            author=authors[0].get('name') if authors else None,
+            published=_parse_date(item.get('date_published') or item.get('date_modified')),
+            image_url=item.get('image') or item.get('banner_image'),
+            source=source or 'News Feed',
+        )
+
+
+def parse_feed(stream, content_type, source=None):
+    """Pick the JSON or XML parser from the response content type"""
+    if 'json' in content_type:
+        return parse_json_feed(stream, source)
+    return parse_xml_feed(stream, source)
+
+
+class FeedIngester:
+    """Polls feeds on an interval and writes new articles into an article store"""
+
+    def __init__(self, store, feeds, interval=300, timeout=10):
+        self.store = store
+        self.feeds = feeds
+        self.interval = interval
+        self.pool = ConnectionPool(timeout=timeout)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll_feed(self, feed):
+        """
+        Fetch one feed and store any new articles
+
+        Returns:
+            int: Number of new articles stored (0 on 304 or error)
+        """
+        headers = {'User-Agent': USER_AGENT, 'Accept-Encoding': 'gzip'}
+        if feed.etag:
+            headers['If-None-Match'] = feed.etag
+        if feed.last_modified:
+            headers['If-Modified-Since'] = feed.last_modified
+
+        response = self.pool.get(feed.url, headers)
+        try:
+            if response.status == 304:
+                return 0
+            if response.status != 200:
+                logger.warning("Feed %s returned HTTP %s", feed.url, response.status)
+                return 0
+
+            stream = response
+            if response.getheader('Content-Encoding') == 'gzip':
+                stream = gzip.GzipFile(fileobj=response)
+            articles = parse_feed(stream, response.getheader('Content-Type', ''), feed.source)
+            added = 0
+            while True:
+                batch = list(itertools.islice(articles, BATCH_SIZE))
+                if not batch:
+                    break
+                added += self.store.add_many(feed.category, batch)
+
+            feed.etag = response.getheader('ETag')
+            feed.last_modified = response.getheader('Last-Modified')
+            return added
+        finally:
+            # Drain so the keep-alive connection can be reused
+            response.read()
+            response.close()
+
+    def poll_once(self):
+        """Poll every feed once; errors in one feed do not affect the others"""
+        total = 0
+        for feed in self.feeds:
+            try:
+                added = self.poll_feed(feed)
+            except Exception as e:
+                logger.warning("Failed to ingest %s: %s", feed.url, e)
+                continue
+            if added:
+                logger.info("Ingested %d new articles from %s", added, feed.url)
+            total += added
+        return total
+
+    def run(self):
+        """Poll until stop() is called"""
+        while not self._stop.is_set():
+            self.poll_once()
+            self._stop.wait(self.interval)
+        self.pool.close()
+
+    def start(self):
+        """Run the polling loop in a daemon thread"""
+        self._thread = threading.Thread(target=self.run, name='feed-ingester', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    """Run the ingester as a standalone process against ARTICLE_STORE_URL"""
+    import os
+    from dotenv import load_dotenv
+    from article_store import create_store
+
+    parser = argparse.ArgumentParser(description='Poll news feeds into the article store')
+    parser.add_argument('--once', action='store_true', help='poll every feed once and exit')
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    store = create_store(os.environ.get('ARTICLE_STORE_URL', 'memory://'))
+    feeds = parse_feeds(os.environ.get('NEWS_FEEDS', ''))
+    if not feeds:
+        print("❌ No feeds configured - set NEWS_FEEDS=category=url,...")
+        return 1
+
+    ingester = FeedIngester(store, feeds, interval=int(os.environ.get('INGEST_INTERVAL', 300)))
+    if args.once:
+        print(f"✅ Stored {ingester.poll_once()} new articles")
+        return 0
+
+    print(f"🔄 Polling {len(feeds)} feeds every {ingester.interval}s (Ctrl+C to stop)")
+    try:
+        ingester.run()
+    except KeyboardInterrupt:
+        ingester.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
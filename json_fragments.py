@@ -0,0 +1,80 @@
+"""
+Pre-encoded JSON for API responses
+
+Articles never change once stored, so each one is serialized to JSON bytes
+once and the bytes are kept in a bounded LRU keyed by article id. An API
+response is then the encoded envelope with the article fragments spliced in:
+building it copies bytes instead of walking a dict per article.
+
+Uses orjson when it is installed, the standard json module otherwise.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(value):
+    """Serialize a value to compact JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class ArticleJSONCache:
+    """LRU of encoded article fragments, keyed by article id"""
+
+    def __init__(self, max_entries=50000):
+        self.max_entries = max_entries
+        self._fragments = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def fragment(self, article):
+        """Return an Article's JSON encoding (the to_dict() shape) as bytes"""
+        with self._lock:
+            data = self._fragments.get(article.id)
+            if data is not None:
+                self._fragments.move_to_end(article.id)
+                self.hits += 1
+                return data
+
+        data = dumps(article.to_dict())
+        with self._lock:
+            self.misses += 1
+            self._fragments[article.id] = data
+            while len(self._fragments) > self.max_entries:
+                self._fragments.popitem(last=False)
+        return data
+
+    def encode_list(self, articles):
+        """Encode a list of Articles as a JSON array"""
+        return b'[' + b','.join(self.fragment(article) for article in articles) + b']'
+
+    def encode_response(self, payload, articles, key='articles'):
+        """
+        Encode a JSON object with a list of Articles under ``key``
+
+        Args:
+            payload (dict): The other (small) members of the response
+            articles (list): Articles to splice in from the fragment cache
+            key (str): Member name for the article list
+
+        Returns:
+            bytes: The complete JSON document
+        """
+        head = dumps({key: None})[:-len(b'null}')]
+        rest = dumps(payload)
+        if rest == b'{}':
+            return head + self.encode_list(articles) + b'}'
+        return head + self.encode_list(articles) + b',' + rest[1:]
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
@@ -0,0 +1,400 @@
+"""
+Request timing and counters for the Flask News Website, in Prometheus format
+
+Metrics.init_app() instruments the app with:
+
+    http_requests_total                request count per route, method and status
+    http_request_duration_seconds      latency histogram per route, measured from
+                                       the first byte in to the last byte out
+    app_span_duration_seconds          time per route spent in each phase:
+                                       routing, fetch, render, serialize and
+                                       after_request
+
+plus any counters registered with register_counter() (the page cache and
+JSON fragment hit/miss counts, rate-limited requests, ...).
+
+Each worker records into plain in-process dicts - an observation is a
+bisect and two additions, cheap enough to leave on in production. Every
+few seconds a thread in each worker writes its totals to a shared SQLite
+file, and /metrics adds up the rows of every worker. When gunicorn reaps a
+worker, retire() folds its totals into a single row so counters stay
+monotonic without the table growing with every recycled worker.
+
+Use create_metrics() to build one from a URL such as ``memory://`` (this
+process only) or ``sqlite:///metrics.db`` (all workers).
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Seconds between writes of this worker's totals to the shared store
+FLUSH_INTERVAL = 5.0
+
+HELP = {
+    'http_requests_total': ('counter', 'Requests handled, by route, method and status'),
+    'http_request_duration_seconds': ('histogram', 'Request latency, by route'),
+    'app_span_duration_seconds': ('histogram', 'Time spent in each phase of a request, by route'),
+    'app_warmup_duration_seconds': ('histogram', 'Time each worker spent in each warm-up phase'),
+}
+
+
+def _labels(pairs):
+    """Render label pairs as a Prometheus label set"""
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class Metrics:
+    """Per-process metric registry with a pluggable shared store"""
+
+    # True when totals are written somewhere other processes can read
+    shared = False
+    # While True nothing is recorded (see paused())
+    _paused = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (name, label pairs) -> value
+        self._counters = {}
+        # (name, label pairs) -> [bucket counts..., +Inf count, sum]
+        self._histograms = {}
+        # name -> callable returning the current total
+        self._collectors = {}
+        self._flusher_pid = None
+
+    def inc(self, name, labels=(), amount=1):
+        if self._paused:
+            return
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, labels, seconds):
+        if self._paused:
+            return
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(BUCKETS) + 2)
+            histogram[bisect_left(BUCKETS, seconds)] += 1
+            histogram[-1] += seconds
+
+    def register_counter(self, name, description, read):
+        """
+        Expose a counter kept elsewhere, read when metrics are collected
+
+        Args:
+            name (str): Metric name, e.g. 'page_cache_hits_total'
+            description (str): HELP text
+            read (callable): Returns the current total for this process
+        """
+        HELP[name] = ('counter', description)
+        self._collectors[name] = read
+
+    @contextmanager
+    def paused(self):
+        """
+        Record nothing inside the block
+
+        Used for warm-up requests, which are not real traffic - and when
+        made in the gunicorn master, would be inherited by every worker.
+        """
+        self._paused = True
+        try:
+            yield
+        finally:
+            self._paused = False
+
+    @contextmanager
+    def span(self, name):
+        """Time a block as one phase of the current request"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_span(name, time.perf_counter() - start)
+
+    def observe_span(self, name, seconds):
+        self.observe('app_span_duration_seconds', (('route', _route()), ('span', name)), seconds)
+
+    def samples(self):
+        """
+        Current totals of this process as Prometheus samples
+
+        Returns:
+            list: (family, sample name, label string, value) tuples
+        """
+        samples = []
+        with self._lock:
+            counters = list(self._counters.items())
+            histograms = [(key, list(values)) for key, values in self._histograms.items()]
+        for (name, labels), value in counters:
+            samples.append((name, name, _labels(labels), value))
+        for (name, labels), values in histograms:
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), values):
+                cumulative += count
+                samples.append((name, f'{name}_bucket', _labels(labels + (('le', bound),)), cumulative))
+            samples.append((name, f'{name}_sum', _labels(labels), values[-1]))
+            samples.append((name, f'{name}_count', _labels(labels), cumulative))
+        for name, read in self._collectors.items():
+            samples.append((name, name, '', read()))
+        return samples
+
+    def flush(self):
+        """Write this process's totals to the shared store"""
+        self._store(self.samples())
+
+    def start_flusher(self):
+        """
+        Flush every FLUSH_INTERVAL from a daemon thread in this process
+
+        Safe to call on every request: it only starts a thread the first
+        time in each (forked) process.
+        """
+        if not self.shared or self._paused or self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+
+        def run():
+            while True:
+                time.sleep(FLUSH_INTERVAL)
+                try:
+                    self.flush()
+                except Exception:
+                    pass
+
+        threading.Thread(target=run, name='metrics-flush', daemon=True).start()
+
+    def _store(self, samples):
+        """Persist this process's samples (no-op for the in-process backend)"""
+
+    def collect(self):
+        """Totals over every worker, as (family, sample name, label string, value)"""
+        return self.samples()
+
+    def retire(self, pid):
+        """Fold a dead worker's totals into the retired totals"""
+
+    def render(self):
+        """Render the aggregated metrics in the Prometheus text exposition format"""
+        self.flush()
+        families = {}
+        for family, sample, labels, value in self.collect():
+            families.setdefault(family, []).append((sample, labels, value))
+
+        lines = []
+        for family in sorted(families):
+            kind, description = HELP.get(family, ('untyped', family))
+            lines.append(f'# HELP {family} {description}')
+            lines.append(f'# TYPE {family} {kind}')
+            for sample, labels, value in families[family]:
+                lines.append(f'{sample}{labels} {_format(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def init_app(self, app):
+        """Install the request timing hooks on a Flask app"""
+        app.wsgi_app = _TimingMiddleware(app.wsgi_app, self)
+
+        @app.before_request
+        def record_routing():
+            start = request.environ.get('metrics.start')
+            request.environ['metrics.route'] = _route()
+            if start is not None:
+                self.observe_span('routing', time.perf_counter() - start)
+
+        def render_started(sender, template, context, **extra):
+            g.metrics_render_start = time.perf_counter()
+
+        def render_finished(sender, template, context, **extra):
+            start = g.pop('metrics_render_start', None)
+            if start is not None:
+                self.observe_span('render', time.perf_counter() - start)
+
+        before_render_template.connect(render_started, app, weak=False)
+        template_rendered.connect(render_finished, app, weak=False)
+
+        # Time every after_request handler together
+        process_response = app.process_response
+
+        def timed_process_response(response):
+            with self.span('after_request'):
+                return process_response(response)
+
+        app.process_response = timed_process_response
+
+
+def _format(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _route():
+    """Low-cardinality route label for the current request"""
+    if not has_request_context():
+        return 'none'
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+class _TimingMiddleware:
+    """Measures whole requests, including streaming the body out"""
+
+    def __init__(self, app, metrics):
+        self.app = app
+        self.metrics = metrics
+
+    def __call__(self, environ, start_response):
+        start = time.perf_counter()
+        environ['metrics.start'] = start
+        status = []
+
+        def capture_start_response(status_line, headers, exc_info=None):
+            status[:] = [status_line.split(' ', 1)[0]]
+            return start_response(status_line, headers, exc_info)
+
+        app_iter = self.app(environ, capture_start_response)
+        return _TimedIterator(app_iter, self.metrics, environ, start, status)
+
+
+class _TimedIterator:
+    def __init__(self, app_iter, metrics, environ, start, status):
+        self._app_iter = app_iter
+        self._metrics = metrics
+        self._environ = environ
+        self._start = start
+        self._status = status
+
+    def __iter__(self):
+        return iter(self._app_iter)
+
+    def close(self):
+        try:
+            if hasattr(self._app_iter, 'close'):
+                self._app_iter.close()
+        finally:
+            route = self._environ.get('metrics.route', 'unmatched')
+            method = self._environ.get('REQUEST_METHOD', 'GET')
+            status = self._status[0] if self._status else '500'
+            self._metrics.inc('http_requests_total', (('route', route), ('method', method), ('status', status)))
+            self._metrics.observe(
+                'http_request_duration_seconds', (('route', route),), time.perf_counter() - self._start
+            )
+            self._metrics.start_flusher()
+
+
+class SQLiteMetrics(Metrics):
+    """Metrics aggregated across worker processes through a SQLite file"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS metric_samples (
+            pid INTEGER NOT NULL,
+            family TEXT NOT NULL,
+            sample TEXT NOT NULL,
+            labels TEXT NOT NULL,
+            value REAL NOT NULL,
+            PRIMARY KEY (pid, sample, labels)
+        );
+    """
+
+    shared = True
+
+    # pid under which the totals of exited workers are kept
+    RETIRED = 0
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._db_lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        # pids waiting to be retired, and held while retiring them
+        self._retiring = deque()
+        self._retire_lock = threading.Lock()
+
+    def _connection(self):
+        # One connection per process; never reuse one inherited across fork
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _store(self, samples):
+        pid = os.getpid()
+        with self._db_lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO metric_samples (pid, family, sample, labels, value) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    [(pid,) + sample for sample in samples],
+                )
+
+    def collect(self):
+        with self._db_lock:
+            return self._connection().execute(
+                'SELECT family, sample, labels, total(value) FROM metric_samples '
+                'GROUP BY family, sample, labels ORDER BY family, min(rowid)'
+            ).fetchall()
+
+    def retire(self, pid):
+        # gunicorn calls this from its SIGCHLD handler, which can interrupt
+        # the master while it is retiring another worker; waiting for the
+        # lock would then deadlock, so the pid is left to the running call
+        self._retiring.append(pid)
+        while self._retiring and self._retire_lock.acquire(blocking=False):
+            try:
+                while self._retiring:
+                    self._retire(self._retiring.popleft())
+            finally:
+                self._retire_lock.release()
+
+    def _retire(self, pid):
+        with self._db_lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    'INSERT INTO metric_samples (pid, family, sample, labels, value) '
+                    'SELECT ?, family, sample, labels, value FROM metric_samples WHERE pid = ? '
+                    'ON CONFLICT (pid, sample, labels) DO UPDATE SET value = value + excluded.value',
+                    (self.RETIRED, pid),
+                )
+                conn.execute('DELETE FROM metric_samples WHERE pid = ?', (pid,))
+
+
+def create_metrics(url):
+    """
+    Build a metrics registry from a URL
+
+    Args:
+        url (str): ``memory://`` or ``sqlite:///path/to/metrics.db``
+
+    Returns:
+        Metrics: The configured registry
+    """
+    if url.startswith('sqlite:///'):
+        return SQLiteMetrics(url[len('sqlite:///'):])
+    if url.startswith('memory://'):
+        return Metrics()
+    raise ValueError(f"Unsupported metrics URL: {url}")
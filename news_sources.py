@@ -0,0 +1,156 @@
+"""
+Article sources for the asyncio news path
+
+fetch_news_async() in app.py reads every configured source at once and
+merges the results newest first. Each source has its own timeout, so a
+slow or dead source only costs its own budget and is reported as such
+instead of stalling the whole request.
+
+    StoreSource   - the local ArticleStore (run in a thread, it may block)
+    RemoteSource  - another news API speaking the /api/news/<category> JSON
+                    format, fetched with a small asyncio-native HTTP client
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+import ssl
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+class ArticleSource:
+    """Base class for sources readable by gather_articles()"""
+
+    def __init__(self, name, timeout=2.0):
+        self.name = name
+        self.timeout = timeout
+
+    async def fetch(self, category, limit):
+        """Return up to ``limit`` articles for a category, newest first"""
+        raise NotImplementedError
+
+
+class StoreSource(ArticleSource):
+    """Reads the local article store without blocking the event loop"""
+
+    def __init__(self, store, name='store', timeout=1.0):
+        super().__init__(name, timeout)
+        self.store = store
+
+    async def fetch(self, category, limit):
+        articles = await asyncio.to_thread(self.store.fetch, category, limit)
+        # Same dict shape as the remote sources return
+        return [article.to_dict() for article in articles]
+
+
+class RemoteSource(ArticleSource):
+    """Reads a remote /api/news/<category> endpoint over plain asyncio streams"""
+
+    def __init__(self, url_template, name=None, timeout=2.0):
+        """
+        Args:
+            url_template (str): URL with {category} and {limit} placeholders,
+                e.g. 'http://peer:5000/api/news/{category}?page_size={limit}'
+        """
+        super().__init__(name or urlsplit(url_template).netloc, timeout)
+        self.url_template = url_template
+
+    async def fetch(self, category, limit):
+        url = self.url_template.format(category=category, limit=limit)
+        body = await http_get(url)
+        return json.loads(body).get('articles', [])
+
+
+async def http_get(url):
+    """
+    Minimal asyncio HTTP GET returning the response body
+
+    HTTP/1.0 with Connection: close keeps the response un-chunked, so the
+    body is simply everything after the headers. Cancelling the calling task
+    (e.g. via asyncio.wait_for) closes the connection.
+
+    Raises:
+        OSError: On connection failures or a non-200 status
+    """
+    parts = urlsplit(url)
+    secure = parts.scheme == 'https'
+    port = parts.port or (443 if secure else 80)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+
+    reader, writer = await asyncio.open_connection(
+        parts.hostname, port, ssl=ssl.create_default_context() if secure else None
+    )
+    try:
+        writer.write(
+            f"GET {path} HTTP/1.0\r\n"
+            f"Host: {parts.netloc}\r\n"
+            "Accept: application/json\r\n"
+            "Connection: close\r\n\r\n".encode('latin-1')
+        )
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+
+    head, _, body = response.partition(b'\r\n\r\n')
+    status_line = head.split(b'\r\n', 1)[0].decode('latin-1')
+    status = status_line.split(' ', 2)[1] if ' ' in status_line else ''
+    if status != '200':
+        raise OSError(f"{url} returned {status_line!r}")
+    return body
+
+
+async def _fetch_one(source, category, limit):
+    try:
+        articles = await asyncio.wait_for(source.fetch(category, limit), source.timeout)
+        return articles, 'ok'
+    except asyncio.TimeoutError:
+        logger.warning("News source %s timed out after %.1fs", source.name, source.timeout)
+        return [], 'timeout'
+    except Exception as e:
+        logger.warning("News source %s failed: %s", source.name, e)
+        return [], 'error'
+
+
+def _dedupe_key(article):
+    url = article.get('url')
+    if url and url != '#':
+        return url
+    return (article.get('title'), article.get('source'))
+
+
+async def gather_articles(sources, category, limit):
+    """
+    Query every source concurrently and merge the results newest first
+
+    Args:
+        sources (list): ArticleSource instances
+        category (str): News category
+        limit (int): Maximum number of articles to return
+
+    Returns:
+        tuple: (articles, statuses) where statuses maps source name to
+        'ok', 'timeout' or 'error'
+    """
+    results = await asyncio.gather(*(_fetch_one(source, category, limit) for source in sources))
+
+    statuses = {source.name: status for source, (_, status) in zip(sources, results)}
+    merged = heapq.merge(
+        *(articles for articles, _ in results), key=lambda article: -article.get('published', 0)
+    )
+
+    articles, seen = [], set()
+    for article in merged:
+        key = _dedupe_key(article)
+        if key in seen:
+            continue
+        seen.add(key)
+        articles.append(article)
+        if len(articles) >= limit:
+            break
+    return articles, statuses
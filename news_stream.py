@@ -0,0 +1,381 @@
+"""
+Live feed of new articles for /api/news/<category>/stream
+
+One ArticleFeed per process watches the article store. A single poller
+thread checks store.version() every ``poll_interval`` seconds and, when it
+has changed, reads the new articles with store.since(). Each article is
+handed only to the subscribers of its category. Idle subscribers cost a
+queue and an event each and are never touched by the poller, so thousands
+of open streams stay cheap. Polling the store, rather than hooking add(),
+also picks up articles written by other processes (INGEST_MODE=process,
+snapshot publishes).
+
+Streams are sent in one of three formats:
+
+    sse      text/event-stream, one ``article`` event per article with its
+             JSON as data and its id as the event id (the default)
+    html     text/event-stream, with the rendered news card as data
+    ndjson   application/x-ndjson, one article JSON object per line
+
+A stream resumes after the id in the Last-Event-ID header, which
+EventSource sends when it reconnects, or in ``?after=``; the articles of
+the category stored since then are sent first, in id order (at most the
+newest REPLAY_LIMIT of them, found among the last REPLAY_SCAN stored). Streams end after
+``max_seconds`` and clients reconnect from where they left off, so they
+never hold a worker for long.
+
+The WSGI route serves streams under sync and gevent workers (one
+greenlet per stream with gevent). Under the uvicorn profile, asgi.py serves
+them through StreamingASGI directly on the event loop, since the WSGI
+adapter would hold a thread per stream.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_SECONDS = 15
+# Reconnect delay suggested to EventSource clients
+RETRY_MS = 3000
+# Newest missed articles sent to a resuming client
+REPLAY_LIMIT = 100
+# Most recently stored articles searched for ones a resuming client missed
+REPLAY_SCAN = 5000
+# Articles queued for one slow client before the oldest are dropped
+MAX_PENDING = 500
+# Articles read from the store per since() call
+POLL_BATCH = 500
+
+STREAM_FORMATS = {
+    'sse': 'text/event-stream',
+    'html': 'text/event-stream',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def sse_event(event_id, data, event='article'):
+    """Frame bytes as one Server-Sent Event (multi-line data is split per line)"""
+    lines = b''.join(b'data: ' + line + b'\n' for line in data.split(b'\n'))
+    return b'id: %d\nevent: %s\n%s\n' % (event_id, event.encode('ascii'), lines)
+
+
+def stream_preamble(fmt):
+    """Bytes sent when a stream opens"""
+    if fmt == 'ndjson':
+        return b''
+    return b'retry: %d\n\n' % RETRY_MS
+
+
+def stream_heartbeat(fmt):
+    """Bytes sent on an idle stream so proxies and clients keep it open"""
+    if fmt == 'ndjson':
+        return b'\n'
+    return b': keep-alive\n\n'
+
+
+class Subscription:
+    """Articles waiting to be sent to one client streaming from a thread"""
+
+    def __init__(self, category):
+        self.category = category
+        self.pending = deque(maxlen=MAX_PENDING)
+        self._event = threading.Event()
+
+    def push(self, article):
+        # Called from the poller thread
+        self.pending.append(article)
+        self._event.set()
+
+    def wait(self, timeout):
+        """Block until articles arrive or ``timeout`` passes"""
+        self._event.wait(timeout)
+        self._event.clear()
+
+
+class AsyncSubscription(Subscription):
+    """Articles waiting to be sent to one client streaming on an event loop"""
+
+    def __init__(self, category, loop):
+        self.category = category
+        self.pending = deque(maxlen=MAX_PENDING)
+        self._loop = loop
+        self._event = asyncio.Event()
+
+    def push(self, article):
+        self.pending.append(article)
+        self._loop.call_soon_threadsafe(self._event.set)
+
+    async def wait(self, timeout):
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._event.clear()
+
+
+class ArticleFeed:
+    """In-process fanout of newly stored articles to stream subscribers"""
+
+    def __init__(self, store, poll_interval=1.0):
+        """
+        Args:
+            store (ArticleStore): Store to watch
+            poll_interval (float): Seconds between version checks
+        """
+        self.store = store
+        self.poll_interval = poll_interval
+        # category -> set of Subscriptions
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._last_id = 0
+        self._version = None
+        self.published = 0
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def _start(self):
+        # The poller starts with the first subscriber; threads do not survive
+        # a fork, so each worker starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        self._version = self.store.version()
+        self._last_id = self.store.last_id()
+        self._thread = threading.Thread(target=self._run, name='article-feed', daemon=True)
+        self._pid = os.getpid()
+        self._thread.start()
+
+    def subscribe(self, subscription):
+        with self._lock:
+            self._start()
+            self._subscribers.setdefault(subscription.category, set()).add(subscription)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.category)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.category]
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.poll()
+            except Exception as e:
+                logger.warning("Article feed poll failed: %s", e)
+
+    def poll(self):
+        """
+        Publish articles stored since the last poll
+
+        Costs one version() lookup when nothing has changed.
+
+        Returns:
+            int: Number of articles published
+        """
+        version = self.store.version()
+        if version == self._version:
+            return 0
+        with self._lock:
+            idle = not self._subscribers
+        if idle:
+            # Nobody to tell; just move past what is there
+            self._last_id = self.store.last_id()
+            self._version = version
+            return 0
+        published = 0
+        while True:
+            batch = self.store.since(self._last_id, POLL_BATCH)
+            for article in batch:
+                self._publish(article)
+            if batch:
+                self._last_id = batch[-1].id
+            published += len(batch)
+            if len(batch) < POLL_BATCH:
+                break
+        self._version = version
+        self.published += published
+        return published
+
+    def _publish(self, article):
+        with self._lock:
+            subscribers = list(self._subscribers.get(article.category, ()))
+        for subscription in subscribers:
+            subscription.push(article)
+
+    def replay(self, category, after):
+        """
+        Articles a client resuming after id ``after`` has missed
+
+        Ids, not publication dates, are what the client resumes from, so
+        this walks the store in id order with since().
+
+        Returns:
+            list: Up to REPLAY_LIMIT of the newest such articles, by id
+        """
+        if after is None:
+            return []
+        newest = self.store.last_id()
+        cursor = max(after, newest - REPLAY_SCAN)
+        missed = deque(maxlen=REPLAY_LIMIT)
+        while cursor < newest:
+            batch = self.store.since(cursor, POLL_BATCH)
+            if not batch:
+                break
+            missed.extend(article for article in batch if article.category == category)
+            cursor = batch[-1].id
+        return list(missed)
+
+    def stream(self, category, after, encode, fmt, max_seconds, heartbeat=HEARTBEAT_SECONDS):
+        """
+        Generate a stream's bytes from a worker thread (or greenlet)
+
+        Args:
+            category (str): Category to follow
+            after (int): Last article id the client has, or None for only
+                articles stored from now on
+            encode (callable): Frames one Article as bytes
+            fmt (str): Key of STREAM_FORMATS
+            max_seconds (float): When to end the stream
+            heartbeat (float): Seconds between keep-alives on an idle stream
+
+        Yields:
+            bytes: Chunks of the response body
+        """
+        subscription = Subscription(category)
+        # Subscribe before replaying, so nothing stored in between is lost
+        self.subscribe(subscription)
+        try:
+            yield stream_preamble(fmt)
+            sent = after or 0
+            for article in self.replay(category, after):
+                sent = article.id
+                yield encode(article)
+
+            deadline = time.monotonic() + max_seconds
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                subscription.wait(min(heartbeat, remaining))
+                chunk = self._drain(subscription, sent, encode)
+                if chunk:
+                    sent = chunk[0]
+                    yield chunk[1]
+                else:
+                    yield stream_heartbeat(fmt)
+        finally:
+            self.unsubscribe(subscription)
+
+    async def astream(self, category, after, encode, fmt, max_seconds, heartbeat=HEARTBEAT_SECONDS):
+        """
+        The same stream as stream(), generated on the running event loop
+
+        Subscribing and replaying read the store, which blocks, so they run
+        in a thread rather than stalling every other stream on the loop.
+        """
+        subscription = AsyncSubscription(category, asyncio.get_running_loop())
+        try:
+            # Inside the try: unsubscribe() is a no-op if this never finished
+            await asyncio.to_thread(self.subscribe, subscription)
+            yield stream_preamble(fmt)
+            sent = after or 0
+            for article in await asyncio.to_thread(self.replay, category, after):
+                sent = article.id
+                yield encode(article)
+
+            deadline = time.monotonic() + max_seconds
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                await subscription.wait(min(heartbeat, remaining))
+                chunk = self._drain(subscription, sent, encode)
+                if chunk:
+                    sent = chunk[0]
+                    yield chunk[1]
+                else:
+                    yield stream_heartbeat(fmt)
+        finally:
+            self.unsubscribe(subscription)
+
+    @staticmethod
+    def _drain(subscription, sent, encode):
+        """The queued articles not yet sent as one chunk, with the newest id"""
+        parts = []
+        while subscription.pending:
+            article = subscription.pending.popleft()
+            # Already sent during the replay
+            if article.id > sent:
+                sent = article.id
+                parts.append(encode(article))
+        if not parts:
+            return None
+        return sent, b''.join(parts)
+
+
+class StreamingASGI:
+    """
+    ASGI app serving article streams on the event loop, passing every other
+    request to the wrapped app (the Flask app through a2wsgi)
+    """
+
+    def __init__(self, app, open_stream):
+        """
+        Args:
+            app: ASGI application for everything else
+            open_stream (callable): Called with (path, query_string,
+                headers, client) - the path percent-decoded as in the ASGI
+                scope, headers keyed by lower-case name, client
+                the peer address; returns None when the request is not a
+                stream, else (status, headers, async iterable of body chunks)
+        """
+        self.app = app
+        self.open_stream = open_stream
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] != 'GET':
+            return await self.app(scope, receive, send)
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        client = scope['client'][0] if scope.get('client') else None
+        opened = self.open_stream(scope['path'], scope['query_string'].decode('latin-1'), headers, client)
+        if opened is None:
+            return await self.app(scope, receive, send)
+
+        status, response_headers, body = opened
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in response_headers],
+        })
+        disconnected = asyncio.ensure_future(self._wait_disconnect(receive))
+        try:
+            async for chunk in body:
+                if disconnected.done():
+                    break
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        except OSError:
+            pass
+        finally:
+            disconnected.cancel()
+            if hasattr(body, 'aclose'):
+                await body.aclose()
+
+    @staticmethod
+    async def _wait_disconnect(receive):
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
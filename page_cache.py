@@ -0,0 +1,212 @@
+"""
+Rendered page cache for the Flask News Website
+
+Rendered pages are stored against a version tag taken from the article store
+(see ArticleStore.page_version). A lookup only hits when the stored tag still
+matches, so adding articles to a category invalidates exactly the pages built
+from it without any explicit purge.
+
+Two backends are provided:
+
+    MemoryPageCache  - per-process LRU bounded by total body size (default)
+    SQLitePageCache  - a SQLite file shared by every gunicorn worker, with the
+                       same size bound and least-recently-used eviction
+
+Use create_page_cache() to build one from a URL such as ``memory://`` or
+``sqlite:///page_cache.db``.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class PageCache:
+    """Base class for page caches"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        """
+        Look up a cached page
+
+        Args:
+            key (str): Cache key, e.g. 'news:sports:'
+            version (str): Current version tag for the page
+
+        Returns:
+            bytes: The cached body, or None if missing or stale
+        """
+        raise NotImplementedError
+
+    def set(self, key, version, body):
+        """Store a rendered body under a key and version tag"""
+        raise NotImplementedError
+
+    def clear(self):
+        """Drop every cached page"""
+        raise NotImplementedError
+
+    def get_or_render(self, key, version, render):
+        """
+        Return the cached body for key/version, rendering and storing it on a miss
+
+        Args:
+            key (str): Cache key
+            version (str): Current version tag for the page
+            render (callable): Returns the page body as str or bytes
+
+        Returns:
+            bytes: The page body
+        """
+        body = self.get(key, version)
+        if body is not None:
+            self.hits += 1
+            return body
+
+        self.misses += 1
+        body = render()
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.set(key, version, body)
+        return body
+
+
+class MemoryPageCache(PageCache):
+    """In-process LRU cache bounded by the total size of stored bodies"""
+
+    def __init__(self, max_bytes):
+        super().__init__(max_bytes)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, version, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[1])
+            self._entries[key] = (version, body)
+            self._size += len(body)
+
+            # Evict least recently used pages until back under the bound
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+class SQLitePageCache(PageCache):
+    """Cache shared between worker processes through a SQLite file"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS page_cache (
+            key TEXT PRIMARY KEY,
+            version TEXT NOT NULL,
+            body BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            accessed REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_page_cache_accessed ON page_cache (accessed);
+    """
+
+    def __init__(self, path, max_bytes):
+        super().__init__(max_bytes)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        # One connection per process; never reuse one inherited across fork
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key, version):
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                'SELECT body FROM page_cache WHERE key = ? AND version = ?', (key, version)
+            ).fetchone()
+            if row is None:
+                return None
+            with conn:
+                conn.execute(
+                    'UPDATE page_cache SET accessed = ? WHERE key = ?', (time.time(), key)
+                )
+        return bytes(row[0])
+
+    def set(self, key, version, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO page_cache (key, version, body, size, accessed) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (key, version, sqlite3.Binary(body), len(body), time.time()),
+                )
+                total = conn.execute('SELECT total(size) FROM page_cache').fetchone()[0]
+                if total > self.max_bytes:
+                    self._evict(conn, total - self.max_bytes)
+
+    @staticmethod
+    def _evict(conn, excess):
+        # Walk entries oldest-access first until enough bytes are released
+        doomed = []
+        for key, size in conn.execute('SELECT key, size FROM page_cache ORDER BY accessed'):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany('DELETE FROM page_cache WHERE key = ?', doomed)
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute('DELETE FROM page_cache')
+
+
+def create_page_cache(url, max_bytes):
+    """
+    Build a page cache from a URL
+
+    Args:
+        url (str): ``memory://`` or ``sqlite:///path/to/page_cache.db``
+        max_bytes (int): Upper bound on the total size of cached bodies
+
+    Returns:
+        PageCache: The configured cache
+    """
+    if url.startswith('sqlite:///'):
+        return SQLitePageCache(url[len('sqlite:///'):], max_bytes)
+    if url.startswith('memory://'):
+        return MemoryPageCache(max_bytes)
+    raise ValueError(f"Unsupported page cache URL: {url}")
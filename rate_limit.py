@@ -0,0 +1,274 @@
+"""
+Token-bucket rate limiting for the Flask News Website
+
+Each (route, client IP) pair gets a bucket holding up to ``capacity``
+tokens that refills at ``capacity`` per ``period``. A request takes one
+token; with the bucket empty it is refused with 429 Too Many Requests and
+a Retry-After header saying when the next token arrives.
+
+Two backends are provided:
+
+    MemoryRateLimiter  - per-process buckets (limits apply per worker)
+    SQLiteRateLimiter  - buckets in a SQLite file shared by every gunicorn
+                         worker; a check is one UPSERT ... RETURNING
+
+Buckets are keyed on request.remote_addr. Behind a reverse proxy that is
+the proxy's address for every client, so the app resolves the real one
+from X-Forwarded-For with ProxyFix (TRUSTED_PROXIES hops); streams served
+on the event loop use forwarded_client() to do the same.
+
+Use create_rate_limiter() to build one from a URL such as ``memory://`` or
+``sqlite:///rate_limits.db``, and the limit() decorator to apply it:
+
+    @app.route('/contact', methods=['GET', 'POST'])
+    @limiter.limit('contact', '5/minute', methods=('POST',))
+    def contact(): ...
+"""
+
+import inspect
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify, request
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Buckets idle this long are full again and can be forgotten
+IDLE_SECONDS = 3600
+
+
+def parse_limit(spec):
+    """
+    Parse a limit such as '5/minute' or '100/60' (requests per seconds)
+
+    Returns:
+        tuple: (capacity, tokens refilled per second)
+
+    Raises:
+        ValueError: If the limit is malformed
+    """
+    try:
+        count, _, period = spec.partition('/')
+        capacity = int(count)
+        seconds = PERIODS[period] if period in PERIODS else float(period)
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid rate limit: {spec!r}")
+    if capacity <= 0 or seconds <= 0:
+        raise ValueError(f"Invalid rate limit: {spec!r}")
+    return capacity, capacity / seconds
+
+
+def forwarded_client(peer, forwarded_for, trusted_hops):
+    """
+    The client address as werkzeug's ProxyFix resolves it
+
+    Args:
+        peer (str): Address the connection came from
+        forwarded_for (str): X-Forwarded-For header, or None
+        trusted_hops (int): Reverse proxies in front of the app
+
+    Returns:
+        str: The address ``trusted_hops`` entries from the end of
+        X-Forwarded-For, or ``peer`` when there are fewer entries
+    """
+    if not trusted_hops or not forwarded_for:
+        return peer
+    hops = [hop.strip() for hop in forwarded_for.split(',')]
+    if len(hops) < trusted_hops:
+        return peer
+    return hops[-trusted_hops] or peer
+
+
+class RateLimiter:
+    """Base class for rate limiters"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.limited = 0
+
+    def consume(self, key, capacity, rate):
+        """
+        Take one token from a bucket
+
+        Args:
+            key (str): Bucket key, e.g. 'contact:203.0.113.7'
+            capacity (int): Bucket size (the allowed burst)
+            rate (float): Tokens refilled per second
+
+        Returns:
+            float: 0 if the request may proceed, otherwise the number of
+            seconds until a token is available
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        """Forget every bucket"""
+        raise NotImplementedError
+
+    def limit(self, name, spec, methods=None):
+        """
+        Decorate a view so each client IP may call it at most ``spec`` often
+
+        Args:
+            name (str): Route name used in the bucket key
+            spec (str): Limit such as '60/minute'
+            methods (tuple): Only count these HTTP methods (default: all)
+        """
+        capacity, rate = parse_limit(spec)
+
+        def check():
+            if not self.enabled or (methods is not None and request.method not in methods):
+                return None
+            wait = self.consume(f"{name}:{request.remote_addr}", capacity, rate)
+            if not wait:
+                return None
+            self.limited += 1
+            return too_many_requests(wait)
+
+        def decorator(view):
+            if inspect.iscoroutinefunction(view):
+                @wraps(view)
+                async def async_wrapper(*args, **kwargs):
+                    return check() or await view(*args, **kwargs)
+                return async_wrapper
+
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                return check() or view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+def too_many_requests(wait):
+    """429 response telling the client to retry after ``wait`` seconds"""
+    response = jsonify({
+        'status': 'error',
+        'message': 'Too many requests. Please try again later.'
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(wait)))
+    return response
+
+
+class MemoryRateLimiter(RateLimiter):
+    """Per-process token buckets"""
+
+    def __init__(self, enabled=True):
+        super().__init__(enabled)
+        self._lock = threading.Lock()
+        # key -> (tokens, updated)
+        self._buckets = {}
+        self._next_sweep = time.monotonic() + IDLE_SECONDS
+
+    def consume(self, key, capacity, rate):
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0
+            self._buckets[key] = (tokens, now)
+        return (1 - tokens) / rate
+
+    def _sweep(self, now):
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if now - bucket[1] < IDLE_SECONDS
+        }
+        self._next_sweep = now + IDLE_SECONDS
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteRateLimiter(RateLimiter):
+    """Token buckets shared between worker processes through a SQLite file"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated REAL NOT NULL,
+            allowed INTEGER NOT NULL
+        ) WITHOUT ROWID;
+    """
+
+    # Refill, then take a token if one is available, in a single statement
+    CONSUME = """
+        INSERT INTO rate_limits (key, tokens, updated, allowed)
+        VALUES (:key, :capacity - 1, :now, 1)
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = min(:capacity, tokens + (:now - updated) * :rate)
+                     - (min(:capacity, tokens + (:now - updated) * :rate) >= 1),
+            allowed = min(:capacity, tokens + (:now - updated) * :rate) >= 1,
+            updated = :now
+        RETURNING tokens, allowed
+    """
+
+    # Drop idle buckets roughly once per this many checks
+    SWEEP_EVERY = 10000
+
+    def __init__(self, path, enabled=True):
+        super().__init__(enabled)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._checks = 0
+
+    def _connection(self):
+        # One connection per process; never reuse one inherited across fork
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # Counters are disposable: skip fsync on every request
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def consume(self, key, capacity, rate):
+        # Wall clock, since every process shares the timestamps
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            tokens, allowed = conn.execute(
+                self.CONSUME, {'key': key, 'capacity': capacity, 'rate': rate, 'now': now}
+            ).fetchone()
+            self._checks += 1
+            if self._checks % self.SWEEP_EVERY == 0:
+                conn.execute('DELETE FROM rate_limits WHERE updated < ?', (now - IDLE_SECONDS,))
+        if allowed:
+            return 0
+        return (1 - tokens) / rate
+
+    def clear(self):
+        with self._lock:
+            self._connection().execute('DELETE FROM rate_limits')
+
+
+def create_rate_limiter(url, enabled=True):
+    """
+    Build a rate limiter from a URL
+
+    Args:
+        url (str): ``memory://`` or ``sqlite:///path/to/rate_limits.db``
+        enabled (bool): When False, limit() lets every request through
+
+    Returns:
+        RateLimiter: The configured limiter
+    """
+    if url.startswith('sqlite:///'):
+        return SQLiteRateLimiter(url[len('sqlite:///'):], enabled)
+    if url.startswith('memory://'):
+        return MemoryRateLimiter(enabled)
+    raise ValueError(f"Unsupported rate limit store URL: {url}")
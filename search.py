@@ -0,0 +1,251 @@
+"""
+Full-text article search for the Flask News Website
+
+SearchIndex is an in-memory inverted index over each article's title,
+content, author and source, ranked with BM25. It is kept up to date
+incrementally: sync() asks the article store for the articles added since
+the last one it indexed, so new articles are searchable on the next query
+and nothing is ever re-indexed.
+
+    - postings map each term to {article id: weighted term frequency}
+    - a sorted term list gives prefix matches for the last query word
+      ("elec" finds "electric" and "election") with one bisect; it is
+      re-sorted once after a sync adds terms, not on every insert
+    - only the top ``limit`` scores are ranked, via heapq.nlargest
+    - per article the index keeps only its length and category; the hits
+      are read back with store.get(), so the corpus is not copied onto
+      every worker's heap (or into the saved index) next to the store
+
+Query cost depends on the number of postings for the query terms, not on
+the size of the corpus.
+
+save() and load() persist the index, so a new process (a recycled gunicorn
+worker, a restarted master) loads it instead of re-tokenizing every
+article and only indexes what was added since.
+"""
+
+import heapq
+import math
+import os
+import pickle
+import re
+import threading
+import sys
+from bisect import bisect_left
+
+# Field weights: a match in the title counts three times a match in the body
+FIELD_WEIGHTS = {'title': 3.0, 'content': 1.0, 'author': 2.0, 'source': 1.5}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Prefix matches considered for the last query word
+MAX_PREFIX_TERMS = 50
+# Articles pulled from the store per sync() round trip
+SYNC_BATCH = 1000
+# Bumped whenever the saved layout changes; older files are ignored
+SNAPSHOT_FORMAT = 2
+
+STOP_WORDS = frozenset("""
+    a an and are as at be but by for from has have in is it its of on or that
+    the their this to was were will with
+""".split())
+
+_TOKEN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Split text into lowercase index terms, dropping stop words"""
+    if not text:
+        return []
+    return [term for term in _TOKEN.findall(text.lower()) if term not in STOP_WORDS]
+
+
+class SearchIndex:
+    """Inverted index with BM25 ranking over an ArticleStore"""
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._postings = {}
+        # Sorted self._postings keys, rebuilt on demand once new terms arrive
+        self._terms = []
+        self._terms_sorted = True
+        self._lengths = {}
+        self._categories = {}
+        self._total_length = 0.0
+        self._last_id = 0
+        # (category, url) of the article stored under _last_id, so load()
+        # can tell the saved index belongs to this store
+        self._last_key = None
+        self._synced_version = None
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def add(self, article):
+        """Index one stored Article"""
+        frequencies = {}
+        length = 0.0
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(getattr(article, field)):
+                frequencies[term] = frequencies.get(term, 0.0) + weight
+                length += weight
+
+        article_id = article.id
+        for term, frequency in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._terms_sorted = False
+            postings[article_id] = frequency
+
+        self._lengths[article_id] = length
+        self._categories[article_id] = sys.intern(article.category)
+        self._total_length += length
+        if article_id >= self._last_id:
+            self._last_id = article_id
+            self._last_key = (article.category, article.url)
+
+    def sync(self):
+        """
+        Index articles added to the store since the last sync
+
+        Costs one version() lookup when nothing has changed.
+        
+        Returns:
+            int: Number of articles indexed
+        """
+        version = self.store.version()
+        if version == self._synced_version:
+            return 0
+        indexed = 0
+        with self._lock:
+            if version == self._synced_version:
+                return 0
+            while True:
+                batch = self.store.since(self._last_id, SYNC_BATCH)
+                for article in batch:
+                    self.add(article)
+                indexed += len(batch)
+                if len(batch) < SYNC_BATCH:
+                    break
+            self._synced_version = version
+        return indexed
+
+    def save(self, path):
+        """Write the index to ``path``, replacing any previous file atomically"""
+        with self._lock:
+            data = pickle.dumps({
+                'format': SNAPSHOT_FORMAT,
+                'postings': self._postings,
+                'lengths': self._lengths,
+                'categories': self._categories,
+                'total_length': self._total_length,
+                'last_id': self._last_id,
+                'last_key': self._last_key,
+            }, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """
+        Replace the index with one written by save()
+        
+        The file is only used if it was built from this store: the newest
+        article it indexed must still be stored under the same id.
+        
+        Returns:
+            bool: True if the file was loaded
+        """
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return False
+        if not isinstance(state, dict) or state.get('format') != SNAPSHOT_FORMAT:
+            return False
+
+        last_id = state['last_id']
+        if last_id:
+            article = self.store.get(last_id)
+            if article is None or (article.category, article.url) != state['last_key']:
+                return False
+
+        with self._lock:
+            self._postings = state['postings']
+            self._terms = []
+            self._terms_sorted = False
+            self._lengths = state['lengths']
+            self._categories = {
+                article_id: sys.intern(category) for article_id, category in state['categories'].items()
+            }
+            self._total_length = state['total_length']
+            self._last_id = last_id
+            self._last_key = state['last_key']
+            self._synced_version = None
+        return True
+
+    def _expand(self, term, prefix):
+        """Return the indexed terms a query word matches"""
+        if not prefix:
+            return [term] if term in self._postings else []
+        if not self._terms_sorted:
+            self._terms = sorted(self._postings)
+            self._terms_sorted = True
+        matches = []
+        position = bisect_left(self._terms, term)
+        while position < len(self._terms) and len(matches) < MAX_PREFIX_TERMS:
+            candidate = self._terms[position]
+            if not candidate.startswith(term):
+                break
+            matches.append(candidate)
+            position += 1
+        return matches
+
+    def search(self, query, limit=10, category=None):
+        """
+        Return the best matching articles for a query
+
+        Every word is matched exactly except the last, which also matches
+        as a prefix so results update while the user is still typing.
+
+        Args:
+            query (str): Free-text query
+            limit (int): Maximum number of results
+            category (str): Only return articles from this category
+
+        Returns:
+            list: Articles, best match first
+        """
+        self.sync()
+        words = tokenize(query)
+        if not words:
+            return []
+
+        with self._lock:
+            article_count = len(self._lengths)
+            average_length = self._total_length / article_count if article_count else 0.0
+            scores = {}
+            for i, word in enumerate(words):
+                for term in self._expand(word, prefix=(i == len(words) - 1)):
+                    postings = self._postings[term]
+                    idf = math.log(1 + (article_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for article_id, frequency in postings.items():
+                        norm = K1 * (1 - B + B * self._lengths[article_id] / average_length)
+                        score = idf * frequency * (K1 + 1) / (frequency + norm)
+                        scores[article_id] = scores.get(article_id, 0.0) + score
+
+            if category:
+                scores = {
+                    article_id: score for article_id, score in scores.items()
+                    if self._categories[article_id] == category
+                }
+            # Ties go to the newer article
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+
+        articles = (self.store.get(article_id) for article_id, _ in best)
+        return [article for article in articles if article is not None]
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Local SMTP sink for developing and testing contact_queue.py
+
+Accepts any mail and keeps it in memory instead of delivering it. A
+``--delay`` per message simulates a slow mail server, which is a quick way
+to check that contact form POSTs do not wait for delivery.
+
+    python smtp_sink.py --port 8025
+    MAIL_SERVER=127.0.0.1 MAIL_PORT=8025 python app.py
+
+From Python, serve(port=0) starts it on a free port in a background thread;
+SinkHandler.messages holds the raw messages received.
+"""
+
+import argparse
+import socketserver
+import threading
+import time
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP for smtplib: HELO/EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT"""
+
+    # Raw messages received, shared by every connection
+    messages = []
+    # Number of connections accepted, handy for checking connection reuse
+    connections = 0
+    # Seconds to wait before acknowledging each message
+    delay = 0.0
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode('ascii'))
+
+    def handle(self):
+        type(self).connections += 1
+        self.reply('220 localhost smtp-sink ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+
+            if verb == 'EHLO':
+                self.wfile.write(b'250-localhost\r\n250 8BITMIME\r\n')
+            elif verb in ('HELO', 'MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                self._read_data()
+                if self.delay:
+                    time.sleep(self.delay)
+                self.reply('250 OK queued')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+    def _read_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b'.\r\n', b'.\n'):
+                break
+            # Undo dot-stuffing
+            lines.append(line[1:] if line.startswith(b'..') else line)
+        type(self).messages.append(b''.join(lines))
+
+
+class SinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve(host='127.0.0.1', port=0, delay=0.0):
+    """
+    Start the sink in a daemon thread
+
+    Returns:
+        SinkServer: The running server; it listens on server.server_address
+    """
+    SinkHandler.delay = delay
+    server = SinkServer((host, port), SinkHandler)
+    threading.Thread(target=server.serve_forever, name='smtp-sink', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local SMTP server that keeps mail in memory')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--delay', type=float, default=0.0, help='seconds to stall on each message')
+    args = parser.parse_args()
+
+    SinkHandler.delay = args.delay
+    server = SinkServer((args.host, args.port), SinkHandler)
+    print(f"📭 SMTP sink on {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"Received {len(SinkHandler.messages)} messages")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped article snapshots shared by every gunicorn worker
+
+A snapshot is one immutable binary file holding the whole corpus:
+
+    header      magic, format, generation, article count, largest id,
+                section offsets
+    categories  name, version, modified time, article count and the start
+                of the category's slice in the row index
+    rows        one fixed-width record per article in id order: published,
+                id, url hash and (offset, length) pairs into the string heap
+    index       uint32 row numbers, newest first within each category
+    strings     UTF-8 text of every string field
+
+SnapshotArticleStore maps the file read-only. The operating system keeps a
+single copy in the page cache for all workers, lookups read the index
+arrays in place (rows by id and each category by date are found by
+bisection), and Python objects are only created for the articles on
+the page being served, so copy-on-write never duplicates the corpus and
+worker recycling (max_requests) costs nothing to warm up.
+
+Writes build a complete new file next to the old one and os.replace() it
+into position. Readers notice the new inode within ``refresh_interval``
+seconds and switch over; in-flight reads keep the old mapping alive until
+they finish. Adding articles copies the old file's rows, index slices and
+strings byte for byte and appends the new ones, so only the new articles
+become Python objects, and the URL hashes used to drop duplicates are
+read once per snapshot and carried over to the next one. Writers in every
+process take an flock on ``<path>.lock`` for the whole read-merge-replace,
+so concurrent publishers never overwrite each other's articles.
+
+    python snapshot.py publish sqlite:///news.db news.snap
+"""
+
+import heapq
+import itertools
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from bisect import bisect_right
+from contextlib import contextmanager
+
+from article_store import ARTICLE_FIELDS, Article, ArticleStore, url_hash
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: publishers are only serialised within one process
+    fcntl = None
+
+MAGIC = b'NEWSSNAP'
+FORMAT_VERSION = 3
+
+# magic, format, generation, article count, largest article id, category
+# count, categories offset, rows offset, index offset, strings offset
+HEADER = struct.Struct('<8sIQIQIQQQQ')
+# name offset, name length, version, modified, count, index start
+CATEGORY = struct.Struct('<IIQqII')
+# published, id, category number, url hash (20 bytes, zero when absent),
+# then (offset, length) for each of ARTICLE_FIELDS
+ROW = struct.Struct('<qQI20s' + 'II' * len(ARTICLE_FIELDS))
+
+# Length marking a field that is None
+NULL = 0xFFFFFFFF
+NO_HASH = bytes(20)
+
+
+@contextmanager
+def publish_lock(path):
+    """Hold the cross-process writer lock of the snapshot at ``path``"""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class _Strings:
+    """String heap being built, optionally after ``base`` bytes copied from another"""
+
+    def __init__(self, base=0):
+        self.base = base
+        self.data = bytearray()
+
+    def add(self, value):
+        if value is None:
+            return 0, NULL
+        data = str(value).encode('utf-8')
+        offset = self.base + len(self.data)
+        self.data.extend(data)
+        return offset, len(data)
+
+
+def _pack_row(article, number, strings):
+    digest = url_hash(article.url)
+    fields = []
+    for field in ARTICLE_FIELDS:
+        fields.extend(strings.add(getattr(article, field)))
+    return ROW.pack(
+        article.published, article.id, number,
+        bytes.fromhex(digest) if digest else NO_HASH, *fields
+    )
+
+
+def _write_file(path, generation, article_count, last_id, category_records, rows, index, strings):
+    """Lay out the sections after the header and replace ``path`` atomically"""
+    categories_offset = HEADER.size
+    rows_offset = categories_offset + CATEGORY.size * len(category_records)
+    index_offset = rows_offset + ROW.size * article_count
+    strings_offset = index_offset + sum(len(part) for part in index)
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, generation or time.time_ns(), article_count, last_id,
+        len(category_records), categories_offset, rows_offset, index_offset, strings_offset
+    )
+
+    temp_path = f"{path}.tmp-{os.getpid()}"
+    with open(temp_path, 'wb') as f:
+        f.write(header)
+        f.writelines(category_records)
+        f.writelines(rows)
+        f.writelines(index)
+        f.writelines(strings)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def _pack_index(rows):
+    return struct.pack(f'<{len(rows)}I', *rows)
+
+
+def write_snapshot(path, categories, generation=None):
+    """
+    Write a snapshot atomically
+
+    Args:
+        path (str): Destination file
+        categories (dict): category -> {'articles': [Article, ...],
+            'version': int, 'modified': int}
+        generation (int): Snapshot generation, defaults to the current time
+    """
+    strings = _Strings()
+
+    # Rows in id order, so since() and get() can bisect them
+    numbered = sorted(
+        ((article, number) for number, info in enumerate(categories.values()) for article in info['articles']),
+        key=lambda item: item[0].id
+    )
+    rows, row_of = [], {}
+    for article, number in numbered:
+        row_of[article.id] = len(rows)
+        rows.append(_pack_row(article, number, strings))
+
+    category_records, index, indexed = [], [], 0
+    for name, info in categories.items():
+        ordered = sorted(info['articles'], key=lambda a: a.sort_key)
+        name_offset, name_length = strings.add(name)
+        category_records.append(CATEGORY.pack(
+            name_offset, name_length, info['version'], info['modified'], len(ordered), indexed
+        ))
+        index.append(_pack_index([row_of[article.id] for article in ordered]))
+        indexed += len(ordered)
+
+    _write_file(
+        path, generation, len(rows), numbered[-1][0].id if numbered else 0,
+        category_records, rows, index, [strings.data]
+    )
+
+
+def extend_snapshot(path, snapshot, category, articles, generation=None):
+    """
+    Write a snapshot holding ``snapshot`` plus new articles in one category
+
+    The existing rows, index slices and strings are copied as bytes rather
+    than read back into Articles.
+
+    Args:
+        path (str): Destination file
+        snapshot (_Snapshot): The snapshot being extended
+        category (str): Category of the new articles
+        articles (list): New Articles, all with ids above snapshot.last_id
+        generation (int): Snapshot generation, defaults to the current time
+    """
+    view = snapshot.view
+    old_strings = view[snapshot.strings_offset:]
+    strings = _Strings(len(old_strings))
+    names = list(snapshot.category_names)
+    if category not in snapshot.categories:
+        names.append(category)
+    number = names.index(category)
+
+    ordered = sorted(articles, key=lambda a: a.sort_key)
+    new_rows = {article.id: snapshot.article_count + i for i, article in enumerate(articles)}
+    rows = [view[snapshot.rows_offset:snapshot.rows_offset + snapshot.article_count * ROW.size]]
+    rows.extend(_pack_row(article, number, strings) for article in articles)
+
+    category_records, index, indexed = [], [], 0
+    for name in names:
+        version, modified, count, start, _ = snapshot.categories.get(name, (0, 0, 0, 0, None))
+        old = snapshot.index[start:start + count]
+        if name == category:
+            # The new articles are usually the newest, so this is a few
+            # bisections and one copy of the slice
+            keys = _CategoryKeys(snapshot, start, count)
+            merged, previous = [], 0
+            for article in ordered:
+                position = bisect_right(keys, article.sort_key)
+                merged.append(old[previous:position].tobytes())
+                merged.append(_pack_index([new_rows[article.id]]))
+                previous = position
+            merged.append(old[previous:].tobytes())
+            index.append(b''.join(merged))
+            version, modified, count = version + 1, int(time.time()), count + len(ordered)
+        else:
+            index.append(old.tobytes())
+        # Name strings are already in the copied heap
+        if name in snapshot.categories:
+            name_offset, name_length = snapshot.name_spans[name]
+        else:
+            name_offset, name_length = strings.add(name)
+        category_records.append(CATEGORY.pack(name_offset, name_length, version, modified, count, indexed))
+        indexed += count
+
+    _write_file(
+        path, generation, snapshot.article_count + len(articles),
+        max([snapshot.last_id] + [article.id for article in articles]),
+        category_records, rows, index, [old_strings, strings.data]
+    )
+
+
+class _Snapshot:
+    """One mapped snapshot file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+
+        (magic, fmt, self.generation, self.article_count, self.last_id, category_count,
+         categories_offset, self.rows_offset, index_offset, self.strings_offset) = \
+            HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} article snapshot")
+
+        # uint32 row numbers, read in place from the mapping
+        self.index = self.view[index_offset:self.strings_offset].cast('I')
+
+        self.categories = {}
+        self.name_spans = {}
+        for number in range(category_count):
+            name_offset, name_length, version, modified, count, start = \
+                CATEGORY.unpack_from(self.map, categories_offset + number * CATEGORY.size)
+            name = self._string(name_offset, name_length)
+            self.categories[name] = (version, modified, count, start, number)
+            self.name_spans[name] = (name_offset, name_length)
+        self.category_names = list(self.categories)
+        # URL hashes of every row, read on first use by a writer
+        self._url_hashes = None
+
+    def _string(self, offset, length):
+        if length == NULL:
+            return None
+        start = self.strings_offset + offset
+        return str(self.view[start:start + length], 'utf-8')
+
+    def sort_key(self, row):
+        published, article_id = struct.unpack_from('<qQ', self.map, self.rows_offset + row * ROW.size)
+        return (-published, -article_id)
+
+    def article(self, row):
+        values = ROW.unpack_from(self.map, self.rows_offset + row * ROW.size)
+        published, article_id, number, _ = values[:4]
+        return Article(article_id, self.category_names[number], published, *(
+            self._string(values[4 + 2 * i], values[5 + 2 * i]) for i in range(len(ARTICLE_FIELDS))
+        ))
+
+    def row_id(self, row):
+        return struct.unpack_from('<Q', self.map, self.rows_offset + row * ROW.size + 8)[0]
+
+    def rows_since(self, article_id):
+        """Row numbers of articles with a larger id, in id order"""
+        return range(bisect_right(_RowIds(self), article_id), self.article_count)
+
+    def row_of(self, article_id):
+        """Row number of an article id, or None if it is not in the snapshot"""
+        row = bisect_right(_RowIds(self), article_id) - 1
+        if row >= 0 and self.row_id(row) == article_id:
+            return row
+        return None
+
+    def url_hashes(self):
+        """Set of the URL hashes in this snapshot, read once and then kept"""
+        if self._url_hashes is None:
+            hashes = set()
+            for row in range(self.article_count):
+                digest = ROW.unpack_from(self.map, self.rows_offset + row * ROW.size)[3]
+                if digest != NO_HASH:
+                    hashes.add(digest.hex())
+            self._url_hashes = hashes
+        return self._url_hashes
+
+
+class _RowIds:
+    """Sequence of the article ids of all rows (ascending), for bisect"""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def __len__(self):
+        return self.snapshot.article_count
+
+    def __getitem__(self, row):
+        return self.snapshot.row_id(row)
+
+
+class _CategoryKeys:
+    """Sequence of sort keys over one category's index slice, for bisect"""
+
+    def __init__(self, snapshot, start, count):
+        self.snapshot = snapshot
+        self.start = start
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, position):
+        return self.snapshot.sort_key(self.snapshot.index[self.start + position])
+
+
+class SnapshotArticleStore(ArticleStore):
+    """ArticleStore reading a memory-mapped snapshot shared across processes"""
+
+    def __init__(self, path, refresh_interval=1.0):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._checked = 0.0
+
+    def _current(self):
+        """Return the mapped snapshot, switching to a newer file when one appears"""
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._checked < self.refresh_interval:
+            return self._snapshot
+        self._checked = now
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return self._snapshot
+        if self._snapshot is None or inode != self._snapshot.inode:
+            # The old mapping stays valid for readers still holding it
+            self._snapshot = _Snapshot(self.path)
+        return self._snapshot
+
+    def _info(self, category):
+        snapshot = self._current()
+        if snapshot is None:
+            return None, None
+        return snapshot, snapshot.categories.get(category)
+
+    def has_category(self, category):
+        return self._info(category)[1] is not None
+
+    def categories(self):
+        snapshot = self._current()
+        return list(snapshot.categories) if snapshot else []
+
+    def count(self, category):
+        info = self._info(category)[1]
+        return info[2] if info else 0
+
+    def version(self, category=None):
+        snapshot = self._current()
+        if snapshot is None:
+            return 0
+        if category is None:
+            return sum(info[0] for info in snapshot.categories.values())
+        info = snapshot.categories.get(category)
+        return info[0] if info else 0
+
+    def modified(self, category=None):
+        snapshot = self._current()
+        if snapshot is None:
+            return 0
+        if category is None:
+            return max((info[1] for info in snapshot.categories.values()), default=0)
+        info = snapshot.categories.get(category)
+        return info[1] if info else 0
+
+    def latest(self, category, limit, before=None):
+        snapshot, info = self._info(category)
+        if info is None:
+            return []
+        _, _, count, start, _ = info
+        position = 0
+        if before is not None:
+            published, article_id = before
+            position = bisect_right(
+                _CategoryKeys(snapshot, start, count), (-published, -article_id)
+            )
+        end = min(count, position + limit)
+        return [snapshot.article(snapshot.index[start + i]) for i in range(position, end)]
+
+    def latest_excluding(self, category, limit):
+        snapshot = self._current()
+        if snapshot is None:
+            return []
+        others = [
+            ((snapshot.sort_key(snapshot.index[i]), snapshot.index[i]) for i in range(start, start + count))
+            for name, (_, _, count, start, _) in snapshot.categories.items()
+            if name != category
+        ]
+        merged = heapq.merge(*others)
+        return [snapshot.article(row) for _, row in itertools.islice(merged, limit)]
+
+    def since(self, article_id, limit):
+        snapshot = self._current()
+        if snapshot is None:
+            return []
+        return [snapshot.article(row) for row in snapshot.rows_since(article_id)[:limit]]
+
+    def get(self, article_id):
+        snapshot = self._current()
+        row = snapshot.row_of(article_id) if snapshot else None
+        return snapshot.article(row) if row is not None else None
+
+    def last_id(self):
+        snapshot = self._current()
+        return snapshot.last_id if snapshot else 0
+
+    def __len__(self):
+        snapshot = self._current()
+        return snapshot.article_count if snapshot else 0
+
+    def add(self, category, article):
+        added = self._publish(category, [article])
+        return added[0] if added else None
+
+    def add_many(self, category, articles):
+        return len(self._publish(category, articles))
+
+    def _publish(self, category, articles):
+        """
+        Publish a new snapshot containing the extra articles
+
+        Rewrites the whole file, so batch writes (the ingester already does).
+        Holds publish_lock() from reading the current snapshot until the new
+        one is in place, so another process cannot publish in between.
+
+        Returns:
+            list: The Articles that were new
+        """
+        with self._lock, publish_lock(self.path):
+            # Whatever another process published last is the base
+            self._checked = 0.0
+            snapshot = self._current()
+            seen = snapshot.url_hashes() if snapshot else set()
+            next_id = (snapshot.last_id if snapshot else 0) + 1
+
+            new, hashes = [], set()
+            for article in articles:
+                digest = url_hash(article.get('url'))
+                if digest is not None:
+                    if digest in seen or digest in hashes:
+                        continue
+                    hashes.add(digest)
+                new.append(Article.from_dict(article, next_id, category))
+                next_id += 1
+            if not new:
+                return []
+
+            if snapshot is None:
+                write_snapshot(self.path, {
+                    category: {'articles': new, 'version': 1, 'modified': int(time.time())}
+                })
+            else:
+                extend_snapshot(self.path, snapshot, category, new)
+            published = _Snapshot(self.path)
+            # Carried over instead of being read back out of the new file
+            seen.update(hashes)
+            published._url_hashes = seen
+            self._snapshot = published
+            self._checked = time.monotonic()
+        return new
+
+
+def export_store(store):
+    """
+    Read every article out of a store in the shape write_snapshot() takes
+
+    Returns:
+        dict: category -> {'articles', 'version', 'modified'}
+    """
+    return {
+        category: {
+            'articles': store.latest(category, store.count(category)),
+            'version': store.version(category),
+            'modified': store.modified(category),
+        }
+        for category in store.categories()
+    }
+
+
+def main():
+    if len(sys.argv) != 4 or sys.argv[1] != 'publish':
+        print("Usage: python snapshot.py publish <source store url> <snapshot path>")
+        return 1
+
+    from article_store import create_store
+    source = create_store(sys.argv[2])
+    contents = export_store(source)
+    with publish_lock(sys.argv[3]):
+        write_snapshot(sys.argv[3], contents)
+    total = sum(len(info['articles']) for info in contents.values())
+    print(f"✅ Published {total} articles in {len(contents)} categories to {sys.argv[3]}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Startup timing for the Flask News Website
+
+app.py imports this module first, so ``startup`` measures everything from
+the first import to the end of warm-up in named phases:
+
+    imports         Flask and the app's own modules
+    config          app.config, middleware and the article store
+    app             the rest of app.py (caches, routes)
+    warm_*          app.warm_up(): templates, search index, pages
+
+Import phases are logged once by the process that imports the app (the
+gunicorn master with preload_app); warm-up phases are logged by each
+worker and recorded in the app_warmup_duration_seconds histogram.
+
+    python startup.py            # import the app in a fresh interpreter, N times
+    python -X importtime -c "import app" 2>&1 | sort -t'|' -k2 -n | tail
+"""
+
+# Only what the timer itself needs: this is imported before everything else
+import time
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    """Records how long each startup phase took"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = []
+
+    def mark(self, name):
+        """Close a phase that started at the previous mark"""
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block as one phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.phases.append((name, now - start))
+            self._last = now
+
+    def report(self, phases=None):
+        """One log-friendly line, e.g. 'imports 241.0ms, config 3.2ms (total 250.1ms)'"""
+        phases = self.phases if phases is None else phases
+        parts = ', '.join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in phases)
+        total = sum(seconds for _, seconds in phases)
+        return f"{parts} (total {total * 1000:.1f}ms)"
+
+
+startup = StartupTimer()
+
+
+def measure(runs=5):
+    """
+    Import the app in fresh interpreters and time each phase
+
+    Returns:
+        list: One report line per run
+    """
+    import os
+    import subprocess
+    import sys
+
+    code = 'import app; print(app.startup.report())'
+    here = os.path.dirname(os.path.abspath(__file__))
+    reports = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-c', code], cwd=here, capture_output=True, text=True, check=True
+        )
+        reports.append(result.stdout.strip().splitlines()[-1])
+    return reports
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Time app startup in fresh interpreters')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"⏱️  Importing app.py {args.runs} times")
+    for report in measure(args.runs):
+        print(f"   {report}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
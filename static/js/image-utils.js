@@ -31,55 +31,32 @@ class ImageManager {
         });
     }
     
-    async loadImage(img) {
+    loadImage(img) {
         const src = img.dataset.src || img.src;
         
-        if (this.imageCache.has(src)) {
-            this.applyImage(img, this.imageCache.get(src));
-            return;
-        }
+        // Let the <img> download the image itself (once, through the HTTP
+        // cache and its srcset) instead of fetching it again as a blob
+        this.showImageLoading(img);
         
-        try {
-            // Show loading placeholder
-            this.showImageLoading(img);
-            
-            // Load image with timeout
-            const imageBlob = await this.loadImageWithTimeout(src, 10000);
-            const imageUrl = URL.createObjectURL(imageBlob);
-            
-            // Cache the image
-            this.imageCache.set(src, imageUrl);
-            
-            // Apply the image
-            this.applyImage(img, imageUrl);
-            
-        } catch (error) {
-            console.error('Failed to load image:', src, error);
-            this.showImageError(img);
+        const timeoutId = setTimeout(() => {
+            if (!img.complete) {
+                console.error('Image load timeout:', src);
+                this.showImageError(img);
+            }
+        }, 10000);
+        
+        img.addEventListener('load', () => clearTimeout(timeoutId), { once: true });
+        img.addEventListener('error', () => clearTimeout(timeoutId), { once: true });
+        
+        if (img.dataset.srcset) {
+            img.srcset = img.dataset.srcset;
         }
-    }
-    
-    loadImageWithTimeout(src, timeout) {
-        return new Promise((resolve, reject) => {
-            const timeoutId = setTimeout(() => {
-                reject(new Error('Image load timeout'));
-            }, timeout);
-            
-            fetch(src)
-                .then(response => {
-                    clearTimeout(timeoutId);
-                    if (!response.ok) {
-                        throw new Error(`HTTP ${response.status}`);
-                    }
-                    return response.blob();
-                })
-                .then(resolve)
-                .catch(reject);
-        });
+        this.imageCache.set(src, src);
+        this.applyImage(img, src);
     }
     
     showImageLoading(img) {
-        const container = img.parentElement;
+        const container = img.closest('.news-image-container') || img.parentElement;
         container.classList.add('loading');
         
         if (!container.querySelector('.image-loading')) {
@@ -97,7 +74,7 @@ class ImageManager {
     }
     
     applyImage(img, src) {
-        const container = img.parentElement;
+        const container = img.closest('.news-image-container') || img.parentElement;
         
         img.src = src;
         img.onload = () => {
@@ -124,7 +101,7 @@ class ImageManager {
     }
     
     showImageError(img) {
-        const container = img.parentElement;
+        const container = img.closest('.news-image-container') || img.parentElement;
         container.classList.remove('loading');
         container.classList.add('error');
         
@@ -171,13 +148,7 @@ class ImageManager {
         return originalUrl;
     }
     
-    // Clean up blob URLs to prevent memory leaks
     cleanup() {
-        this.imageCache.forEach(url => {
-            if (url.startsWith('blob:')) {
-                URL.revokeObjectURL(url);
-            }
-        });
         this.imageCache.clear();
     }
 }
@@ -9,6 +9,7 @@ document.addEventListener('DOMContentLoaded', function() {
     initAnimations();
     initThemeEffects();
     initFormValidations();
+    initReadTracking();
     
     // Add loading state to page
     setTimeout(() => {
@@ -323,6 +324,62 @@ function initAnimations() {
     });
 }
 
+/**
+ * Count article reads for the trending list with beacons, which survive
+ * navigation. A card counts once per page load: when it is clicked (its
+ * link or anywhere else on it), or when a news grid card stays in view
+ * long enough to be read. Featured cards on the home page only count when
+ * clicked, so being featured does not keep them trending.
+ */
+function initReadTracking() {
+    if (!navigator.sendBeacon) return;
+    
+    const READ_AFTER_MS = 3000;
+    const counted = new Set();
+    const countRead = articleId => {
+        if (!articleId || counted.has(articleId)) return;
+        counted.add(articleId);
+        navigator.sendBeacon(`/api/articles/${articleId}/view`);
+    };
+    
+    // Delegated, so cards added later (pagination, live streams) count too
+    document.addEventListener('click', function(event) {
+        const card = event.target.closest('[data-article-id]');
+        if (card) countRead(card.dataset.articleId);
+    });
+    
+    const grid = document.getElementById('newsContainer');
+    if (!grid || !('IntersectionObserver' in window)) return;
+    
+    const timers = new Map();
+    const observer = new IntersectionObserver(entries => {
+        entries.forEach(entry => {
+            const articleId = entry.target.dataset.articleId;
+            if (entry.isIntersecting) {
+                if (!timers.has(entry.target)) {
+                    timers.set(entry.target, setTimeout(() => {
+                        countRead(articleId);
+                        observer.unobserve(entry.target);
+                    }, READ_AFTER_MS));
+                }
+            } else {
+                clearTimeout(timers.get(entry.target));
+                timers.delete(entry.target);
+            }
+        });
+    }, { threshold: 0.6 });
+    
+    const observeCards = () => {
+        grid.querySelectorAll('.news-card[data-article-id]:not([data-read-observed])').forEach(card => {
+            card.dataset.readObserved = '';
+            observer.observe(card);
+        });
+    };
+    observeCards();
+    // Cards swapped in by category changes, pagination and streams
+    new MutationObserver(observeCards).observe(grid, { childList: true });
+}
+
 /**
  * Initialize theme effects and interactions
  */
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Fingerprinted, precompressed static assets for the Flask News Website
+
+Build step (run on deploy):
+
+    python static_assets.py
+
+minifies every stylesheet and script under static/css and static/js, writes
+content-hashed copies to static/dist together with .gz and .br variants and
+records the mapping in static/dist/manifest.json.
+
+At runtime init_app() loads the manifest, makes url_for('static', ...)
+emit the hashed names and serves static/dist with far-future immutable
+caching, picking the precompressed variant that matches Accept-Encoding.
+Without a manifest, url_for behaves exactly as before.
+
+rcssmin/rjsmin and brotli are used when installed; otherwise a conservative
+built-in minifier is used and only gzip variants are produced.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import re
+import shutil
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from rcssmin import cssmin
+except ImportError:
+    cssmin = None
+
+try:
+    from rjsmin import jsmin
+except ImportError:
+    jsmin = None
+
+STATIC_ROOT = Path(__file__).parent / 'static'
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+SOURCE_PATTERNS = ('css/*.css', 'js/*.js')
+
+# Precompressed variants in order of preference: (Accept-Encoding token, suffix)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+IMMUTABLE_MAX_AGE = 31536000
+
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.S)
+
+
+def minify_css(source):
+    """Strip comments and redundant whitespace from a stylesheet"""
+    if cssmin is not None:
+        return cssmin(source)
+
+    parts = []
+    position = 0
+    for match in _CSS_TOKENS.finditer(source):
+        parts.append(_squeeze_css(source[position:match.start()]))
+        # Keep string literals verbatim, drop comments
+        if match.group(1):
+            parts.append(match.group(1))
+        position = match.end()
+    parts.append(_squeeze_css(source[position:]))
+    return ''.join(parts).strip()
+
+
+def _squeeze_css(chunk):
+    chunk = re.sub(r'\s+', ' ', chunk)
+    chunk = re.sub(r' ?([{};,>]) ?', r'\1', chunk)
+    return chunk.replace(';}', '}')
+
+
+def minify_js(source):
+    """
+    Minify a script
+
+    The built-in fallback only drops indentation, blank lines, line comments
+    and block comments at the start of a line. Line breaks are kept so automatic semicolon insertion is safe.
+    """
+    if jsmin is not None:
+        return jsmin(source)
+
+    lines = []
+    in_block_comment = False
+    for line in source.splitlines():
+        stripped = line.strip()
+        if in_block_comment:
+            if '*/' not in stripped:
+                continue
+            stripped = stripped.split('*/', 1)[1].strip()
+            in_block_comment = False
+        # Only the comment goes; code after it on the same line is kept
+        while stripped.startswith('/*'):
+            if '*/' not in stripped[2:]:
+                in_block_comment = True
+                stripped = ''
+                break
+            stripped = stripped[2:].split('*/', 1)[1].strip()
+        if not stripped or stripped.startswith('//'):
+            continue
+        lines.append(stripped)
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def build(static_root=STATIC_ROOT):
+    """
+    Build fingerprinted and precompressed assets into static/dist
+
+    Returns:
+        dict: The manifest that was written
+    """
+    static_root = Path(static_root)
+    dist_root = static_root / DIST_DIR
+    if dist_root.exists():
+        shutil.rmtree(dist_root)
+
+    manifest = {}
+    for pattern in SOURCE_PATTERNS:
+        for source_path in sorted(static_root.glob(pattern)):
+            name = source_path.relative_to(static_root).as_posix()
+            minified = MINIFIERS[source_path.suffix](source_path.read_text(encoding='utf-8'))
+            data = minified.encode('utf-8')
+
+            digest = hashlib.sha256(data).hexdigest()[:10]
+            hashed = f"{source_path.parent.relative_to(static_root).as_posix()}/" \
+                     f"{source_path.stem}.{digest}{source_path.suffix}"
+            target = dist_root / hashed
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(data)
+
+            # mtime=0 keeps the gzip output reproducible between builds
+            encodings = []
+            target.with_name(target.name + '.gz').write_bytes(gzip.compress(data, 9, mtime=0))
+            encodings.append('gzip')
+            if brotli is not None:
+                target.with_name(target.name + '.br').write_bytes(brotli.compress(data, quality=11))
+                encodings.append('br')
+
+            manifest[name] = {'file': hashed, 'encodings': encodings}
+            print(f"   {name} -> {DIST_DIR}/{hashed} "
+                  f"({source_path.stat().st_size} -> {len(data)} bytes, {', '.join(encodings)})")
+
+    dist_root.mkdir(parents=True, exist_ok=True)
+    (dist_root / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return manifest
+
+
+def load_manifest(static_root=STATIC_ROOT):
+    """Load static/dist/manifest.json, or an empty dict if assets were not built"""
+    path = Path(static_root) / DIST_DIR / MANIFEST_NAME
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def init_app(app):
+    """
+    Wire the built assets into a Flask app
+
+    Registers a url_defaults hook rewriting static filenames to their hashed
+    names and a /static/dist route serving precompressed, immutable files.
+    """
+    from flask import request, send_from_directory, abort
+
+    static_root = Path(app.static_folder)
+    manifest = load_manifest(static_root)
+    app.config['ASSET_MANIFEST'] = manifest
+
+    hashed_names = {name: f"{DIST_DIR}/{entry['file']}" for name, entry in manifest.items()}
+    encodings_by_file = {entry['file']: set(entry['encodings']) for entry in manifest.values()}
+    dist_root = static_root / DIST_DIR
+
+    @app.url_defaults
+    def hashed_static_url(endpoint, values):
+        """Make url_for('static', filename=...) point at the fingerprinted copy"""
+        # Debug mode keeps serving the sources so edits show up without a rebuild
+        if endpoint == 'static' and not app.debug and values.get('filename') in hashed_names:
+            values['filename'] = hashed_names[values['filename']]
+
+    @app.route(f"{app.static_url_path}/{DIST_DIR}/<path:filename>")
+    def hashed_static(filename):
+        """Serve a fingerprinted asset, precompressed when the client allows"""
+        available = encodings_by_file.get(filename)
+        if available is None:
+            abort(404)
+
+        mimetype = mimetypes.guess_type(filename)[0]
+        for encoding, suffix in ENCODINGS:
+            if encoding in available and request.accept_encodings[encoding]:
+                response = send_from_directory(dist_root, filename + suffix, mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(dist_root, filename, mimetype=mimetype)
+
+        # The name changes whenever the content does, so it never needs revalidating
+        response.headers['Cache-Control'] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+if __name__ == '__main__':
+    print("📦 Building static assets...")
+    build()
+    print("✅ Static assets written to static/dist")
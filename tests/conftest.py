@@ -0,0 +1,67 @@
+"""
+Shared fixtures for the test suite
+
+app.py reads its configuration from the environment when it is imported,
+so the settings are made here first: stores and caches stay in memory,
+files go to a scratch directory and rate limiting is off.
+
+    python -m pytest
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCRATCH = tempfile.mkdtemp(prefix='flask-news-tests-')
+
+os.environ.update({
+    'ARTICLE_STORE_URL': 'memory://',
+    'PAGE_CACHE_URL': 'memory://',
+    'FETCH_CACHE_URL': 'memory://',
+    'METRICS_URL': 'memory://',
+    'RATE_LIMIT_URL': 'memory://',
+    'RATE_LIMIT_ENABLED': 'False',
+    'VIEWS_URL': 'memory://',
+    'INGEST_MODE': 'off',
+    'NEWS_FEEDS': '',
+    'SEARCH_INDEX_PATH': '',
+    'CONTACT_QUEUE_PATH': os.path.join(SCRATCH, 'contact_queue.db'),
+    'IMAGE_CACHE_DIR': os.path.join(SCRATCH, 'image_cache'),
+    # fixture_image_server.py listens on loopback, which is otherwise refused
+    'IMAGE_PROXY_ALLOW': '127.0.0.1/32',
+    'JINJA_CACHE_DIR': os.path.join(SCRATCH, 'jinja'),
+})
+os.environ.pop('MAIL_SERVER', None)
+
+
+@pytest.fixture(scope='session')
+def news_app():
+    """The app module, imported once with the test configuration"""
+    import app
+
+    return app
+
+
+@pytest.fixture
+def client(news_app):
+    return news_app.app.test_client()
+
+
+def make_article(number, published=1700000000, **fields):
+    """An incoming article dict as the ingester or mock data provides it"""
+    article = {
+        'title': f"Story {number}",
+        'content': f"Body of story {number}",
+        'author': 'Reporter',
+        'url': f"https://news.example/{number}",
+        'image_url': None,
+        'source': 'Example',
+        'published': published,
+    }
+    article.update(fields)
+    return article
@@ -0,0 +1,70 @@
+"""ETag / Last-Modified validators and 304 responses"""
+
+import time
+
+import pytest
+
+from conftest import make_article
+
+ROUTES = ['/', '/news', '/news?category=sports', '/api/news/general', '/api/news/sports?page_size=5']
+
+
+@pytest.mark.parametrize('path', ROUTES)
+def test_matching_etag_gets_304_without_a_body(client, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    assert first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+    again = client.get(path, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == first.headers['ETag']
+
+
+@pytest.mark.parametrize('path', ROUTES)
+def test_weak_etag_matches(client, path):
+    etag = client.get(path).headers['ETag']
+    assert client.get(path, headers={'If-None-Match': f"W/{etag}"}).status_code == 304
+
+
+def test_if_modified_since(client):
+    last_modified = client.get('/api/news/general').headers['Last-Modified']
+    assert client.get('/api/news/general', headers={'If-Modified-Since': last_modified}).status_code == 304
+    stale = 'Mon, 01 Jan 2001 00:00:00 GMT'
+    assert client.get('/api/news/general', headers={'If-Modified-Since': stale}).status_code == 200
+
+
+def test_if_none_match_takes_precedence(client):
+    response = client.get('/api/news/general')
+    assert client.get('/api/news/general', headers={
+        'If-None-Match': '"something-else"',
+        'If-Modified-Since': response.headers['Last-Modified'],
+    }).status_code == 200
+
+
+def test_etag_depends_on_content_encoding(client):
+    identity = client.get('/api/news/general', headers={'Accept-Encoding': 'identity'})
+    gzipped = client.get('/api/news/general', headers={'Accept-Encoding': 'gzip'})
+    assert 'Accept-Encoding' in identity.headers['Vary']
+    assert identity.headers['ETag'] != gzipped.headers['ETag']
+    assert client.get('/api/news/general', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': identity.headers['ETag'],
+    }).status_code == 200
+
+
+def test_new_article_changes_the_etag(client, news_app):
+    etag = client.get('/api/news/science').headers['ETag']
+    news_app.article_store.add('science', make_article('etag-test', published=1900000000))
+
+    # The fetch cache may serve the previous result (under its old ETag)
+    # once while it refreshes in the background
+    deadline = time.monotonic() + 5
+    while True:
+        response = client.get('/api/news/science', headers={'If-None-Match': etag})
+        if response.status_code != 304 or time.monotonic() > deadline:
+            break
+        time.sleep(0.01)
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.get_json()['articles'][0]['title'] == 'Story etag-test'
@@ -0,0 +1,143 @@
+"""Retries and acknowledgements in contact_queue and the contact form checks"""
+
+import smtplib
+
+import pytest
+
+import contact_queue
+from contact_queue import ContactQueue, ContactWorker, Mailer
+
+
+class FakeMailer:
+    """Records sent subjects; ``failures`` maps a subject to the exception to raise"""
+
+    def __init__(self, failures=None):
+        self.failures = failures or {}
+        self.sent = []
+        self.closed = 0
+
+    def send(self, submission):
+        error = self.failures.get(submission['subject'])
+        if error is not None:
+            raise error
+        self.sent.append(submission['subject'])
+
+    def close(self):
+        self.closed += 1
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return ContactQueue(str(tmp_path / 'queue.db'))
+
+
+def enqueue(queue, *subjects):
+    return [queue.enqueue('Ada', 'ada@example.com', subject, 'Hello there, world') for subject in subjects]
+
+
+def rows(queue, table):
+    conn = queue._connection()
+    return [dict(row) for row in conn.execute(f'SELECT * FROM {table} ORDER BY id')]
+
+
+def test_delivered_messages_are_acked(queue):
+    enqueue(queue, 'first', 'second')
+    mailer = FakeMailer()
+    assert ContactWorker(queue, mailer).process_batch() == 2
+    assert mailer.sent == ['first', 'second']
+    assert len(queue) == 0
+    stored = rows(queue, 'contact_messages')
+    assert [row['subject'] for row in stored] == ['first', 'second']
+    assert all(row['delivered'] for row in stored)
+
+
+def test_without_a_mailer_messages_are_only_stored(queue):
+    enqueue(queue, 'first')
+    ContactWorker(queue).process_batch()
+    assert len(queue) == 0
+    assert rows(queue, 'contact_messages')[0]['subject'] == 'first'
+
+
+def test_a_bad_message_does_not_hold_up_the_others(queue):
+    first, bad, last = enqueue(queue, 'first', 'bad', 'last')
+    mailer = FakeMailer({'bad': ValueError('header injection')})
+    ContactWorker(queue, mailer).process_batch()
+    assert mailer.sent == ['first', 'last']
+    left = rows(queue, 'contact_queue')
+    assert [row['id'] for row in left] == [bad]
+    assert left[0]['attempts'] == 1
+    assert 'header injection' in left[0]['error']
+    # Backed off, so not claimed again straight away
+    assert queue.claim() == []
+
+
+def test_mail_server_failure_backs_off_the_rest_of_the_batch(queue):
+    enqueue(queue, 'first', 'down', 'last')
+    mailer = FakeMailer({'down': smtplib.SMTPServerDisconnected('gone')})
+    ContactWorker(queue, mailer).process_batch()
+    assert mailer.sent == ['first']
+    assert mailer.closed == 1
+    left = rows(queue, 'contact_queue')
+    assert [row['subject'] for row in left] == ['down', 'last']
+    assert all(row['attempts'] == 1 for row in left)
+    assert queue.claim() == []
+
+
+def test_retry_gives_up_after_max_attempts(queue):
+    enqueue(queue, 'doomed')
+    submission = queue.claim()[0]
+    submission['attempts'] = contact_queue.MAX_ATTEMPTS - 1
+    queue.retry(submission, ValueError('still failing'))
+    assert len(queue) == 0
+
+
+def test_a_claimed_batch_is_not_claimed_twice(queue):
+    enqueue(queue, 'first', 'second')
+    assert len(queue.claim()) == 2
+    assert queue.claim() == []
+    # Once the lease runs out the batch is available again
+    with queue._connection() as conn:
+        conn.execute('UPDATE contact_queue SET available = 0')
+    assert len(queue.claim()) == 2
+
+
+def test_mail_headers_stay_on_one_line():
+    message = Mailer('localhost').build({
+        'name': 'Ada\r\nBcc: victim@example.com',
+        'email': 'ada@example.com',
+        'subject': 'Hi\nthere',
+        'message': 'Line one\nLine two',
+    })
+    assert message['Subject'] == '[Contact] Hi there'
+    assert '\n' not in message['Reply-To']
+    assert message['Bcc'] is None
+
+
+def contact_form(**fields):
+    form = {
+        'name': 'Ada Lovelace',
+        'email': 'ada@example.com',
+        'subject': 'Engine question',
+        'message': 'How does the engine work?',
+    }
+    form.update(fields)
+    return form
+
+
+def test_contact_form_is_queued(client, news_app):
+    queue = news_app.get_contact_queue()
+    before = len(queue)
+    response = client.post('/contact', data=contact_form())
+    assert response.get_json()['status'] == 'success'
+    assert len(queue) == before + 1
+
+
+@pytest.mark.parametrize('field', ['name', 'subject'])
+def test_contact_form_rejects_line_breaks(client, news_app, field):
+    queue = news_app.get_contact_queue()
+    before = len(queue)
+    response = client.post('/contact', data=contact_form(**{field: 'Engine\r\nBcc: x@example.com'}))
+    body = response.get_json()
+    assert body['status'] == 'error'
+    assert 'single line' in body['message']
+    assert len(queue) == before
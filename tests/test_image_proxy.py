@@ -0,0 +1,130 @@
+"""Fetching and caching in image_proxy and the /img routes, against fixture_image_server"""
+
+import ipaddress
+
+import pytest
+
+import fixture_image_server
+import image_proxy
+from image_proxy import FALLBACK_MAX_AGE, IMMUTABLE_MAX_AGE, ImageProxy, image_hash, public_addresses
+
+
+@pytest.fixture(scope='module')
+def image_server():
+    server = fixture_image_server.serve()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def proxy(tmp_path):
+    proxy = ImageProxy(tmp_path / 'images', allow=['127.0.0.1/32'])
+    # No encoder processes: these tests are about fetching and caching
+    proxy.formats = []
+    yield proxy
+    proxy.close()
+
+
+def test_sources_point_at_the_proxy(proxy, image_server):
+    url = f"{image_server}/photo.png?seed=1"
+    assert proxy.sources(url)['src'] == f"/img/{image_hash(url)}"
+    assert (proxy.cache_dir / image_hash(url)[:2] / image_hash(url) / 'url').read_text() == url
+
+
+@pytest.mark.parametrize('url', [None, '', 'data:image/png;base64,AAAA', 'javascript:alert(1)'])
+def test_only_web_urls_are_proxied(proxy, url):
+    assert proxy.sources(url)['src'] == url
+    assert len(proxy._registered) == 0
+
+
+def test_original_is_fetched_once(proxy, image_server):
+    key = proxy.register(f"{image_server}/photo.png?w=64&h=32&seed=2")
+    served = fixture_image_server.ImageHandler.requests_served
+    path, content_type = proxy.original(key)
+    assert content_type == 'image/png'
+    assert path.read_bytes() == fixture_image_server.render_png(64, 32, 2)
+    assert proxy.original(key) == (path, 'image/png')
+    assert fixture_image_server.ImageHandler.requests_served == served + 1
+    assert proxy.fetches == 1
+
+
+@pytest.mark.parametrize('path', ['/not-an-image', '/missing.png'])
+def test_bad_sources_are_not_cached(proxy, image_server, path):
+    key = proxy.register(f"{image_server}{path}")
+    assert proxy.original(key) is None
+    assert proxy.fetches == 0
+
+
+def test_other_schemes_are_never_fetched(proxy, tmp_path):
+    secret = tmp_path / 'secret.png'
+    secret.write_bytes(fixture_image_server.render_png(4, 4))
+    key = proxy.register(secret.as_uri())
+    assert proxy.original(key) is None
+    assert proxy.original('0' * 32) is None
+
+
+@pytest.mark.parametrize('host', ['127.0.0.1', 'localhost', '10.0.0.5', '169.254.169.254', '[::1]', '0.0.0.0'])
+def test_private_hosts_are_refused(tmp_path, image_server, host):
+    proxy = ImageProxy(tmp_path / 'images')
+    port = image_server.rsplit(':', 1)[1]
+    served = fixture_image_server.ImageHandler.requests_served
+    key = proxy.register(f"http://{host}:{port}/photo.png")
+    assert proxy.original(key) is None
+    assert fixture_image_server.ImageHandler.requests_served == served
+
+
+def test_redirects_to_private_hosts_are_refused(tmp_path, image_server):
+    # Only the fixture server's own address is allowed, not the rest of 127/8
+    proxy = ImageProxy(tmp_path / 'images', allow=['127.0.0.1/32'])
+    port = image_server.rsplit(':', 1)[1]
+    allowed = proxy.register(f"{image_server}/redirect?to={image_server}/photo.png%3Fseed%3D5")
+    assert proxy.original(allowed)[1] == 'image/png'
+    refused = proxy.register(f"{image_server}/redirect?to=http://127.0.0.2:{port}/photo.png%3Fseed%3D6")
+    served = fixture_image_server.ImageHandler.requests_served
+    assert proxy.original(refused) is None
+    # The redirect was answered; the private address it named never was
+    assert fixture_image_server.ImageHandler.requests_served == served + 1
+
+
+def test_public_addresses():
+    assert public_addresses('93.184.216.34', 80) == ['93.184.216.34']
+    assert public_addresses('127.0.0.1', 80, allow=[ipaddress.ip_network('127.0.0.0/8')]) == ['127.0.0.1']
+    for host in ('127.0.0.1', '192.168.1.1', '100.64.0.1', '224.0.0.1', '::ffff:10.0.0.1', 'fe80::1'):
+        with pytest.raises(ValueError):
+            public_addresses(host, 80)
+
+
+def test_oversized_sources_are_refused(proxy, image_server, monkeypatch):
+    monkeypatch.setattr(image_proxy, 'MAX_SOURCE_BYTES', 100)
+    key = proxy.register(f"{image_server}/photo.png?w=200&h=200")
+    assert proxy.original(key) is None
+
+
+def test_registered_urls_are_capped(proxy, monkeypatch):
+    monkeypatch.setattr(image_proxy, 'MAX_REGISTERED', 3)
+    keys = [proxy.register(f"https://img.example/{i}.png") for i in range(5)]
+    assert list(proxy._registered) == keys[2:]
+
+
+def test_original_route_is_immutable(client, news_app, image_server):
+    key = news_app.image_proxy.register(f"{image_server}/photo.png?w=40&h=20&seed=3")
+    response = client.get(f"/img/{key}")
+    assert response.status_code == 200
+    assert response.mimetype == 'image/png'
+    assert response.headers['Cache-Control'] == f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    etag = response.headers['ETag']
+    assert client.get(f"/img/{key}", headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_fallback_original_is_not_immutable(client, news_app, image_server):
+    key = news_app.image_proxy.register(f"{image_server}/photo.png?w=40&h=20&seed=4")
+    # Not one of WIDTHS, so the original stands in for the variant
+    response = client.get(f"/img/{key}/123.webp")
+    assert response.status_code == 200
+    assert response.mimetype == 'image/png'
+    assert response.headers['Cache-Control'] == f"public, max-age={FALLBACK_MAX_AGE}"
+
+
+def test_unknown_images_are_404(client):
+    assert client.get(f"/img/{'0' * 32}").status_code == 404
+    assert client.get('/img/not-a-key').status_code == 404
@@ -0,0 +1,107 @@
+"""Feed parsing and polling in ingest, against fixture_feed_server"""
+
+import io
+import json
+
+import pytest
+
+import fixture_feed_server
+from article_store import create_store
+from ingest import Feed, FeedIngester, parse_feed, parse_feeds
+
+
+@pytest.fixture(scope='module')
+def feed_server():
+    server = fixture_feed_server.serve()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.mark.parametrize('path', ['/rss.xml', '/atom.xml', '/feed.json'])
+def test_each_feed_format_is_ingested(feed_server, path):
+    store = create_store('memory://')
+    ingester = FeedIngester(store, [Feed(f"{feed_server}{path}?items=5", 'technology')])
+    assert ingester.poll_once() == 5
+
+    articles, _ = store.page('technology', 10)
+    assert sorted(article.url for article in articles) == [f"https://fixture.example/1/{i}" for i in range(5)]
+    article = articles[0]
+    assert article.title.startswith('Fixture story 1-')
+    assert article.author.startswith('Reporter ')
+    assert article.image_url == fixture_feed_server.IMAGE_URL
+    assert article.published == int(fixture_feed_server.BASE_TIME.timestamp()) - 15 * 60 * int(article.url.rsplit('/', 1)[1])
+
+
+def test_unchanged_feed_is_not_downloaded_again(feed_server):
+    store = create_store('memory://')
+    feed = Feed(f"{feed_server}/rss.xml?items=3", 'world')
+    ingester = FeedIngester(store, [feed])
+    assert ingester.poll_once() == 3
+    assert feed.etag
+    # Answered with 304: nothing parsed or stored
+    assert ingester.poll_once() == 0
+    assert store.count('world') == 3
+
+    # New entries under a different seed
+    feed.url = f"{feed_server}/rss.xml?items=3&seed=2"
+    assert ingester.poll_once() == 3
+    assert store.count('world') == 6
+
+
+def test_a_failing_feed_does_not_stop_the_others(feed_server):
+    store = create_store('memory://')
+    ingester = FeedIngester(store, [
+        Feed(f"{feed_server}/missing.xml", 'world'),
+        Feed('http://127.0.0.1:1/rss.xml', 'world'),
+        Feed(f"{feed_server}/feed.json?items=2", 'world'),
+    ], timeout=2)
+    assert ingester.poll_once() == 2
+
+
+UNSAFE_RSS = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Unsafe</title>
+<item><title>Script link</title><link>javascript:alert(1)</link>
+<enclosure url="data:image/svg+xml,&lt;svg onload=alert(1)&gt;" type="image/svg+xml"/></item>
+<item><title>Plain link</title><link> HTTPS://news.example/a </link></item>
+</channel></rss>"""
+
+
+def test_only_web_urls_are_kept():
+    articles = list(parse_feed(io.BytesIO(UNSAFE_RSS), 'application/rss+xml'))
+    assert [article['url'] for article in articles] == ['#', 'HTTPS://news.example/a']
+    assert articles[0]['image_url'] is None
+    assert articles[0]['source'] == 'Unsafe'
+
+    document = {'items': [{'title': 'x', 'url': 'data:text/html,hi', 'image': 'file:///etc/passwd'}]}
+    article, = parse_feed(io.BytesIO(json.dumps(document).encode()), 'application/feed+json')
+    assert article['url'] == '#'
+    assert article['image_url'] is None
+
+
+def test_articles_in_our_own_format_are_cleaned_too():
+    document = {'status': 'success', 'articles': [{
+        'title': '<b>Hello</b>',
+        'content': '<script>alert(1)</script> Body',
+        'author': 'Ada',
+        'url': 'javascript:alert(document.cookie)',
+        'image_url': 'file:///etc/passwd',
+        'source': 'Elsewhere',
+        'published': 1700000000,
+        'date': '2023-11-14 22:13',
+    }]}
+    article, = parse_feed(io.BytesIO(json.dumps(document).encode()), 'application/json')
+    assert article['url'] == '#'
+    assert article['image_url'] is None
+    assert article['title'] == 'Hello'
+    assert '<' not in article['content']
+    assert article['published'] == 1700000000
+    assert article['source'] == 'Elsewhere'
+
+
+def test_parse_feeds():
+    feeds = parse_feeds(' technology=https://a/rss , sports=https://b/atom,')
+    assert [(feed.category, feed.url) for feed in feeds] == [
+        ('technology', 'https://a/rss'), ('sports', 'https://b/atom')
+    ]
+    with pytest.raises(ValueError):
+        parse_feeds('https://a/rss')
@@ -0,0 +1,34 @@
+"""Access to the /metrics endpoint"""
+
+import ipaddress
+
+import pytest
+
+
+@pytest.fixture
+def metrics_config(news_app, monkeypatch):
+    def configure(token='', allow=()):
+        monkeypatch.setitem(news_app.app.config, 'METRICS_TOKEN', token)
+        monkeypatch.setattr(news_app, 'METRICS_NETWORKS', [ipaddress.ip_network(network) for network in allow])
+    return configure
+
+
+def test_denied_by_default_even_from_loopback(client, metrics_config):
+    metrics_config()
+    # What every request looks like behind a reverse proxy on the same host
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '127.0.0.1'}).status_code == 403
+
+
+def test_bearer_token(client, metrics_config):
+    metrics_config(token='s3cret')
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    response = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+
+
+def test_allowed_networks(client, metrics_config):
+    metrics_config(allow=['10.0.0.0/8'])
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '10.1.2.3'}).status_code == 200
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '192.0.2.1'}).status_code == 403
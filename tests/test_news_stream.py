@@ -0,0 +1,61 @@
+"""Replays and subscriptions in news_stream and the ASGI stream route"""
+
+import asyncio
+import threading
+
+from article_store import create_store
+from news_stream import ArticleFeed
+
+from conftest import make_article
+
+
+def collect(feed, category, after, count):
+    """The first ``count`` chunks astream() yields"""
+    async def run():
+        chunks = []
+        body = feed.astream(category, after, lambda article: f"{article.id}\n".encode(), 'ndjson', 5)
+        async for chunk in body:
+            chunks.append(chunk)
+            if len(chunks) == count:
+                break
+        await body.aclose()
+        return chunks
+
+    return asyncio.run(run())
+
+
+def test_replay_is_in_id_order_for_the_category():
+    store = create_store('memory://')
+    for number, category in enumerate(['tech', 'sports', 'tech', 'tech', 'sports'], 1):
+        store.add(category, make_article(number, published=1700000000 - number))
+    feed = ArticleFeed(store)
+    assert [article.id for article in feed.replay('tech', 1)] == [3, 4]
+    assert feed.replay('tech', None) == []
+
+
+def test_astream_reads_the_store_off_the_event_loop():
+    store = create_store('memory://')
+    for number in range(1, 4):
+        store.add('tech', make_article(number))
+    reads = []
+    for name in ('since', 'last_id', 'version'):
+        method = getattr(store, name)
+
+        def read(*args, method=method):
+            reads.append(threading.current_thread() is threading.main_thread())
+            return method(*args)
+
+        setattr(store, name, read)
+
+    feed = ArticleFeed(store, poll_interval=60)
+    assert collect(feed, 'tech', 1, 3) == [b'', b'2\n', b'3\n']
+    assert reads and not any(reads)
+    assert feed.subscriber_count() == 0
+
+
+def test_asgi_stream_path_is_not_decoded_twice(news_app, monkeypatch):
+    opened = []
+    monkeypatch.setattr(news_app.news_feed, 'astream', lambda category, *args: opened.append(category))
+    # The ASGI server has already turned /api/news/a%2525b/stream into this
+    assert news_app.open_news_stream('/api/news/a%25b/stream', '', {}, '127.0.0.1')[0] == 200
+    assert opened == ['a%25b']
@@ -0,0 +1,78 @@
+"""Keyset pagination in ArticleStore.page() and /api/news/<category>"""
+
+import pytest
+
+from article_store import create_store, decode_cursor, encode_cursor
+
+from conftest import make_article
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    url = 'memory://' if request.param == 'memory' else f"sqlite:///{tmp_path / 'news.db'}"
+    store = create_store(url)
+    for number in range(25):
+        store.add('sports', make_article(number, published=1700000000 + number))
+    store.add('general', make_article(100))
+    return store
+
+
+def walk(store, category, page_size):
+    pages, before = [], None
+    while True:
+        articles, before = store.page(category, page_size, before=before)
+        pages.append([article.id for article in articles])
+        if before is None:
+            return pages
+
+
+def test_pages_cover_the_category_newest_first_without_overlap(store):
+    pages = walk(store, 'sports', 10)
+    assert [len(page) for page in pages] == [10, 10, 5]
+    ids = [article_id for page in pages for article_id in page]
+    assert ids == sorted(ids, reverse=True)
+    assert len(set(ids)) == 25
+
+
+def test_exact_multiple_ends_without_an_empty_page(store):
+    assert [len(page) for page in walk(store, 'sports', 5)] == [5] * 5
+
+
+@pytest.mark.parametrize('page_size', [0, -1])
+def test_page_size_below_one_is_an_empty_last_page(store, page_size):
+    assert store.page('sports', page_size) == ([], None)
+
+
+def test_short_first_page_is_topped_up_from_other_categories(store):
+    articles, before = store.page('general', 5)
+    assert before is None
+    assert articles[0].category == 'general'
+    assert {article.category for article in articles[1:]} == {'sports'}
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor((1700000000, 42))) == (1700000000, 42)
+
+
+@pytest.mark.parametrize('page_size', ['0', '-5', 'abc', '1000'])
+def test_api_page_size_is_clamped(client, page_size):
+    response = client.get(f"/api/news/general?page_size={page_size}")
+    assert response.status_code == 200
+    assert 1 <= response.get_json()['total'] <= 20
+
+
+def test_api_follows_next_cursor(client, news_app):
+    seen, cursor = [], ''
+    for _ in range(20):
+        body = client.get(f"/api/news/general?page_size=1&cursor={cursor}").get_json()
+        seen.extend(article['id'] for article in body['articles'])
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) >= news_app.article_store.count('general')
+
+
+def test_api_rejects_a_malformed_cursor(client):
+    response = client.get('/api/news/general?cursor=not-a-cursor')
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
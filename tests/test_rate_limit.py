@@ -0,0 +1,69 @@
+"""Token buckets in rate_limit, keyed on the client behind any reverse proxy"""
+
+import pytest
+
+from rate_limit import create_rate_limiter, forwarded_client, parse_limit
+
+
+
+def via_proxy(client):
+    """Request options for ``client`` reaching the app through nginx on the same host"""
+    return {
+        'environ_base': {'REMOTE_ADDR': '127.0.0.1'},
+        'headers': {'X-Forwarded-For': client},
+    }
+
+
+@pytest.fixture
+def limited(news_app, monkeypatch):
+    """Rate limiting switched on, with ``hops`` trusted proxies"""
+    def configure(hops):
+        monkeypatch.setattr(news_app.limiter, 'enabled', True)
+        monkeypatch.setattr(news_app.app.wsgi_app, 'x_for', hops)
+        news_app.limiter.clear()
+    yield configure
+    news_app.limiter.clear()
+
+
+def post_until_limited(client, proxy_client, attempts=10):
+    for attempt in range(attempts):
+        if client.post('/contact', data={}, **via_proxy(proxy_client)).status_code == 429:
+            return attempt
+    return None
+
+
+def test_clients_behind_a_proxy_get_their_own_buckets(client, news_app, limited):
+    limited(1)
+    capacity, _ = parse_limit(news_app.app.config['RATE_LIMIT_CONTACT'])
+    assert post_until_limited(client, '203.0.113.7') == capacity
+    assert client.post('/contact', data={}, **via_proxy('198.51.100.2')).status_code == 200
+    # Only the proxy's own hop is trusted; a client cannot pick its address
+    assert client.post('/contact', data={}, **via_proxy('198.51.100.9, 203.0.113.7')).status_code == 429
+
+
+def test_without_trusted_proxies_forwarded_for_is_ignored(client, news_app, limited):
+    limited(0)
+    capacity, _ = parse_limit(news_app.app.config['RATE_LIMIT_CONTACT'])
+    assert post_until_limited(client, '203.0.113.7') == capacity
+    assert client.post('/contact', data={}, **via_proxy('198.51.100.2')).status_code == 429
+
+
+def test_forwarded_client():
+    assert forwarded_client('127.0.0.1', '203.0.113.7', 1) == '203.0.113.7'
+    assert forwarded_client('127.0.0.1', '198.51.100.9, 203.0.113.7', 1) == '203.0.113.7'
+    assert forwarded_client('127.0.0.1', '198.51.100.9, 203.0.113.7', 2) == '198.51.100.9'
+    assert forwarded_client('127.0.0.1', '203.0.113.7', 2) == '127.0.0.1'
+    assert forwarded_client('127.0.0.1', '203.0.113.7', 0) == '127.0.0.1'
+    assert forwarded_client('127.0.0.1', None, 1) == '127.0.0.1'
+
+
+def test_bucket_refuses_after_capacity():
+    limiter = create_rate_limiter('memory://')
+    assert [limiter.consume('contact:a', 2, 0.001) == 0 for _ in range(3)] == [True, True, False]
+    assert limiter.consume('contact:b', 2, 0.001) == 0
+
+
+@pytest.mark.parametrize('spec', ['0/minute', 'five/minute', '5/fortnight', '5/0'])
+def test_parse_limit_rejects_bad_specs(spec):
+    with pytest.raises(ValueError):
+        parse_limit(spec)
@@ -0,0 +1,123 @@
+"""BM25 ranking in search.SearchIndex and the /api/search endpoint"""
+
+import pytest
+
+from article_store import create_store
+from search import SearchIndex, tokenize
+
+from conftest import make_article
+
+
+@pytest.fixture
+def store():
+    store = create_store('memory://')
+    store.add('science', make_article(
+        1, title='Quantum computing breakthrough', content='Researchers build a quantum chip.'
+    ))
+    store.add('science', make_article(
+        2, title='Battery research', content='A new battery chemistry; quantum effects are mentioned once.'
+    ))
+    store.add('technology', make_article(
+        3, title='Quantum networks', content='Quantum quantum quantum links between quantum computers.'
+    ))
+    store.add('sports', make_article(
+        4, title='League final', content='The championship final ends in a penalty shootout.'
+    ))
+    store.add('business', make_article(
+        5, title='Election and markets', content='Electric car makers rally after the election.'
+    ))
+    return store
+
+
+def titles(articles):
+    return [article.title for article in articles]
+
+
+def test_tokenize_lowercases_and_drops_stop_words():
+    assert tokenize('The Quantum, and the CHIP!') == ['quantum', 'chip']
+
+
+def test_title_matches_outrank_body_matches(store):
+    results = SearchIndex(store).search('battery')
+    assert titles(results) == ['Battery research']
+    ranked = titles(SearchIndex(store).search('quantum'))
+    assert ranked.index('Quantum computing breakthrough') < ranked.index('Battery research')
+    assert ranked.index('Quantum networks') < ranked.index('Battery research')
+
+
+def test_term_frequency_raises_the_score(store):
+    # Both have "quantum" in the title; the second repeats it in the body
+    assert titles(SearchIndex(store).search('quantum'))[0] == 'Quantum networks'
+
+
+def test_rare_terms_weigh_more_than_common_ones(store):
+    # "chip" appears once in the corpus, "quantum" in three articles
+    assert titles(SearchIndex(store).search('quantum chip'))[0] == 'Quantum computing breakthrough'
+
+
+def test_last_word_matches_as_a_prefix(store):
+    assert titles(SearchIndex(store).search('elec')) == ['Election and markets']
+    # Only the last word is a prefix; earlier words must match exactly
+    assert SearchIndex(store).search('elec shootout') == SearchIndex(store).search('shootout')
+
+
+def test_ties_go_to_the_newer_article():
+    store = create_store('memory://')
+    store.add('general', make_article(1, title='Same headline'))
+    store.add('general', make_article(2, title='Same headline'))
+    assert [a.id for a in SearchIndex(store).search('headline')] == [2, 1]
+
+
+def test_limit_and_category(store):
+    index = SearchIndex(store)
+    assert len(index.search('quantum', limit=1)) == 1
+    assert {a.category for a in index.search('quantum', category='science')} == {'science'}
+    assert index.search('the and of') == []
+
+
+def test_new_articles_are_found_after_sync(store):
+    index = SearchIndex(store)
+    assert index.search('shootout')
+    assert index.search('tiebreak') == []
+    store.add('sports', make_article(6, title='Tiebreak drama'))
+    assert titles(index.search('tiebreak')) == ['Tiebreak drama']
+
+
+def test_prefix_terms_added_after_a_query_are_found(store):
+    index = SearchIndex(store)
+    assert index.search('zep') == []
+    store.add('general', make_article(6, title='Zeppelin returns'))
+    store.add('general', make_article(7, title='Zebra crossing'))
+    assert titles(index.search('ze')) == ['Zebra crossing', 'Zeppelin returns']
+
+
+def test_hits_are_read_from_the_store(store):
+    index = SearchIndex(store)
+    index.sync()
+    assert len(index) == 5
+    hit, = index.search('shootout')
+    assert hit is store.get(hit.id)
+
+
+def test_save_and_load(store, tmp_path):
+    index = SearchIndex(store)
+    index.sync()
+    index.save(tmp_path / 'index.pickle')
+    loaded = SearchIndex(store)
+    assert loaded.load(tmp_path / 'index.pickle')
+    assert titles(loaded.search('quantum')) == titles(index.search('quantum'))
+
+    other = create_store('memory://')
+    other.add('general', make_article(1, title='Different story'))
+    assert not SearchIndex(other).load(tmp_path / 'index.pickle')
+
+
+@pytest.mark.parametrize('limit', ['abc', '0', '-3', '500'])
+def test_api_limit_is_parsed_and_clamped(client, limit):
+    response = client.get(f"/api/search?q=news&limit={limit}")
+    assert response.status_code == 200
+    assert response.get_json()['total'] <= 50
+
+
+def test_api_requires_a_query(client):
+    assert client.get('/api/search?q=%20').status_code == 400
@@ -0,0 +1,80 @@
+"""Publishing to and reading from memory-mapped snapshots"""
+
+import multiprocessing
+import random
+
+import pytest
+
+from article_store import create_store
+from snapshot import SnapshotArticleStore
+
+from conftest import make_article
+
+
+def publish_batches(store, batches):
+    for category, articles in batches:
+        store.add_many(category, articles)
+
+
+def random_batches(seed, count=12):
+    rng = random.Random(seed)
+    number = 0
+    batches = []
+    for _ in range(count):
+        articles = []
+        for _ in range(rng.randint(1, 6)):
+            number += 1
+            articles.append(make_article(number, published=1700000000 + rng.randint(-50000, 50000)))
+        batches.append((rng.choice(['tech', 'sports', 'world']), articles))
+    return batches
+
+
+def test_published_snapshot_reads_like_the_memory_store(tmp_path):
+    batches = random_batches(7)
+    memory = create_store('memory://')
+    snapshot = SnapshotArticleStore(str(tmp_path / 'news.snap'), refresh_interval=0)
+    publish_batches(memory, batches)
+    publish_batches(snapshot, batches)
+
+    assert len(snapshot) == len(memory)
+    assert snapshot.last_id() == memory.last_id()
+    assert sorted(snapshot.categories()) == sorted(memory.categories())
+    for category in memory.categories():
+        assert snapshot.count(category) == memory.count(category)
+        expected = [a.to_dict() for a in memory.latest(category, 100)]
+        assert [a.to_dict() for a in snapshot.latest(category, 100)] == expected
+    assert [a.id for a in snapshot.since(5, 10)] == [a.id for a in memory.since(5, 10)]
+    assert snapshot.get(3).to_dict() == memory.get(3).to_dict()
+    assert snapshot.get(1000) is None
+
+
+def test_duplicate_urls_are_dropped(tmp_path):
+    store = SnapshotArticleStore(str(tmp_path / 'news.snap'), refresh_interval=0)
+    assert store.add_many('tech', [make_article(1), make_article(2), make_article(1)]) == 2
+    assert store.add_many('world', [make_article(2), make_article(3)]) == 1
+    assert store.add('tech', make_article(3)) is None
+    assert len(store) == 3
+    # A store opening the file afresh reads the hashes back out of it
+    assert SnapshotArticleStore(str(tmp_path / 'news.snap')).add('tech', make_article(1)) is None
+
+
+def publisher(path, offset):
+    store = SnapshotArticleStore(path, refresh_interval=0)
+    for batch in range(10):
+        store.add_many('tech', [make_article(offset + batch * 5 + i) for i in range(5)])
+
+
+def test_concurrent_publishers_lose_nothing(tmp_path):
+    path = str(tmp_path / 'news.snap')
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=publisher, args=(path, offset)) for offset in (0, 1000, 2000)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+
+    store = SnapshotArticleStore(path)
+    assert len(store) == 150
+    assert [a.id for a in store.since(0, 200)] == list(range(1, 151))
+    assert len({a.url for a in store.latest('tech', 200)}) == 150
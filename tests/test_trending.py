@@ -0,0 +1,138 @@
+"""Decayed view counts in trending and the trending API"""
+
+import math
+import os
+
+import pytest
+
+import trending
+from trending import EPOCH, create_view_counter
+
+HALF_LIFE = 3600
+
+
+class Clock:
+    """Stands in for time.time() inside trending"""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(EPOCH + 10 * HALF_LIFE)
+    monkeypatch.setattr(trending.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture(params=['memory://', 'sqlite'])
+def counter(request, tmp_path, clock):
+    url = f"sqlite:///{tmp_path / 'views.db'}" if request.param == 'sqlite' else request.param
+    counter = create_view_counter(url, half_life=HALF_LIFE, refresh=0, last_id=lambda: 100)
+    # Flushed by the tests, not a background thread
+    counter._flusher_pid = os.getpid()
+    return counter
+
+
+def view(counter, clock, article_id, at, times=1):
+    now = clock.now
+    clock.now = at
+    for _ in range(times):
+        counter.record(article_id)
+    clock.now = now
+
+
+def scores(counter, limit=10):
+    ranked, _ = counter.top(limit)
+    return dict(ranked)
+
+
+def test_a_view_half_life_ago_weighs_half(counter, clock):
+    view(counter, clock, 1, clock.now)
+    view(counter, clock, 2, clock.now - HALF_LIFE)
+    view(counter, clock, 3, clock.now - 2 * HALF_LIFE)
+    assert counter.flush() == 3
+    views = scores(counter)
+    assert views[1] == pytest.approx(1.0)
+    assert views[2] == pytest.approx(0.5)
+    assert views[3] == pytest.approx(0.25)
+
+
+def test_scores_keep_decaying_after_the_flush(counter, clock):
+    view(counter, clock, 1, clock.now, times=4)
+    counter.flush()
+    assert scores(counter)[1] == pytest.approx(4.0)
+    clock.now += HALF_LIFE
+    assert scores(counter)[1] == pytest.approx(2.0)
+
+
+def test_recent_views_outrank_older_ones(counter, clock):
+    view(counter, clock, 1, clock.now - 3 * HALF_LIFE, times=6)
+    view(counter, clock, 2, clock.now, times=1)
+    view(counter, clock, 3, clock.now - HALF_LIFE, times=3)
+    counter.flush()
+    ranked, _ = counter.top(10)
+    assert [article_id for article_id, _ in ranked] == [3, 2, 1]
+    assert [article_id for article_id, _ in counter.top(2)[0]] == [3, 2]
+
+
+def test_flushes_add_up(counter, clock):
+    view(counter, clock, 1, clock.now, times=2)
+    counter.flush()
+    view(counter, clock, 1, clock.now, times=3)
+    counter.flush()
+    assert scores(counter)[1] == pytest.approx(5.0)
+    assert counter.recorded == 5
+
+
+def test_views_of_unknown_articles_are_dropped(counter, clock):
+    view(counter, clock, 0, clock.now)
+    view(counter, clock, 101, clock.now)
+    view(counter, clock, 7, clock.now)
+    assert counter.flush() == 3
+    assert list(scores(counter)) == [7]
+
+
+def test_tag_changes_with_the_ranking(counter, clock):
+    view(counter, clock, 1, clock.now, times=2)
+    view(counter, clock, 2, clock.now)
+    counter.flush()
+    _, before = counter.top(10)
+    assert counter.top(10)[1] == before
+    view(counter, clock, 2, clock.now, times=5)
+    counter.flush()
+    assert counter.top(10)[1] != before
+
+
+def test_log_add():
+    assert trending.log_add(math.log(2), math.log(3)) == pytest.approx(math.log(5))
+    assert trending.log_add(1000.0, 1000.0) == pytest.approx(1000.0 + math.log(2))
+
+
+def test_unsupported_url():
+    with pytest.raises(ValueError):
+        create_view_counter('redis://localhost')
+
+
+def test_beacon_and_trending_api(client, news_app, monkeypatch):
+    counter = news_app.view_counter
+    monkeypatch.setattr(counter, 'refresh', 0)
+    newest = news_app.article_store.last_id()
+    for article_id in (newest, newest, newest - 1):
+        assert client.post(f"/api/articles/{article_id}/view").status_code == 204
+    counter.flush()
+
+    body = client.get('/api/news/trending?limit=2').get_json()
+    assert [article['id'] for article in body['articles']][:1] == [newest]
+    assert body['total'] == len(body['views']) <= 2
+    assert body['views'] == sorted(body['views'], reverse=True)
+
+
+@pytest.mark.parametrize('limit', ['abc', '0', '-1', '1000'])
+def test_trending_limit_is_parsed_and_clamped(client, limit):
+    response = client.get(f"/api/news/trending?limit={limit}")
+    assert response.status_code == 200
+    assert response.get_json()['total'] <= trending.TOP_CANDIDATES
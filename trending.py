@@ -0,0 +1,267 @@
+"""
+Article view counts and the trending ranking
+
+Views are recorded on the request path with a single deque append - no
+lock, no I/O. A daemon thread in each worker drains the deque every
+FLUSH_INTERVAL seconds, adds the views up per article and writes the batch
+to the backing store:
+
+    ViewCounter        this process only (``memory://``)
+    SQLiteViewCounter  a SQLite file shared by every gunicorn worker
+                       (``sqlite:///views.db``)
+
+Trending scores use forward exponential decay. A view at time t adds
+exp((t - EPOCH) * ln 2 / half_life) to its article's score. An older view
+therefore weighs half as much as one ``half_life`` later, and adding a
+view never rewrites any other article's score. Scores are kept as
+logarithms so they never overflow, and the ranking is an ORDER BY on an
+index (SQLite) or a heapq.nlargest (memory).
+
+top() serves the ranking from a copy refreshed at most every
+``refresh`` seconds, so reading it costs a slice.
+"""
+
+import hashlib
+import heapq
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# Reference time for the forward-decay weights
+EPOCH = 1700000000
+# Seconds between writes of this worker's views to the store
+FLUSH_INTERVAL = 5.0
+# Views held between flushes before the oldest are dropped
+MAX_PENDING = 100000
+# Articles kept in the cached ranking; top() serves slices of it
+TOP_CANDIDATES = 50
+# Scores worth less than this many current views are pruned
+MIN_VIEWS = 0.01
+
+
+def log_add(a, b):
+    """log(exp(a) + exp(b)) without leaving log space"""
+    if a < b:
+        a, b = b, a
+    return a + math.log1p(math.exp(b - a))
+
+
+class ViewCounter:
+    """Per-process view counts and decayed scores (the memory backend)"""
+
+    def __init__(self, half_life=21600, refresh=30.0, last_id=None):
+        """
+        Args:
+            half_life (float): Seconds for a view's weight to halve
+            refresh (float): Seconds between refreshes of the ranking
+            last_id (callable): Returns the newest article id; views of
+                larger ids are dropped when flushed
+        """
+        self.half_life = half_life
+        self.refresh = refresh
+        self.last_id = last_id
+        self._rate = math.log(2) / half_life
+        # (article id, time) of views not flushed yet
+        self._pending = deque(maxlen=MAX_PENDING)
+        self._flush_lock = threading.Lock()
+        self._flusher_pid = None
+        # article id -> [log score, views]
+        self._scores = {}
+        # (refreshed at, [(article id, log score)], changed at)
+        self._ranking = (0.0, [], 0)
+        self.recorded = 0
+
+    def record(self, article_id):
+        """Count one view of an article"""
+        self._pending.append((article_id, time.time()))
+        if self._flusher_pid != os.getpid():
+            self.start_flusher()
+
+    def start_flusher(self):
+        """Flush every FLUSH_INTERVAL from a daemon thread in this (forked) process"""
+        if self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+
+        def run():
+            while True:
+                time.sleep(FLUSH_INTERVAL)
+                try:
+                    self.flush()
+                except Exception:
+                    pass
+
+        threading.Thread(target=run, name='views-flush', daemon=True).start()
+
+    def flush(self):
+        """
+        Write the views recorded since the last flush to the store
+
+        Returns:
+            int: Number of views written
+        """
+        with self._flush_lock:
+            batch = {}
+            count = 0
+            while self._pending:
+                article_id, at = self._pending.popleft()
+                weight = (at - EPOCH) * self._rate
+                entry = batch.get(article_id)
+                if entry is None:
+                    batch[article_id] = [weight, 1]
+                else:
+                    entry[0] = log_add(entry[0], weight)
+                    entry[1] += 1
+                count += 1
+            if self.last_id is not None and batch:
+                newest = self.last_id()
+                batch = {key: value for key, value in batch.items() if 0 < key <= newest}
+            if batch:
+                self._merge(batch, self._floor())
+            self.recorded += count
+            return count
+
+    def _floor(self):
+        """Log score below which an article has under MIN_VIEWS views left"""
+        return (time.time() - EPOCH) * self._rate + math.log(MIN_VIEWS)
+
+    def _merge(self, batch, floor):
+        """Add {article id: [log score, views]} to the stored totals"""
+        for article_id, (weight, views) in batch.items():
+            entry = self._scores.get(article_id)
+            if entry is None:
+                self._scores[article_id] = [weight, views]
+            else:
+                entry[0] = log_add(entry[0], weight)
+                entry[1] += views
+        if len(self._scores) > 10 * TOP_CANDIDATES:
+            self._scores = {key: value for key, value in self._scores.items() if value[0] >= floor}
+
+    def _ranked(self, limit):
+        """[(article id, log score)] of the highest scores, best first"""
+        # The flusher replaces and updates scores under this lock
+        with self._flush_lock:
+            best = heapq.nlargest(limit, self._scores.items(), key=lambda item: item[1][0])
+        return [(article_id, entry[0]) for article_id, entry in best]
+
+    def top(self, limit):
+        """
+        The trending articles
+
+        Args:
+            limit (int): Number of articles (at most TOP_CANDIDATES)
+
+        Returns:
+            tuple: ([(article id, decayed views)], tag) - the tag changes
+            whenever the returned ranking does
+        """
+        refreshed, ranked, changed = self._ranking
+        now = time.time()
+        if now - refreshed >= self.refresh:
+            fresh = self._ranked(TOP_CANDIDATES)
+            if [article_id for article_id, _ in fresh] != [article_id for article_id, _ in ranked]:
+                changed = int(now)
+            self._ranking = (now, fresh, changed)
+            ranked = fresh
+
+        offset = (now - EPOCH) * self._rate
+        top = [(article_id, math.exp(score - offset)) for article_id, score in ranked[:limit]]
+        ids = ','.join(str(article_id) for article_id, _ in top)
+        return top, hashlib.sha1(ids.encode('ascii')).hexdigest()[:12]
+
+    def changed(self):
+        """When the ranking last changed (epoch seconds), for Last-Modified"""
+        return self._ranking[2]
+
+
+class SQLiteViewCounter(ViewCounter):
+    """View counts shared between worker processes through a SQLite file"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS article_views (
+            article_id INTEGER PRIMARY KEY,
+            score REAL NOT NULL,
+            views INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_article_views_score ON article_views (score);
+    """
+
+    def __init__(self, path, half_life=21600, refresh=30.0, last_id=None):
+        super().__init__(half_life=half_life, refresh=refresh, last_id=last_id)
+        self.path = path
+        self._db_lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        # One connection per process; never reuse one inherited across fork.
+        # Transactions are explicit so merges can take the write lock up front
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _merge(self, batch, floor):
+        ids = list(batch)
+        with self._db_lock:
+            conn = self._connection()
+            # Read-modify-write of the scores: take the write lock first so
+            # workers flushing at the same time queue up instead of failing
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                stored = {}
+                for start in range(0, len(ids), 500):
+                    chunk = ids[start:start + 500]
+                    stored.update(conn.execute(
+                        'SELECT article_id, score FROM article_views WHERE article_id IN ({})'.format(
+                            ','.join('?' * len(chunk))
+                        ),
+                        chunk,
+                    ))
+                conn.executemany(
+                    'INSERT INTO article_views (article_id, score, views) VALUES (?, ?, ?) '
+                    'ON CONFLICT (article_id) DO UPDATE SET score = excluded.score, '
+                    'views = views + excluded.views',
+                    [
+                        (article_id, weight if article_id not in stored else log_add(stored[article_id], weight), views)
+                        for article_id, (weight, views) in batch.items()
+                    ],
+                )
+                conn.execute('DELETE FROM article_views WHERE score < ?', (floor,))
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+    def _ranked(self, limit):
+        with self._db_lock:
+            return self._connection().execute(
+                'SELECT article_id, score FROM article_views ORDER BY score DESC LIMIT ?', (limit,)
+            ).fetchall()
+
+
+def create_view_counter(url, half_life=21600, refresh=30.0, last_id=None):
+    """
+    Build a view counter from a URL
+
+    Args:
+        url (str): ``memory://`` or ``sqlite:///path/to/views.db``
+        half_life (float): Seconds for a view's weight to halve
+        refresh (float): Seconds between refreshes of the ranking
+        last_id (callable): Returns the newest article id
+
+    Returns:
+        ViewCounter: The configured counter
+    """
+    if url.startswith('sqlite:///'):
+        return SQLiteViewCounter(url[len('sqlite:///'):], half_life=half_life, refresh=refresh, last_id=last_id)
+    if url.startswith('memory://'):
+        return ViewCounter(half_life=half_life, refresh=refresh, last_id=last_id)
+    raise ValueError(f"Unsupported view counter URL: {url}")